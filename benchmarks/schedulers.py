@@ -0,0 +1,454 @@
+"""
+Benchmarks the schedulers on synthetic decks.
+
+Generates decks of the given sizes, with a review history for most of the
+cards, and then, for every registered scheduler, drives `next_card()` and
+`process_test_result()` in a loop, both directly and through `Study`.
+For each operation it reports the p50 and p99 latency and the average number
+of SQL statements, and for each scheduler the peak memory allocated by
+Python while studying (scheduler setup included).
+
+Usage (with the package installed, for example with `pip install --editable .`):
+
+.. code-block:: bash
+
+    python benchmarks/schedulers.py --sizes 1000,100000 --iterations 200
+    python benchmarks/schedulers.py --json results.json
+    python benchmarks/schedulers.py --compare results.json  # Fails on regressions
+
+Besides the regressions over the results it's compared to, `--compare` fails
+when an operation runs more SQL statements on the largest deck than on the
+smallest one.
+
+Generating the 1M cards deck takes a few minutes: the decks are stored in
+`--database-dir` and reused by later runs.
+"""
+from typing import Any, Callable, Dict, List, Optional
+
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import tracemalloc
+from pathlib import Path
+from datetime import datetime, timedelta
+from statistics import median
+
+from sqlalchemy import event
+
+from flashcards_core.database import init_db, Deck, Card, CardState, CardStats, Fact, Review
+from flashcards_core.database import SQLITE_PROFILES
+from flashcards_core.database.crud import LEAN
+from flashcards_core.guid import get_id_factory
+from flashcards_core.schedulers import get_available_schedulers, get_scheduler_class
+from flashcards_core.study import Study
+
+
+DEFAULT_SIZES = "1000,100000,1000000"
+
+#: Share of cards that were reviewed at least once
+REVIEWED_SHARE = 0.7
+
+#: Probability that a review is successful
+RECALL_PROBABILITY = 0.8
+
+#: Reviews are spread over this many days before the benchmark
+HISTORY_DAYS = 60
+
+#: Rows inserted per statement while generating the decks
+CHUNK_SIZE = 10000
+
+#: Name of the key holding the Ebisu model in the card states
+#: (flashcards_core.schedulers.ebisu.MODEL, not imported to keep numpy optional)
+EBISU_MODEL = "model"
+
+#: Extra SQL statements per operation allowed on the largest deck: the
+#: schedulers take different paths depending on the random review results
+STATEMENTS_GROWTH_TOLERANCE = 2
+
+
+class StatementCounter:
+    """
+    Counts the SQL statements sent to the database by an engine.
+    """
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args, **kwargs):
+        self.count += 1
+
+
+def percentile(values: List[float], share: float) -> float:
+    """
+    Nearest-rank percentile of a list of values.
+    """
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(share * len(ordered)))]
+
+
+def insert_in_chunks(session, table, rows) -> None:
+    """
+    Inserts the rows with executemany, CHUNK_SIZE rows at a time.
+    """
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == CHUNK_SIZE:
+            session.execute(table.insert(), chunk)
+            chunk = []
+    if chunk:
+        session.execute(table.insert(), chunk)
+
+
+def generate_deck(session, size: int) -> Deck:
+    """
+    Generates a deck with `size` cards. Most of them have a review history
+    (Reviews, CardStats and CardStates, including an Ebisu model): the number of reviews
+    per card is geometric, and each review fails with probability
+    1 - RECALL_PROBABILITY.
+    """
+    logging.info(f"Generating a deck of {size} cards...")
+    start = time.perf_counter()
+    now = datetime.now()
+
+    deck = Deck.create(
+        session=session,
+        name=f"benchmark-{size}",
+        description=f"Synthetic deck of {size} cards",
+        algorithm="random",
+        parameters={},
+        state={},
+    )
+    fact = Fact.create(session=session, value="benchmark", format="text")
+
+    new_card_id = get_id_factory(Card)
+    card_ids = [new_card_id() for _ in range(size)]
+    insert_in_chunks(
+        session,
+        Card.__table__,
+        (
+            {"id": card_id, "deck_id": deck.id, "question_id": fact.id, "answer_id": fact.id}
+            for card_id in card_ids
+        ),
+    )
+
+    states = []
+    reviews = []
+    new_review_id = get_id_factory(Review)
+    for card_id in card_ids:
+        if random.random() > REVIEWED_SHARE:
+            continue
+        reviews_count = 1
+        while reviews_count < 20 and random.random() < 0.6:
+            reviews_count += 1
+        review_times = sorted(
+            now - timedelta(hours=random.uniform(1, HISTORY_DAYS * 24))
+            for _ in range(reviews_count)
+        )
+        results = [random.random() < RECALL_PROBABILITY for _ in range(reviews_count)]
+        reviews.extend(
+            {
+                "id": new_review_id(),
+                "card_id": card_id,
+                "result": str(result),
+                "algorithm": "random",
+                "datetime": review_time,
+            }
+            for review_time, result in zip(review_times, results)
+        )
+        states.append(
+            {
+                "card_id": card_id,
+                "deck_id": deck.id,
+                "last_review_at": review_times[-1],
+                "parameters": {
+                    EBISU_MODEL: [3.0, 3.0, 12.0 * 2 ** results.count(True)]
+                },
+            }
+        )
+        if len(reviews) >= CHUNK_SIZE:
+            insert_in_chunks(session, Review.__table__, reviews)
+            reviews = []
+    insert_in_chunks(session, Review.__table__, reviews)
+    insert_in_chunks(session, CardState.__table__, states)
+    # The Reviews were inserted without the models: compute their statistics
+    CardStats.rebuild(session=session)
+
+    logging.info(f"Deck generated in {time.perf_counter() - start:.1f}s")
+    return deck
+
+
+def load_or_generate_deck(database_dir: Path, size: int, sqlite_profile: str = None):
+    """
+    Returns a session and the deck of the given size, generating it
+    only if it was not stored by a previous run.
+
+    The deck is loaded without its relationships, like an application
+    studying it would do: the schedulers query the cards they need.
+    """
+    database_dir.mkdir(parents=True, exist_ok=True)
+    sessionmaker = init_db(
+        f"sqlite:///{database_dir / f'benchmark-{size}.db'}", sqlite_profile=sqlite_profile
+    )
+    session = sessionmaker()
+    name = f"benchmark-{size}"
+    deck = Deck.get_by_name(session=session, name=name, profile=LEAN)
+    if not deck:
+        generate_deck(session, size)
+        # Reload the deck lean, it's still in the session with the default profile
+        session.expunge_all()
+        deck = Deck.get_by_name(session=session, name=name, profile=LEAN)
+    return session, deck
+
+
+def measure(operation: Callable[[], Any], counter: StatementCounter, timings: Dict) -> Any:
+    """
+    Runs the operation, appending its duration and its SQL statements count to `timings`.
+    """
+    statements = counter.count
+    start = time.perf_counter()
+    value = operation()
+    timings["latency"].append(time.perf_counter() - start)
+    timings["statements"].append(counter.count - statements)
+    return value
+
+
+def summarize(timings: Dict) -> Dict[str, float]:
+    return {
+        "p50_ms": median(timings["latency"]) * 1000,
+        "p99_ms": percentile(timings["latency"], 0.99) * 1000,
+        "statements": sum(timings["statements"]) / len(timings["statements"]),
+    }
+
+
+def benchmark_scheduler(session, deck, counter, iterations: int, warmup: int) -> Dict:
+    """
+    Benchmarks the scheduler currently assigned to the deck.
+    """
+    timings = {
+        operation: {"latency": [], "statements": []}
+        for operation in ("next_card", "process_test_result", "study_next")
+    }
+
+    def result():
+        return random.random() < RECALL_PROBABILITY
+
+    # Peak memory, measured apart as tracemalloc slows everything down
+    tracemalloc.start()
+    scheduler = get_scheduler_class(deck.algorithm)(session=session, deck=deck)
+    for _ in range(warmup):
+        scheduler.process_test_result(card=scheduler.next_card(), result=result())
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    scheduler = get_scheduler_class(deck.algorithm)(session=session, deck=deck)
+    for _ in range(warmup):
+        scheduler.process_test_result(card=scheduler.next_card(), result=result())
+    for _ in range(iterations):
+        card = measure(scheduler.next_card, counter, timings["next_card"])
+        measure(
+            lambda: scheduler.process_test_result(card=card, result=result()),
+            counter,
+            timings["process_test_result"],
+        )
+
+    study = Study(session=session, deck=deck)
+    card = study.next()
+    for _ in range(iterations):
+        card = measure(lambda: study.next(card, result()), counter, timings["study_next"])
+    study.close()
+
+    report = {name: summarize(values) for name, values in timings.items()}
+    report["peak_memory_mb"] = peak_memory / 2 ** 20
+    return report
+
+
+def run(
+    sizes: List[int],
+    schedulers: List[str],
+    iterations: int,
+    warmup: int,
+    database_dir,
+    sqlite_profile: str = None,
+):
+    """
+    Runs the benchmarks and returns the results as
+    ``{deck size: {scheduler: report}}``.
+    """
+    results = {}
+    for size in sizes:
+        session, deck = load_or_generate_deck(database_dir, size, sqlite_profile)
+        counter = StatementCounter(session.get_bind())
+        results[str(size)] = {}
+
+        for algorithm in schedulers:
+            try:
+                get_scheduler_class(algorithm)
+            except ImportError as error:
+                logging.warning(f"Skipping scheduler '{algorithm}': {error}")
+                continue
+
+            deck.algorithm = algorithm
+            session.commit()
+            logging.info(f"Benchmarking '{algorithm}' on {size} cards...")
+            results[str(size)][algorithm] = benchmark_scheduler(
+                session, deck, counter, iterations=iterations, warmup=warmup
+            )
+        session.close()
+    return results
+
+
+def print_results(results: Dict) -> None:
+    operations = ["next_card", "process_test_result", "study_next"]
+    header = f"{'cards':>8} {'scheduler':<16} {'operation':<20} "
+    header += f"{'p50 ms':>8} {'p99 ms':>8} {'SQL/op':>7} {'peak MB':>8}"
+    print(header)
+    print("-" * len(header))
+    for size, schedulers in results.items():
+        for algorithm, report in schedulers.items():
+            for operation in operations:
+                stats = report[operation]
+                print(
+                    f"{size:>8} {algorithm:<16} {operation:<20} "
+                    f"{stats['p50_ms']:>8.2f} {stats['p99_ms']:>8.2f} "
+                    f"{stats['statements']:>7.1f} {report['peak_memory_mb']:>8.1f}"
+                )
+
+
+def statements_growth(results: Dict) -> List[str]:
+    """
+    Returns the operations of `results` that run more SQL statements on
+    the largest deck than on the smallest one (up to
+    STATEMENTS_GROWTH_TOLERANCE): the number of statements of an operation
+    should not depend on the size of the deck.
+    """
+    regressions = []
+    sizes = sorted(results, key=int)
+    if len(sizes) < 2:
+        return regressions
+    smallest, largest = results[sizes[0]], results[sizes[-1]]
+    for algorithm, report in largest.items():
+        reference: Optional[Dict] = smallest.get(algorithm)
+        if not reference:
+            continue
+        for operation, stats in report.items():
+            if operation == "peak_memory_mb":
+                continue
+            allowed = reference[operation]["statements"] + STATEMENTS_GROWTH_TOLERANCE
+            if stats["statements"] > allowed:
+                regressions.append(
+                    f"{algorithm}: {operation} runs {stats['statements']:.1f} statements "
+                    f"on {sizes[-1]} cards ({reference[operation]['statements']:.1f} "
+                    f"on {sizes[0]} cards)"
+                )
+    return regressions
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """
+    Returns the regressions of `results` over `baseline`: latencies or
+    peak memory larger than `tolerance` times the baseline, or more SQL
+    statements per operation than the baseline. The operations whose
+    statements grow with the deck size are regressions too
+    (see `statements_growth()`).
+    """
+    regressions = statements_growth(results)
+    for size, schedulers in results.items():
+        for algorithm, report in schedulers.items():
+            reference: Optional[Dict] = baseline.get(size, {}).get(algorithm)
+            if not reference:
+                continue
+            where = f"{algorithm} on {size} cards"
+            for operation, stats in report.items():
+                if operation == "peak_memory_mb":
+                    if stats > reference[operation] * tolerance:
+                        regressions.append(
+                            f"{where}: peak memory {stats:.1f}MB "
+                            f"(was {reference[operation]:.1f}MB)"
+                        )
+                    continue
+                for metric in ("p50_ms", "p99_ms"):
+                    if stats[metric] > reference[operation][metric] * tolerance:
+                        regressions.append(
+                            f"{where}: {operation} {metric} {stats[metric]:.2f} "
+                            f"(was {reference[operation][metric]:.2f})"
+                        )
+                if stats["statements"] > reference[operation]["statements"] + 0.5:
+                    regressions.append(
+                        f"{where}: {operation} runs {stats['statements']:.1f} statements "
+                        f"(was {reference[operation]['statements']:.1f})"
+                    )
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument(
+        "--sizes",
+        default=DEFAULT_SIZES,
+        help=f"comma-separated deck sizes (default: {DEFAULT_SIZES})",
+    )
+    parser.add_argument(
+        "--schedulers",
+        default=None,
+        help="comma-separated scheduler names (default: all the registered ones)",
+    )
+    parser.add_argument("--iterations", type=int, default=200, help="measured reviews")
+    parser.add_argument("--warmup", type=int, default=10, help="reviews before measuring")
+    parser.add_argument("--seed", type=int, default=42, help="random seed")
+    parser.add_argument(
+        "--database-dir",
+        type=Path,
+        default=Path(__file__).parent / "data",
+        help="where to store the generated decks",
+    )
+    parser.add_argument(
+        "--sqlite-profile",
+        choices=sorted(SQLITE_PROFILES),
+        default=None,
+        help="pragmas to set on the database connections (default: SQLite's own settings)",
+    )
+    parser.add_argument("--json", type=Path, help="save the results to this file")
+    parser.add_argument("--compare", type=Path, help="JSON results to compare against")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=1.5,
+        help="slowdown factor over --compare that counts as a regression (default: 1.5)",
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    random.seed(args.seed)
+
+    schedulers = (
+        args.schedulers.split(",") if args.schedulers else sorted(get_available_schedulers())
+    )
+    results = run(
+        sizes=[int(size) for size in args.sizes.split(",")],
+        schedulers=schedulers,
+        iterations=args.iterations,
+        warmup=args.warmup,
+        database_dir=args.database_dir,
+        sqlite_profile=args.sqlite_profile,
+    )
+    print_results(results)
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=4))
+
+    if args.compare:
+        regressions = compare(results, json.loads(args.compare.read_text()), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,36 +1,100 @@
-from typing import Any, Mapping
+from typing import Any, Mapping, Optional, Union
 
 from pathlib import Path
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+
+try:
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+except ImportError:  # SQLAlchemy < 2.0
+    async_sessionmaker = None
 
 
 Base = declarative_base()
 
 
 from flashcards_core.database.models.cards import Card, CardTag  # noqa: F401, E402
+from flashcards_core.database.models.card_states import CardState  # noqa: F401, E402
 from flashcards_core.database.models.decks import Deck, DeckTag  # noqa: F401, E402
 from flashcards_core.database.models.facts import Fact, FactTag  # noqa: F401, E402
-from flashcards_core.database.models.reviews import Review # noqa: F401, E402
+from flashcards_core.database.models.reviews import Review  # noqa: F401, E402
+from flashcards_core.database.models.card_stats import CardStats  # noqa: F401, E402
 from flashcards_core.database.models.tags import Tag  # noqa: F401, E402
+from flashcards_core.database.transactions import batch, batch_async  # noqa: F401, E402
+from flashcards_core.database.tagging import (  # noqa: F401, E402
+    bulk_tag,
+    bulk_tag_async,
+    bulk_untag,
+    bulk_untag_async,
+    HasTag,
+    HasAnyTag,
+    HasAllTags,
+)
+from flashcards_core.database.cache import (  # noqa: F401, E402
+    enable_name_cache,
+    disable_name_cache,
+    get_name_cache,
+)
+from flashcards_core.database.pragmas import (  # noqa: F401, E402
+    apply_sqlite_profile,
+    sqlite_engine_options,
+    SQLITE_PROFILES,
+)
+from flashcards_core.database.engines import (  # noqa: F401, E402
+    engine_key,
+    get_or_create_engine,
+    pool_options,
+    registered_engines,
+    dispose_engines,
+    dispose_engines_async,
+)
+from flashcards_core.database.migrations import ensure_schema  # noqa: F401, E402
 
 
 def init_db(
     database_path: str = f"sqlite:///{Path(__name__).parent.absolute()}/sqlite_dev.db",
     connect_args: Mapping[str, Any] = {"check_same_thread": False},
+    sqlite_profile: Optional[Union[str, Mapping[str, Any]]] = None,
+    pool_size: Optional[int] = None,
+    max_overflow: Optional[int] = None,
+    pool_pre_ping: Optional[bool] = None,
+    create_tables: bool = True,
 ):
     """
     Initializes the database connection. Creates an SQLAlchemy engine,
-    makes sure all tables exist, and returns a sessionmaker that can be
+    makes sure the schema is up to date, and returns a sessionmaker that can be
     used to generate a database connection.
 
+    The schema is checked against a hash stamped in the database: new
+    databases are created, and outdated ones upgraded (see
+    `flashcards_core.database.migrations:ensure_schema()`).
+
+    Engines are created once per process: later calls with the same URL and
+    options return the same sessionmaker, sharing its connection pool, and
+    don't check the tables again. See `dispose_engines()` to start over.
+    In-memory SQLite databases are the exception: each call creates a new one.
+
     Note: the default connect_args is needed only for SQLite.
 
     :param database_path: The database URL. Can be used to specify the
         database type with the protocol ('sqlite:///', 'postgres:///', ...)
     :param connect_args: other arguments to pass to the SQLAlchemy engine.
         See SQLAlchemy documentation for `sqlalchemy.create_engine()`
+    :param sqlite_profile: pragmas to issue on each new SQLite connection:
+        `"performance"` (WAL journal, `synchronous=NORMAL`, larger caches, busy
+        timeout, see `flashcards_core.database.pragmas`), or a mapping of pragma
+        names to values. Ignored on other databases. Defaults to SQLite's own settings.
+        With a profile, connections to SQLite files are pooled, to issue the
+        pragmas and fill the caches only once per connection.
+    :param pool_size: number of connections to keep open. Defaults to SQLAlchemy's
+        default for the database.
+    :param max_overflow: number of connections to open beyond `pool_size` under load.
+    :param pool_pre_ping: whether to test connections before using them,
+        replacing the ones the server closed. Defaults to False.
+    :param create_tables: whether to check the schema, and create or upgrade the
+        tables if needed. Pass False when the schema is known to be up to date.
 
     :returns: a sessionmaker, a function that can be called to return a Session object.
 
@@ -47,7 +111,120 @@ def init_db(
             fact = Fact.create(session=session, value="A fact", format="text")
 
     """
-    engine = create_engine(database_path, connect_args=connect_args)
-    # Create all the tables if they don't exist
-    Base.metadata.create_all(bind=engine)
-    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    options = {
+        **sqlite_engine_options(database_path, sqlite_profile),
+        **pool_options(database_path, pool_size, max_overflow, pool_pre_ping),
+    }
+
+    def create():
+        engine = create_engine(database_path, connect_args=connect_args, **options)
+        apply_sqlite_profile(engine, sqlite_profile)
+        return engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    registered = get_or_create_engine(
+        engine_key(
+            database_path,
+            asyncio=False,
+            connect_args=connect_args,
+            sqlite_profile=sqlite_profile,
+            **options,
+        ),
+        create,
+    )
+    if create_tables and not registered.schema_ready:
+        with registered.lock:
+            if not registered.schema_ready:
+                # Create or upgrade the tables, unless the schema is stamped as up to date
+                with registered.engine.begin() as connection:
+                    ensure_schema(connection)
+                registered.schema_ready = True
+    return registered.sessionmaker
+
+
+async def init_db_async(
+    database_path: str = f"sqlite+aiosqlite:///{Path(__name__).parent.absolute()}/sqlite_dev.db",
+    connect_args: Mapping[str, Any] = {},
+    sqlite_profile: Optional[Union[str, Mapping[str, Any]]] = None,
+    pool_size: Optional[int] = None,
+    max_overflow: Optional[int] = None,
+    pool_pre_ping: Optional[bool] = None,
+    create_tables: bool = True,
+):
+    """
+    Initializes an asyncio database connection. Creates an SQLAlchemy
+    AsyncEngine, makes sure the schema is up to date, and returns a sessionmaker
+    that generates AsyncSession objects, to use with the `*_async` methods.
+
+    Like with `init_db()`, engines are reused by later calls with the same URL
+    and options. Pooled asyncio connections belong to the event loop that opened
+    them: call it again from other event loops only on databases without
+    a pool (SQLite without `sqlite_profile`), or after `dispose_engines_async()`.
+    Call `dispose_engines_async()` before the event loop ends, too: the
+    threads of pooled aiosqlite connections keep the process alive.
+
+    The database URL must name an asyncio driver, like `sqlite+aiosqlite:///`
+    (`pip install aiosqlite`) or `postgresql+asyncpg:///` (`pip install asyncpg`).
+
+    Note: sessions don't expire their objects on commit, as reloading
+    expired attributes would need implicit IO, which asyncio doesn't allow.
+
+    :param database_path: The database URL, with an asyncio driver.
+    :param connect_args: other arguments to pass to the SQLAlchemy engine.
+        See SQLAlchemy documentation for `sqlalchemy.ext.asyncio.create_async_engine()`
+    :param sqlite_profile: pragmas to issue on each new SQLite connection
+        (see `init_db()`).
+    :param pool_size: number of connections to keep open (see `init_db()`).
+    :param max_overflow: number of connections to open beyond `pool_size` under load.
+    :param pool_pre_ping: whether to test connections before using them.
+    :param create_tables: whether to check the schema, and create or upgrade the
+        tables if needed (see `init_db()`).
+
+    :returns: a sessionmaker, a function that can be called to return an AsyncSession object.
+
+        Example usage:
+
+        .. code-block:: python
+
+            from flashcards_core.database import init_db_async
+
+            # Initialize the database connection
+            sessionmaker = await init_db_async("sqlite+aiosqlite:///flashcards.db")
+            async with sessionmaker() as session:
+                fact = await Fact.create_async(session=session, value="A fact", format="text")
+
+    """
+    options = {
+        **sqlite_engine_options(database_path, sqlite_profile, asyncio=True),
+        **pool_options(database_path, pool_size, max_overflow, pool_pre_ping, asyncio=True),
+    }
+
+    def create():
+        engine = create_async_engine(database_path, connect_args=connect_args, **options)
+        apply_sqlite_profile(engine, sqlite_profile)
+        if async_sessionmaker:
+            return engine, async_sessionmaker(
+                bind=engine, autoflush=False, expire_on_commit=False
+            )
+        return engine, sessionmaker(
+            bind=engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+        )
+
+    registered = get_or_create_engine(
+        engine_key(
+            database_path,
+            asyncio=True,
+            connect_args=connect_args,
+            sqlite_profile=sqlite_profile,
+            **options,
+        ),
+        create,
+    )
+    if create_tables and not registered.schema_ready:
+        # Create or upgrade the tables, unless the schema is stamped as up to date.
+        # Not under `registered.lock`, which would block the event loop: coroutines
+        # starting together may all check the schema, and `ensure_schema()` makes
+        # the ones that find it outdated upgrade it one after the other
+        async with registered.engine.begin() as connection:
+            await connection.run_sync(ensure_schema)
+        registered.schema_ready = True
+    return registered.sessionmaker
@@ -0,0 +1,197 @@
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+
+import threading
+from collections import OrderedDict, namedtuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+#: Statistics of a NameCache, like `functools.lru_cache().cache_info()`
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+
+class NameCache:
+    """
+    Process-local LRU cache of the IDs of the model objects with a unique name
+    (decks and tags), so that looking them up by name costs no query.
+
+    Entries are keyed by database URL, model and name. Names found by a
+    session that wrote in its current transaction are cached only once it
+    commits, so rolled back objects never get in. Renames and deletions
+    made through `CrudOperations` invalidate the entries of the objects
+    involved; changes made in any other way (other processes, or setting
+    `name` and committing by hand) are seen only when the entry is evicted,
+    or when `clear()` is called.
+
+    The cache is thread-safe. Enable it with `enable_name_cache()`.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+
+        #: Maximum number of names to keep
+        self.maxsize = maxsize
+
+        #: Number of lookups answered by the cache
+        self.hits = 0
+
+        #: Number of lookups that had to query the database
+        self.misses = 0
+
+        self._ids: "OrderedDict[Tuple, Any]" = OrderedDict()
+        self._keys_by_id: Dict[Tuple, Tuple] = {}
+        self._lock = threading.Lock()
+
+    def get(self, database: str, model: str, name: str) -> Optional[Any]:
+        """
+        :returns: the ID of the named object, or None if it's not cached.
+        """
+        key = (database, model, name)
+        with self._lock:
+            object_id = self._ids.get(key)
+            if object_id is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._ids.move_to_end(key)
+            return object_id
+
+    def put(self, database: str, model: str, name: str, object_id: Hashable) -> None:
+        """
+        Stores the ID of the named object, evicting the least recently used
+        entry if the cache is full.
+        """
+        key = (database, model, name)
+        with self._lock:
+            old_key = self._keys_by_id.pop((database, model, object_id), None)
+            if old_key is not None:
+                self._ids.pop(old_key, None)
+            self._ids[key] = object_id
+            self._ids.move_to_end(key)
+            self._keys_by_id[(database, model, object_id)] = key
+            while len(self._ids) > self.maxsize:
+                (evicted_database, evicted_model, _), evicted_id = self._ids.popitem(last=False)
+                self._keys_by_id.pop((evicted_database, evicted_model, evicted_id), None)
+
+    def invalidate(self, database: str, model: str, object_ids: Iterable[Hashable]) -> None:
+        """
+        Forgets the names of the given objects.
+        """
+        with self._lock:
+            for object_id in object_ids:
+                key = self._keys_by_id.pop((database, model, object_id), None)
+                if key is not None:
+                    self._ids.pop(key, None)
+
+    def clear(self) -> None:
+        """
+        Forgets all names and resets the statistics.
+        """
+        with self._lock:
+            self._ids.clear()
+            self._keys_by_id.clear()
+            self.hits = self.misses = 0
+
+    def info(self) -> CacheInfo:
+        """
+        :returns: the hits, misses, maximum and current size of the cache.
+        """
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.maxsize, len(self._ids))
+
+
+#: The cache in use, if any
+_name_cache: Optional[NameCache] = None
+
+
+def enable_name_cache(maxsize: int = 1024) -> NameCache:
+    """
+    Starts caching the IDs of decks and tags by name, replacing any
+    previous cache.
+
+    :param maxsize: maximum number of names to keep.
+    :returns: the new cache, to read its statistics.
+    """
+    global _name_cache
+    _name_cache = NameCache(maxsize=maxsize)
+    return _name_cache
+
+
+def disable_name_cache() -> None:
+    """
+    Stops caching the IDs of decks and tags by name, and drops the cache.
+    """
+    global _name_cache
+    _name_cache = None
+
+
+def get_name_cache() -> Optional[NameCache]:
+    """
+    :returns: the cache in use, or None if name caching is disabled.
+    """
+    return _name_cache
+
+
+def database_key(session) -> str:
+    """
+    :returns: the URL of the database the session is bound to, to key the cache with.
+    """
+    # AsyncSession exposes the bind through its sync session
+    return str(getattr(session, "sync_session", session).get_bind().url)
+
+
+#: Key of `session.info` flagging the sessions that wrote in their current transaction
+WROTE = "flashcards_core_name_cache_wrote"
+
+#: Key of `session.info` holding the names to cache once the transaction commits
+PENDING_NAMES = "flashcards_core_name_cache_pending"
+
+
+def cache_name(session, model: str, name: str, object_id: Hashable) -> None:
+    """
+    Stores the ID of the named object in the name cache, if it's enabled.
+    If the session wrote in its current transaction, the object may not be
+    committed yet: it's cached only after the commit, and forgotten on rollback.
+
+    :param session: the session the object was found with.
+    :param model: the name of the model class.
+    :param name: the name of the object.
+    :param object_id: the ID of the object.
+    """
+    cache = get_name_cache()
+    if cache is None:
+        return
+    info = getattr(session, "sync_session", session).info
+    if info.get(WROTE):
+        info.setdefault(PENDING_NAMES, []).append((database_key(session), model, name, object_id))
+    else:
+        cache.put(database_key(session), model, name, object_id)
+
+
+@event.listens_for(Session, "after_flush")
+def _flushed(session, flush_context):
+    session.info[WROTE] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _executed(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info[WROTE] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _committed(session):
+    session.info.pop(WROTE, None)
+    pending = session.info.pop(PENDING_NAMES, None)
+    cache = get_name_cache()
+    if pending and cache is not None:
+        for entry in pending:
+            cache.put(*entry)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _transaction_ended(session, transaction):
+    # After the commit, if any: what's left was rolled back
+    if transaction.parent is None:
+        session.info.pop(WROTE, None)
+        session.info.pop(PENDING_NAMES, None)
@@ -1,14 +1,316 @@
-from typing import Any, List, Optional
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
 
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+import json
+import base64
+import binascii
+import datetime
+from uuid import UUID
 
+from sqlalchemy import DateTime, and_, bindparam, delete, inspect, or_, select, update
+from sqlalchemy.orm import Load, Session, lazyload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.interfaces import ONETOMANY
+
+from flashcards_core.guid import GUID
+from flashcards_core.database.cache import cache_name, database_key, get_name_cache
+from flashcards_core.database.transactions import (
+    commit,
+    commit_async,
+    rollback,
+    rollback_async,
+    savepoint,
+    savepoint_async,
+)
 from flashcards_core.errors import ObjectNotFoundException
 
 
+#: Loading profiles, see `CrudOperations.LOADING_PROFILES`.
+#: Loads no relationship eagerly
+LEAN = "lean"
+#: Loads eagerly what is needed to display the object
+RENDER = "render"
+#: Loads eagerly the relationships the models load by default. Collections
+#: that grow with use, like `Deck.cards` or `Card.reviews`, are loaded on access
+FULL = "full"
+
+#: Maximum number of IDs in a single `IN (...)` clause of the bulk operations.
+#: Older SQLite versions accept at most 999 parameters per statement.
+BULK_CHUNK_SIZE = 500
+
+
+def _to_rows(mapper, objects: Iterable[Mapping[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Translates the attribute names of each object into column names.
+    """
+    rows = []
+    for values in objects:
+        row = {}
+        for key, value in values.items():
+            attribute = mapper.column_attrs.get(key)
+            if attribute is None:
+                raise ValueError(f"{mapper.class_.__name__} has no column named '{key}'")
+            row[attribute.columns[0].key] = value
+        rows.append(row)
+    return rows
+
+
+def _group_rows(rows: List[Dict[str, Any]]) -> Dict[Tuple, List[Dict[str, Any]]]:
+    """
+    Groups the rows by the columns they set, as executemany needs all
+    the rows of a statement to set the same columns.
+    """
+    groups = {}
+    for row in rows:
+        groups.setdefault(tuple(sorted(row)), []).append(row)
+    return groups
+
+
+def _new_id(mapper) -> Optional[Any]:
+    """
+    Returns a new primary key generated by the Python default of the
+    primary key column (like uuid4), or None if it has no such default.
+    """
+    default = mapper.primary_key[0].default
+    if default is None or default.is_sequence or default.is_clause_element:
+        return None
+    if default.is_callable:
+        return default.arg(None)
+    return default.arg
+
+
+def _sane_multi_rowcount(session) -> bool:
+    """
+    Whether the database driver reports the right number of rows
+    matched by an executemany statement.
+    """
+    # AsyncSession exposes the bind through its sync session
+    dialect = getattr(session, "sync_session", session).get_bind().dialect
+    return dialect.supports_sane_multi_rowcount
+
+
+def _encode_cursor(order_by: str, descending: bool, values: List[Any]) -> str:
+    """
+    Encodes the sort key of the last object of a page into an opaque,
+    URL-safe string.
+    """
+    values = [
+        value.hex
+        if isinstance(value, UUID)
+        else value.isoformat()
+        if isinstance(value, datetime.datetime)
+        else value
+        for value in values
+    ]
+    payload = json.dumps({"o": order_by, "d": descending, "v": values}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(
+    cursor: str, order_by: str, descending: bool, columns: List[Any]
+) -> List[Any]:
+    """
+    Decodes a cursor made by `_encode_cursor()` back into the values of the
+    given columns.
+
+    :raises: ValueError if the cursor is malformed, or was made for
+        another sort order.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if payload["o"] != order_by or payload["d"] != descending:
+            raise ValueError("This cursor was made for another sort order.")
+        if len(payload["v"]) != len(columns):
+            raise ValueError("This cursor has the wrong number of values.")
+        values = []
+        for column, value in zip(columns, payload["v"]):
+            if value is None:
+                pass
+            elif isinstance(column.type, GUID):
+                value = UUID(value)
+            elif isinstance(column.type, DateTime):
+                value = datetime.datetime.fromisoformat(value)
+            values.append(value)
+        return values
+    except (binascii.Error, UnicodeError, TypeError, KeyError, AttributeError) as error:
+        raise ValueError(f"Invalid cursor: {error}") from error
+
+
+def _page_statement(
+    cls,
+    cursor: Optional[str],
+    limit: int,
+    order_by: Optional[str],
+    descending: bool,
+    profile: str = FULL,
+    where: Optional[Any] = None,
+):
+    """
+    Returns the SELECT statement for a page of `get_page()`: the objects
+    sorted by `order_by` and ID that come after the cursor, if any, and
+    that match the `where` clause, if any.
+    """
+    mapper = inspect(cls)
+    primary_key = mapper.primary_key[0]
+    columns = [primary_key]
+    if order_by and order_by != mapper.get_property_by_column(primary_key).key:
+        attribute = mapper.column_attrs.get(order_by)
+        if attribute is None:
+            raise ValueError(f"{cls.__name__} has no column named '{order_by}'")
+        columns.insert(0, attribute.columns[0])
+
+    # Databases disagree on where NULLs go: they are sorted explicitly after
+    # the other values, or before them in descending order
+    nullable = len(columns) > 1 and columns[0].nullable
+    sort_keys = ([columns[0].is_(None)] if nullable else []) + columns
+    stmt = (
+        select(cls)
+        .options(*cls.loading_options(profile))
+        .order_by(*(key.desc() if descending else key.asc() for key in sort_keys))
+    )
+    if where is not None:
+        stmt = stmt.where(where)
+    if cursor:
+        values = _decode_cursor(cursor, order_by, descending, columns)
+        # (a, id) > (x, y) written as a >= x AND (a > x OR id > y): unlike row
+        # values it works on every database, and unlike a plain OR it leads
+        # the query planners to seek the index on `a`
+        sort_value, id_value = values[0], values[-1]
+        if descending:
+            condition = columns[-1] < id_value
+            if len(columns) > 1 and sort_value is None:
+                # NULLs come first: the other NULLs, then all the values
+                condition = or_(and_(columns[0].is_(None), condition), columns[0].isnot(None))
+            elif len(columns) > 1:
+                condition = and_(
+                    columns[0] <= sort_value, or_(columns[0] < sort_value, condition)
+                )
+        else:
+            condition = columns[-1] > id_value
+            if len(columns) > 1 and sort_value is None:
+                # NULLs come last: only the other NULLs are left
+                condition = and_(columns[0].is_(None), condition)
+            elif len(columns) > 1:
+                condition = and_(
+                    columns[0] >= sort_value, or_(columns[0] > sort_value, condition)
+                )
+                if nullable:
+                    condition = or_(condition, columns[0].is_(None))
+        stmt = stmt.where(condition)
+    return stmt.limit(limit), columns
+
+
+def _next_cursor(
+    objects: List[Any], columns, limit: int, order_by: Optional[str], descending: bool
+) -> Optional[str]:
+    """
+    Returns the cursor of the page after `objects`, or None if it was the last one.
+    """
+    if len(objects) < limit:
+        return None
+    mapper = inspect(type(objects[-1]))
+    values = [
+        getattr(objects[-1], mapper.get_property_by_column(column).key) for column in columns
+    ]
+    return _encode_cursor(order_by, descending, values)
+
+
+def _update_statement(mapper, keys: Tuple[str, ...]):
+    """
+    Returns an UPDATE statement for executemany, that sets the given columns
+    of the row with the given primary key. Parameters are prefixed with
+    `_bulk_`, as column names are reserved for the SET clause.
+    """
+    primary_key = mapper.primary_key[0]
+    values = {key: bindparam(f"_bulk_{key}") for key in keys if key != primary_key.key}
+    return (
+        update(mapper.local_table)
+        .where(primary_key == bindparam(f"_bulk_{primary_key.key}"))
+        .values(values)
+    )
+
+
+def _delete_statements(mapper, ids: List[Any]) -> List:
+    """
+    Returns the statements that delete the given objects like `session.delete()`
+    would: children with a delete cascade go first, and so do the rows of
+    the association tables.
+    """
+    statements = []
+    primary_key = mapper.primary_key[0]
+    for relationship in mapper.relationships:
+        if relationship.secondary is not None:
+            for parent_column, secondary_column in relationship.synchronize_pairs:
+                statements.append(
+                    delete(relationship.secondary).where(secondary_column.in_(ids))
+                )
+        elif relationship.direction is ONETOMANY and relationship.cascade.delete:
+            child = relationship.mapper
+            for parent_column, child_column in relationship.synchronize_pairs:
+                child_ids = select(child.primary_key[0]).where(child_column.in_(ids))
+                statements += _delete_statements(child, child_ids)
+    statements.append(delete(mapper.local_table).where(primary_key.in_(ids)))
+    return statements
+
+
+def _forget_names(cls, session, object_ids: Iterable[Any]) -> None:
+    """
+    Drops the given objects from the name cache, if it's enabled, as they may
+    be renamed or deleted.
+    """
+    cache = get_name_cache()
+    if cache is not None:
+        cache.invalidate(database_key(session), cls.__name__, object_ids)
+
+
 class CrudOperations:
+
+    #: Relationships loaded eagerly by each loading profile, as dotted paths
+    #: (like ``"question.tags"``). All the other relationships, at every level,
+    #: are loaded only when accessed. None means the relationships are loaded
+    #: as configured in the model.
+    LOADING_PROFILES: Dict[str, Optional[List[str]]] = {LEAN: [], RENDER: [], FULL: None}
+
     @classmethod
-    def get_all(cls, session: Session, offset: int = 0, limit: int = 100) -> List:
+    def loading_options(cls, profile: str = FULL) -> List:
+        """
+        Returns the loader options implementing the given loading profile,
+        to pass to `select().options()` or `Query.options()`.
+
+        The loaded objects keep their profile: refreshing them, or reloading
+        them after a commit expired them, loads the same relationships again.
+
+        :param profile: the name of the profile (see `LOADING_PROFILES`).
+        :returns: a list of loader options.
+        :raises: ValueError if the model has no such profile.
+        """
+        try:
+            paths = cls.LOADING_PROFILES[profile]
+        except KeyError:
+            raise ValueError(
+                f"{cls.__name__} has no loading profile named '{profile}' "
+                f"(available profiles: {list(cls.LOADING_PROFILES)})"
+            )
+        if paths is None:
+            return []
+
+        # Options bound to the model are kept by the loaded objects, and applied
+        # again when they are refreshed or reloaded after a commit expired them
+        options = [Load(cls).lazyload("*")]
+        for path in paths:
+            loader, entity = Load(cls), cls
+            for name in path.split("."):
+                attribute = getattr(entity, name)
+                loader = loader.selectinload(attribute)
+                entity = attribute.property.mapper.class_
+                # The objects loaded along the path don't load their own relationships
+                options.append(loader.lazyload("*"))
+        return options
+
+    @classmethod
+    def get_all(
+        cls, session: Session, offset: int = 0, limit: int = 100, profile: str = FULL
+    ) -> List:
         """
         Returns a list of all the model objects available in the DB, or a
         subset of them.
@@ -16,20 +318,98 @@ class CrudOperations:
         :param session: the session (see flashcards_core.database:init_session()).
         :param offset: for pagination, index at which to start returning values.
         :param limit: for pagination, maximum number of elements to return.
+        :param profile: which relationships to load (see `LOADING_PROFILES`).
         :returns: List of model objects.
         """
-        return session.query(cls).offset(offset).limit(limit).all()
+        return (
+            session.query(cls)
+            .options(*cls.loading_options(profile))
+            .offset(offset)
+            .limit(limit)
+            .all()
+        )
+
+    @classmethod
+    def iter_all(cls, session: Session, chunk_size: int = 1000) -> Iterator:
+        """
+        Iterates over all the model objects available in the DB, without ever
+        holding more than `chunk_size` of them in memory: rows are streamed
+        from the database in chunks, with a server-side cursor where the database
+        supports it.
+
+        Relationships are not loaded eagerly: each access to a relationship of
+        the returned objects costs a query. Do not commit the session until the
+        iteration is over.
+
+        :param session: the session (see flashcards_core.database:init_session()).
+        :param chunk_size: how many rows to fetch from the database at once.
+        :returns: an iterator over all the model objects.
+        """
+        yield from session.query(cls).options(lazyload("*")).yield_per(chunk_size)
+
+    @classmethod
+    def get_page(
+        cls,
+        session: Session,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        order_by: Optional[str] = None,
+        descending: bool = False,
+        profile: str = FULL,
+    ) -> Tuple[List, Optional[str]]:
+        """
+        Returns a page of the model objects available in the DB, sorted by
+        `order_by` and then by ID, and the cursor to get the next page.
+
+        Unlike `get_all()`, pages are found with an index seek after the last
+        object of the previous page, so deep pages are as fast as the first one,
+        as long as the `order_by` column is indexed. NULLs come after the other
+        values, or before them in descending order. With time-ordered IDs (see
+        flashcards_core.guid:uuid7()), sorting by ID alone is sorting by creation time.
+
+        Example usage:
+
+        .. code-block:: python
+
+            objects, cursor = Review.get_page(session=session, order_by="datetime")
+            while cursor:
+                objects, cursor = Review.get_page(
+                    session=session, cursor=cursor, order_by="datetime"
+                )
+
+        :param session: the session (see flashcards_core.database:init_session()).
+        :param cursor: the cursor returned with the previous page, if any.
+            It's an URL-safe string that can be passed around as it is.
+        :param limit: maximum number of elements to return.
+        :param order_by: the name of the field to sort by. Defaults to the ID.
+        :param descending: whether to sort in descending order.
+        :param profile: which relationships to load (see `LOADING_PROFILES`).
+        :returns: a tuple with the list of model objects and the cursor of the
+            next page, which is None if this was the last page.
+
+        :raises: ValueError if the cursor is invalid, or was returned by a call
+            with a different `order_by` or `descending` value.
+        """
+        stmt, columns = _page_statement(cls, cursor, limit, order_by, descending, profile)
+        objects = session.execute(stmt).scalars().all()
+        return objects, _next_cursor(objects, columns, limit, order_by, descending)
 
     @classmethod
-    def get_one(cls, session: Session, object_id: int) -> Optional:
+    def get_one(cls, session: Session, object_id: int, profile: str = FULL) -> Optional:
         """
         Returns the model object corresponding to the given ID.
 
         :param session: the session (see flashcards_core.database:init_session()).
         :param object_id: the ID of the model object to return.
+        :param profile: which relationships to load (see `LOADING_PROFILES`).
         :returns: the matching model object.
         """
-        return session.query(cls).filter(cls.id == object_id).first()
+        return (
+            session.query(cls)
+            .options(*cls.loading_options(profile))
+            .filter(cls.id == object_id)
+            .first()
+        )
 
     @classmethod
     def create(cls, session: Session, **kwargs):
@@ -42,8 +422,7 @@ class CrudOperations:
         """
         db_object = cls(**kwargs)
         session.add(db_object)
-        session.commit()
-        session.refresh(db_object)
+        commit(session, db_object)
         return db_object
 
     @classmethod
@@ -66,8 +445,8 @@ class CrudOperations:
             )
         for key, value in kwargs.items():
             setattr(db_object, key, value)
-        session.commit()
-        session.refresh(db_object)
+        _forget_names(cls, session, [object_id])
+        commit(session, db_object)
         return db_object
 
     @classmethod
@@ -86,93 +465,573 @@ class CrudOperations:
         if not db_object:
             raise ObjectNotFoundException("Model object not found. Cannot delete it.")
         session.delete(db_object)
-        session.commit()
+        _forget_names(cls, session, [object_id])
+        commit(session)
 
+    @classmethod
+    def bulk_create(
+        cls, session: Session, objects: Iterable[Mapping[str, Any]], return_ids: bool = False
+    ) -> Optional[List[Any]]:
+        """
+        Create many model objects at once, in a single transaction.
+        Objects that set the same fields are inserted with a single
+        executemany statement.
 
+        Note: the objects are not loaded in the session, and no ORM events
+        are fired. Use `create()` if you need the objects themselves.
+
+        :param session: the session (see flashcards_core.database:init_session()).
+        :param objects: the kwargs to create each model object with, as dictionaries.
+            Check the model to understand what they can contain.
+        :param return_ids: whether to return the IDs of the new objects.
+        :returns: the IDs of the new objects in the same order, if `return_ids` is True.
+        """
+        mapper = inspect(cls)
+        primary_key = mapper.primary_key[0]
+        all_rows = _to_rows(mapper, objects)
+        for row in all_rows:
+            if primary_key.key not in row:
+                new_id = _new_id(mapper)
+                if new_id is not None:
+                    row[primary_key.key] = new_id
+
+        try:
+            with savepoint(session):
+                for rows in _group_rows(all_rows).values():
+                    if return_ids and primary_key.key not in rows[0]:
+                        # IDs generated by the database can only be read back one by one
+                        for row in rows:
+                            result = session.execute(mapper.local_table.insert(), row)
+                            row[primary_key.key] = result.inserted_primary_key[0]
+                    else:
+                        session.execute(mapper.local_table.insert(), rows)
+            commit(session)
+        except Exception:
+            rollback(session)
+            raise
+
+        if return_ids:
+            return [row[primary_key.key] for row in all_rows]
+        return None
 
     @classmethod
-    async def get_all_async(cls, session: Session, offset: int = 0, limit: int = 100) -> List[Any]:
+    def bulk_update(cls, session: Session, objects: Iterable[Mapping[str, Any]]) -> None:
+        """
+        Modify many model objects at once, in a single transaction.
+        Objects that set the same fields are updated with a single
+        executemany statement.
+
+        Note: objects already loaded in the session are refreshed only
+        on their next access, and no ORM events are fired.
+
+        :param session: the session (see flashcards_core.database:init_session()).
+        :param objects: the ID and the new values of each model object, as
+            dictionaries like ``{"id": ..., "value": ...}``.
+        :returns: None.
+
+        :raises: ObjectNotFoundException if any of the objects was not found in the
+            database. In this case no object is modified.
+        """
+        mapper = inspect(cls)
+        primary_key = mapper.primary_key[0]
+        all_rows = _to_rows(mapper, objects)
+        _forget_names(cls, session, [row.get(primary_key.key) for row in all_rows])
+        updated = 0
+        try:
+            with savepoint(session):
+                for keys, rows in _group_rows(all_rows).items():
+                    if primary_key.key not in keys:
+                        raise ValueError("Every object to update needs an ID.")
+                    stmt = _update_statement(mapper, keys)
+                    parameters = [
+                        {f"_bulk_{key}": value for key, value in row.items()} for row in rows
+                    ]
+                    result = session.execute(stmt, parameters)
+                    updated += result.rowcount
+                if updated < len(all_rows) and _sane_multi_rowcount(session):
+                    raise ObjectNotFoundException(
+                        f"{len(all_rows) - updated} model objects not found. "
+                        "You must create them before updating them."
+                    )
+            commit(session)
+        except Exception:
+            rollback(session)
+            raise
+
+    @classmethod
+    def bulk_delete(cls, session: Session, object_ids: Iterable[Any]) -> None:
+        """
+        Delete many model objects at once, in a single transaction, with
+        `IN (...)` clauses of at most BULK_CHUNK_SIZE IDs each. Related objects
+        are deleted like with `delete()`, following the delete cascades.
+
+        Note: no ORM events are fired.
+
+        :param session: the session (see flashcards_core.database:init_session()).
+        :param object_ids: the IDs of the model objects to delete.
+        :returns: None.
+
+        :raises: ObjectNotFoundException if any of the objects was not found in the
+            database. In this case no object is deleted.
+        """
+        mapper = inspect(cls)
+        object_ids = list(dict.fromkeys(object_ids))
+        _forget_names(cls, session, object_ids)
+        deleted = 0
+        try:
+            with savepoint(session):
+                for start in range(0, len(object_ids), BULK_CHUNK_SIZE):
+                    chunk = object_ids[start : start + BULK_CHUNK_SIZE]
+                    for stmt in _delete_statements(mapper, chunk):
+                        result = session.execute(stmt)
+                    deleted += result.rowcount
+                if deleted < len(object_ids):
+                    raise ObjectNotFoundException(
+                        f"{len(object_ids) - deleted} model objects not found. Cannot delete them."
+                    )
+            commit(session)
+        except Exception:
+            rollback(session)
+            raise
+
+
+
+    @classmethod
+    async def get_all_async(
+        cls, session: AsyncSession, offset: int = 0, limit: int = 100, profile: str = FULL
+    ) -> List[Any]:
         """
         Returns a list of all the model objects available in the DB, or a
         subset of them (asyncio-friendly).
 
-        :param session: the session (see flashcards_core.database:init_session()).
+        :param session: the session (see flashcards_core.database:init_db_async()).
         :param offset: for pagination, index at which to start returning values.
         :param limit: for pagination, maximum number of elements to return.
+        :param profile: which relationships to load (see `LOADING_PROFILES`).
+            Note that with asyncio the other relationships can't be accessed.
         :returns: List of model objects.
         """
-        stmt = select(cls).limit(limit).offset(offset)
+        stmt = select(cls).options(*cls.loading_options(profile)).limit(limit).offset(offset)
         results = await session.scalars(stmt)
         return results.all()
         
 
     @classmethod
-    async def get_one_async(cls, session: Session, object_id: int) -> Optional[Any]:
+    async def iter_all_async(cls, session: AsyncSession, chunk_size: int = 1000) -> AsyncIterator:
+        """
+        Iterates over all the model objects available in the DB, streaming
+        them in chunks (asyncio-friendly). See `iter_all()`.
+
+        Example usage:
+
+        .. code-block:: python
+
+            async for review in Review.iter_all_async(session=session):
+                ...
+
+        :param session: the session (see flashcards_core.database:init_db_async()).
+        :param chunk_size: how many rows to fetch from the database at once.
+        :returns: an asynchronous iterator over all the model objects.
+        """
+        stmt = select(cls).options(lazyload("*")).execution_options(yield_per=chunk_size)
+        results = await session.stream_scalars(stmt)
+        async for db_object in results:
+            yield db_object
+
+    @classmethod
+    async def get_page_async(
+        cls,
+        session: AsyncSession,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        order_by: Optional[str] = None,
+        descending: bool = False,
+        profile: str = FULL,
+    ) -> Tuple[List[Any], Optional[str]]:
+        """
+        Returns a page of the model objects available in the DB, sorted by
+        `order_by` and then by ID, and the cursor to get the next page
+        (asyncio-friendly). See `get_page()`.
+
+        :param session: the session (see flashcards_core.database:init_db_async()).
+        :param cursor: the cursor returned with the previous page, if any.
+        :param limit: maximum number of elements to return.
+        :param order_by: the name of the field to sort by. Defaults to the ID.
+        :param descending: whether to sort in descending order.
+        :param profile: which relationships to load (see `LOADING_PROFILES`).
+        :returns: a tuple with the list of model objects and the cursor of the
+            next page, which is None if this was the last page.
+
+        :raises: ValueError if the cursor is invalid, or was returned by a call
+            with a different `order_by` or `descending` value.
+        """
+        stmt, columns = _page_statement(cls, cursor, limit, order_by, descending, profile)
+        results = await session.scalars(stmt)
+        objects = results.all()
+        return objects, _next_cursor(objects, columns, limit, order_by, descending)
+
+    @classmethod
+    async def get_one_async(
+        cls, session: AsyncSession, object_id: int, profile: str = FULL
+    ) -> Optional[Any]:
         """
         Returns the model object corresponding to the given ID (asyncio-friendly).
 
-        :param session: the session (see flashcards_core.database:init_session()).
+        :param session: the session (see flashcards_core.database:init_db_async()).
         :param object_id: the ID of the model object to return.
+        :param profile: which relationships to load (see `LOADING_PROFILES`).
+            Note that with asyncio the other relationships can't be accessed.
         :returns: the matching model object.
         """
-        stmt = select(cls).where(cls.id == object_id)
+        stmt = select(cls).options(*cls.loading_options(profile)).where(cls.id == object_id)
         results = await session.scalars(stmt)
         return results.first()
 
 
     @classmethod
-    async def create_async(cls, session: Session, **kwargs):
+    async def create_async(cls, session: AsyncSession, **kwargs):
         """
         Create a new model object with the given kwargs.
         Check the model to understand what you can give as **kwargs (asyncio-friendly).
 
-        :param session: the session (see flashcards_core.database:init_session()).
+        :param session: the session (see flashcards_core.database:init_db_async()).
         :returns: the new model object.
         """
         db_object = cls(**kwargs)
         session.add(db_object)
-        await session.commit()
-        await session.refresh(db_object)
+        await commit_async(session, db_object)
         return db_object
 
     @classmethod
-    async def update_async(cls, session: Session, object_id: int, **kwargs):
+    async def update_async(cls, session: AsyncSession, object_id: int, **kwargs):
         """
         Modify the model object with the given values.
         Check the model to understand what you can give as **kwargs (asyncio-friendly).
 
-        :param session: the session (see flashcards_core.database:init_session()).
+        :param session: the session (see flashcards_core.database:init_db_async()).
         :param object_id: the ID of the model object to update.
         :returns: the updated model object.
 
         :raises: ObjectNotFoundException if no model object with the given
             ID was found in the database.
         """
-        db_object = cls.get_one_async(session=session, object_id=object_id)
+        db_object = await cls.get_one_async(session=session, object_id=object_id)
         if not db_object:
             raise ObjectNotFoundException(
                 "Model object not found. You must create it before updating it."
             )
         for key, value in kwargs.items():
             setattr(db_object, key, value)
-        await session.commit()
-        await session.refresh(db_object)
+        _forget_names(cls, session, [object_id])
+        await commit_async(session, db_object)
         return db_object
 
     @classmethod
-    async def delete_async(cls, session: Session, object_id: int) -> None:
+    async def delete_async(cls, session: AsyncSession, object_id: int) -> None:
         """
         Delete a model object (asyncio-friendly).
 
-        :param session: the session (see flashcards_core.database:init_session()).
+        :param session: the session (see flashcards_core.database:init_db_async()).
         :param object_id: the ID of the model object to delete.
         :returns: None.
 
         :raises: ObjectNotFoundException if no object with the given
             ID was found in the database.
         """
-        db_object = cls.get_one_async(session=session, object_id=object_id)
+        db_object = await cls.get_one_async(session=session, object_id=object_id)
         if not db_object:
             raise ObjectNotFoundException("Model object not found. Cannot delete it.")
-        session.delete(db_object)
-        await session.commit()
+        await session.delete(db_object)
+        _forget_names(cls, session, [object_id])
+        await commit_async(session)
+
+    @classmethod
+    async def bulk_create_async(
+        cls, session: AsyncSession, objects: Iterable[Mapping[str, Any]], return_ids: bool = False
+    ) -> Optional[List[Any]]:
+        """
+        Create many model objects at once, in a single transaction (asyncio-friendly).
+        See `bulk_create()`.
+
+        :param session: the session (see flashcards_core.database:init_db_async()).
+        :param objects: the kwargs to create each model object with, as dictionaries.
+            Check the model to understand what they can contain.
+        :param return_ids: whether to return the IDs of the new objects.
+        :returns: the IDs of the new objects in the same order, if `return_ids` is True.
+        """
+        mapper = inspect(cls)
+        primary_key = mapper.primary_key[0]
+        all_rows = _to_rows(mapper, objects)
+        for row in all_rows:
+            if primary_key.key not in row:
+                new_id = _new_id(mapper)
+                if new_id is not None:
+                    row[primary_key.key] = new_id
+
+        try:
+            async with savepoint_async(session):
+                for rows in _group_rows(all_rows).values():
+                    if return_ids and primary_key.key not in rows[0]:
+                        # IDs generated by the database can only be read back one by one
+                        for row in rows:
+                            result = await session.execute(mapper.local_table.insert(), row)
+                            row[primary_key.key] = result.inserted_primary_key[0]
+                    else:
+                        await session.execute(mapper.local_table.insert(), rows)
+            await commit_async(session)
+        except Exception:
+            await rollback_async(session)
+            raise
+
+        if return_ids:
+            return [row[primary_key.key] for row in all_rows]
+        return None
+
+    @classmethod
+    async def bulk_update_async(
+        cls, session: AsyncSession, objects: Iterable[Mapping[str, Any]]
+    ) -> None:
+        """
+        Modify many model objects at once, in a single transaction (asyncio-friendly).
+        See `bulk_update()`.
+
+        :param session: the session (see flashcards_core.database:init_db_async()).
+        :param objects: the ID and the new values of each model object, as
+            dictionaries like ``{"id": ..., "value": ...}``.
+        :returns: None.
+
+        :raises: ObjectNotFoundException if any of the objects was not found in the
+            database. In this case no object is modified.
+        """
+        mapper = inspect(cls)
+        primary_key = mapper.primary_key[0]
+        all_rows = _to_rows(mapper, objects)
+        _forget_names(cls, session, [row.get(primary_key.key) for row in all_rows])
+        updated = 0
+        try:
+            async with savepoint_async(session):
+                for keys, rows in _group_rows(all_rows).items():
+                    if primary_key.key not in keys:
+                        raise ValueError("Every object to update needs an ID.")
+                    stmt = _update_statement(mapper, keys)
+                    parameters = [
+                        {f"_bulk_{key}": value for key, value in row.items()} for row in rows
+                    ]
+                    result = await session.execute(stmt, parameters)
+                    updated += result.rowcount
+                if updated < len(all_rows) and _sane_multi_rowcount(session):
+                    raise ObjectNotFoundException(
+                        f"{len(all_rows) - updated} model objects not found. "
+                        "You must create them before updating them."
+                    )
+            await commit_async(session)
+        except Exception:
+            await rollback_async(session)
+            raise
+
+    @classmethod
+    async def bulk_delete_async(cls, session: AsyncSession, object_ids: Iterable[Any]) -> None:
+        """
+        Delete many model objects at once, in a single transaction (asyncio-friendly).
+        See `bulk_delete()`.
+
+        :param session: the session (see flashcards_core.database:init_db_async()).
+        :param object_ids: the IDs of the model objects to delete.
+        :returns: None.
+
+        :raises: ObjectNotFoundException if any of the objects was not found in the
+            database. In this case no object is deleted.
+        """
+        mapper = inspect(cls)
+        object_ids = list(dict.fromkeys(object_ids))
+        _forget_names(cls, session, object_ids)
+        deleted = 0
+        try:
+            async with savepoint_async(session):
+                for start in range(0, len(object_ids), BULK_CHUNK_SIZE):
+                    chunk = object_ids[start : start + BULK_CHUNK_SIZE]
+                    for stmt in _delete_statements(mapper, chunk):
+                        result = await session.execute(stmt)
+                    deleted += result.rowcount
+                if deleted < len(object_ids):
+                    raise ObjectNotFoundException(
+                        f"{len(object_ids) - deleted} model objects not found. Cannot delete them."
+                    )
+            await commit_async(session)
+        except Exception:
+            await rollback_async(session)
+            raise
+
+
+class NameOperations:
+    """
+    Lookups by name for the models with a unique `name` column, like Deck and Tag.
+    Use it together with CrudOperations.
+
+    When the name cache is enabled (see
+    flashcards_core.database.cache:enable_name_cache()), the IDs of the names
+    looked up are cached, so repeated lookups cost no query for the ID, and
+    none at all for objects already loaded in the session.
+    """
+
+    @classmethod
+    def get_by_name(cls, session: Session, name: str, profile: str = FULL) -> Optional[Any]:
+        """
+        Returns the model object corresponding to the given name.
+
+        :param session: the session (see flashcards_core.database:init_db()).
+        :param name: the name of the model object to return.
+        :param profile: which relationships to load (see `LOADING_PROFILES`).
+        :returns: the matching model object.
+        """
+        cache = get_name_cache()
+        if cache is not None:
+            database = database_key(session)
+            object_id = cache.get(database, cls.__name__, name)
+            if object_id is not None:
+                db_object = session.get(cls, object_id, options=cls.loading_options(profile))
+                if db_object is not None and db_object.name == name:
+                    return db_object
+                # Renamed or deleted without going through CrudOperations
+                cache.invalidate(database, cls.__name__, [object_id])
+
+        db_object = (
+            session.query(cls)
+            .options(*cls.loading_options(profile))
+            .filter(cls.name == name)
+            .first()
+        )
+        if db_object is not None:
+            cache_name(session, cls.__name__, name, db_object.id)
+        return db_object
+
+    @classmethod
+    def get_id_by_name(cls, session: Session, name: str) -> Optional[Any]:
+        """
+        Returns the ID of the model object corresponding to the given name,
+        without loading the object.
+
+        :param session: the session (see flashcards_core.database:init_db()).
+        :param name: the name of the model object.
+        :returns: the ID of the matching model object, or None.
+        """
+        return cls.get_ids_by_names(session=session, names=[name]).get(name)
+
+    @classmethod
+    def get_ids_by_names(cls, session: Session, names: Iterable[str]) -> Dict[str, Any]:
+        """
+        Returns the IDs of the model objects corresponding to the given names,
+        without loading the objects. The names that are not cached are looked
+        up together, with `IN (...)` clauses of at most BULK_CHUNK_SIZE names each.
+
+        :param session: the session (see flashcards_core.database:init_db()).
+        :param names: the names of the model objects.
+        :returns: a dictionary of the IDs by name. Names with no matching
+            model object are left out.
+        """
+        ids, missing = _cached_ids(cls, session, names)
+        for start in range(0, len(missing), BULK_CHUNK_SIZE):
+            stmt = select(cls.name, cls.id).where(
+                cls.name.in_(missing[start : start + BULK_CHUNK_SIZE])
+            )
+            ids.update(session.execute(stmt).all())
+        return _cache_ids(cls, session, ids, missing)
+
+    @classmethod
+    async def get_by_name_async(
+        cls, session: AsyncSession, name: str, profile: str = FULL
+    ) -> Optional[Any]:
+        """
+        Returns the model object corresponding to the given name (asyncio friendly).
+
+        :param session: the session (see flashcards_core.database:init_db_async()).
+        :param name: the name of the model object to return.
+        :param profile: which relationships to load (see `LOADING_PROFILES`).
+            Note that with asyncio the other relationships can't be accessed.
+        :returns: the matching model object.
+        """
+        cache = get_name_cache()
+        if cache is not None:
+            database = database_key(session)
+            object_id = cache.get(database, cls.__name__, name)
+            if object_id is not None:
+                db_object = await session.get(
+                    cls, object_id, options=cls.loading_options(profile)
+                )
+                if db_object is not None and db_object.name == name:
+                    return db_object
+                # Renamed or deleted without going through CrudOperations
+                cache.invalidate(database, cls.__name__, [object_id])
+
+        stmt = select(cls).options(*cls.loading_options(profile)).where(cls.name == name)
+        results = await session.scalars(stmt)
+        db_object = results.first()
+        if db_object is not None:
+            cache_name(session, cls.__name__, name, db_object.id)
+        return db_object
+
+    @classmethod
+    async def get_id_by_name_async(cls, session: AsyncSession, name: str) -> Optional[Any]:
+        """
+        Returns the ID of the model object corresponding to the given name,
+        without loading the object (asyncio friendly).
+
+        :param session: the session (see flashcards_core.database:init_db_async()).
+        :param name: the name of the model object.
+        :returns: the ID of the matching model object, or None.
+        """
+        ids = await cls.get_ids_by_names_async(session=session, names=[name])
+        return ids.get(name)
+
+    @classmethod
+    async def get_ids_by_names_async(
+        cls, session: AsyncSession, names: Iterable[str]
+    ) -> Dict[str, Any]:
+        """
+        Returns the IDs of the model objects corresponding to the given names,
+        without loading the objects (asyncio friendly). See `get_ids_by_names()`.
+
+        :param session: the session (see flashcards_core.database:init_db_async()).
+        :param names: the names of the model objects.
+        :returns: a dictionary of the IDs by name. Names with no matching
+            model object are left out.
+        """
+        ids, missing = _cached_ids(cls, session, names)
+        for start in range(0, len(missing), BULK_CHUNK_SIZE):
+            stmt = select(cls.name, cls.id).where(
+                cls.name.in_(missing[start : start + BULK_CHUNK_SIZE])
+            )
+            results = await session.execute(stmt)
+            ids.update(results.all())
+        return _cache_ids(cls, session, ids, missing)
+
+
+def _cached_ids(cls, session, names: Iterable[str]) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Splits the given names in the ones whose ID is in the name cache, returned
+    with their ID, and the ones that must be looked up in the database.
+    """
+    cache = get_name_cache()
+    names = list(dict.fromkeys(names))
+    if cache is None:
+        return {}, names
+    database = database_key(session)
+    ids, missing = {}, []
+    for name in names:
+        object_id = cache.get(database, cls.__name__, name)
+        if object_id is None:
+            missing.append(name)
+        else:
+            ids[name] = object_id
+    return ids, missing
+
+
+def _cache_ids(cls, session, ids: Dict[str, Any], looked_up: List[str]) -> Dict[str, Any]:
+    """
+    Stores in the name cache the IDs found for the names that were looked up.
+    """
+    if get_name_cache() is not None:
+        for name in looked_up:
+            if name in ids:
+                cache_name(session, cls.__name__, name, ids[name])
+    return ids
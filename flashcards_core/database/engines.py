@@ -0,0 +1,140 @@
+from typing import Any, Dict, Hashable, List, Mapping, Optional
+
+import threading
+
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from flashcards_core.guid import get_guid_storage
+from flashcards_core.database.pragmas import is_sqlite_file, is_sqlite_memory
+
+
+class RegisteredEngine:
+    """
+    An engine created by `init_db()` or `init_db_async()`, with its sessionmaker.
+    """
+
+    def __init__(self, engine, sessionmaker):
+
+        #: The SQLAlchemy Engine or AsyncEngine
+        self.engine = engine
+
+        #: The sessionmaker bound to the engine
+        self.sessionmaker = sessionmaker
+
+        #: Whether the schema was already checked on this engine
+        self.schema_ready = False
+
+        #: Held by `init_db()` while checking the schema, so that threads
+        #: starting together check it once
+        self.lock = threading.Lock()
+
+
+#: The engines in use, by URL and options
+_engines: Dict[Hashable, RegisteredEngine] = {}
+
+#: Protects `_engines`
+_engines_lock = threading.Lock()
+
+
+def engine_key(database_path: str, asyncio: bool, **options: Any) -> Optional[Hashable]:
+    """
+    :param database_path: The database URL.
+    :param asyncio: whether the engine is an AsyncEngine.
+    :param options: the other arguments the engine is created with.
+    :returns: the key of the engine in the registry. Engines are shared only
+        by calls with the same URL and options, and the same GUID storage mode,
+        as engines cache the conversion functions of the types.
+        None for in-memory SQLite databases, which each call creates anew.
+    """
+    if is_sqlite_memory(database_path):
+        return None
+    # connect_args and profiles can hold unhashable values
+    frozen = repr(sorted((name, repr(value)) for name, value in options.items()))
+    return (database_path, asyncio, get_guid_storage(), frozen)
+
+
+def get_or_create_engine(key: Hashable, create) -> RegisteredEngine:
+    """
+    :param key: the key of the engine (see `engine_key()`). If None, a new
+        engine is created and not registered.
+    :param create: called without arguments to create the engine and its
+        sessionmaker, if none is registered with this key.
+    :returns: the registered engine.
+    """
+    if key is None:
+        return RegisteredEngine(*create())
+    with _engines_lock:
+        registered = _engines.get(key)
+        if registered is None:
+            registered = _engines[key] = RegisteredEngine(*create())
+        return registered
+
+
+def pool_options(
+    database_path: str,
+    pool_size: Optional[int] = None,
+    max_overflow: Optional[int] = None,
+    pool_pre_ping: Optional[bool] = None,
+    asyncio: bool = False,
+) -> Dict[str, Any]:
+    """
+    :param database_path: The database URL.
+    :param pool_size: number of connections to keep open.
+    :param max_overflow: number of connections to open beyond `pool_size` under load.
+    :param pool_pre_ping: whether to test connections when they are checked
+        out of the pool, replacing the ones the server closed.
+    :param asyncio: whether the engine will be an AsyncEngine.
+    :returns: the engine arguments for the options that were given, leaving
+        SQLAlchemy's defaults for the others. SQLite files get a queue pool
+        when sized, as their default pool keeps no connection.
+    """
+    options: Dict[str, Any] = {}
+    if pool_size is not None:
+        options["pool_size"] = pool_size
+    if max_overflow is not None:
+        options["max_overflow"] = max_overflow
+    if pool_pre_ping is not None:
+        options["pool_pre_ping"] = pool_pre_ping
+    if ("pool_size" in options or "max_overflow" in options) and is_sqlite_file(database_path):
+        options["poolclass"] = AsyncAdaptedQueuePool if asyncio else QueuePool
+    return options
+
+
+def registered_engines() -> List[RegisteredEngine]:
+    """
+    :returns: the engines created by `init_db()` and `init_db_async()` so far.
+    """
+    with _engines_lock:
+        return list(_engines.values())
+
+
+def dispose_engines() -> None:
+    """
+    Closes the connections of all the registered engines and forgets them:
+    the next `init_db()` calls create new engines. Useful in child processes
+    after a fork, and in tests.
+
+    Asyncio engines are only forgotten: use `dispose_engines_async()` to close
+    their connections too.
+    """
+    with _engines_lock:
+        engines = list(_engines.values())
+        _engines.clear()
+    for registered in engines:
+        if not hasattr(registered.engine, "sync_engine"):
+            registered.engine.dispose()
+
+
+async def dispose_engines_async() -> None:
+    """
+    Closes the connections of all the registered engines, asyncio ones
+    included, and forgets them (see `dispose_engines()`).
+    """
+    with _engines_lock:
+        engines = list(_engines.values())
+        _engines.clear()
+    for registered in engines:
+        if hasattr(registered.engine, "sync_engine"):
+            await registered.engine.dispose()
+        else:
+            registered.engine.dispose()
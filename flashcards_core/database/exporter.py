@@ -13,8 +13,10 @@ from flashcards_core.database import Base
 
 
 #: Default fields not to follow for related objects discovery.
-#: See `export_to_json()` for more info
-DEFAULT_EXCLUDE_FIELDS = {"cards": ["deck"]}
+#: See `export_to_json()` for more info.
+#: Scheduling states are not exported: they are rebuilt by studying.
+#: Review statistics are not exported either: they are computed from the Reviews.
+DEFAULT_EXCLUDE_FIELDS = {"cards": ["deck", "scheduling_state", "stats"]}
 
 
 def hierarchy_to_json(obj):
@@ -71,14 +73,16 @@ def export_to_dict(
     following ones:
 
         * Exporting a Card won't export its Deck.
+        * Exporting a Card won't export its scheduling state.
         * Exporting a Fact will not export the Cards it's included in.
 
     These default can be overridden by providing a value to the
     `exclude_fields` attribute. It expect a mapping of a tablename (like 'cards')
     and a list of string with the name of the columns that should not be checked
     for potential related objects to export.
-    Its default value looks like ``{'cards': ['deck']}`` (facts don't have
-    references to the cards they're included in, so you need a query to find them).
+    Its default value looks like ``{'cards': ['deck', 'scheduling_state', 'stats']}``
+    (facts don't have references to the cards they're included in, so you need
+    a query to find them).
 
     Remember to pass an empty dictionary to `exclude_fields` to really exclude
     no fields; passing None will instruct this function to apply the
@@ -155,7 +159,8 @@ def export_to_dict(
     :param exclude_fields: If any of the model object columns should not be followed,
         they should be added here. Note that these exclusions apply to all
         the objects of this type discovered by following other relationships.
-        The default value is set to ``{'cards': ['deck']}`` (see above).
+        The default value is set to ``{'cards': ['deck', 'scheduling_state', 'stats']}``
+        (see above).
     :param _hierarchy: internal, used to pass the already built hierarchy through
         recursive calls.
     :returns: a definition of all the objects required to reconstruct the
@@ -248,7 +253,8 @@ def _export_find_related_objects(
     :param exclude_fields: If any of the model object columns should not be followed,
         they should be added here. Note that these exclusions apply to all
         the objects of this type discovered by following other relationships.
-        The default value is set to ``{'cards': ['deck']}`` (see `export_to_dict`).
+        The default value is set to ``{'cards': ['deck', 'scheduling_state', 'stats']}``
+        (see `export_to_dict`).
     :param _hierarchy: the hierarchy to add the related entities to.
 
     :returns: the modified _hierarchy.
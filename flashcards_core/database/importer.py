@@ -8,7 +8,7 @@ from datetime import datetime
 from sqlalchemy import Table
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
-from flashcards_core.database import Base
+from flashcards_core.database import Base, CardStats, Review
 
 
 def datetime_hook(json_dict):
@@ -101,6 +101,12 @@ def import_from_dict(
             }
         }
 
+    The rows are inserted without the models, so the statistics of the cards
+    of the imported Reviews are recomputed at the end (see `CardStats.refresh()`).
+    Statistics found in the hierarchy are skipped.
+
+    Note: this function does not commit.
+
     :param session: the session (see flashcards_core.database:init_session()).
     :param hierarchy: a dictionary containing all the data of the objects to import.
         See above or `export_to_dict()` for more info.
@@ -110,6 +116,10 @@ def import_from_dict(
     """
     for tablename, entities in hierarchy.items():
 
+        if tablename == CardStats.__tablename__:
+            logging.debug(f"Skipping {tablename}: they are computed from the Reviews.")
+            continue
+
         # Find the relevant table
         table = Base.metadata.tables.get(tablename)
         if table is None:
@@ -151,6 +161,12 @@ def import_from_dict(
                 )
             logging.error(f"Table '{tablename}' is malformed. Skipping")
 
+    reviews = hierarchy.get(Review.__tablename__)
+    if isinstance(reviews, dict):
+        CardStats.refresh(
+            session=session, card_ids=[values.get("card_id") for values in reviews.values()]
+        )
+
 
 def import_to_table(
     session: Session, table: Table, tablename: str, entities: dict, stop_on_error: bool
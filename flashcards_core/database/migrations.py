@@ -0,0 +1,379 @@
+from typing import Any, Callable, Dict, List, Mapping, Optional
+
+import hashlib
+import logging
+import uuid
+from datetime import datetime
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    MetaData,
+    String,
+    Table,
+    UniqueConstraint,
+    create_engine,
+    inspect,
+    select,
+    text,
+)
+from sqlalchemy.engine import Connection
+from sqlalchemy.schema import CreateColumn, CreateTable
+
+from flashcards_core.guid import GUID, HEX, BINARY_16, set_guid_storage
+from flashcards_core.database import Base
+from flashcards_core.database.models.card_stats import _refresh_statements
+
+
+#: Key/value table recording the state of the schema: the hash of the
+#: metadata it was last upgraded to, and the upgrade steps that ran on it
+SchemaInfo = Table(
+    "schema_info",
+    Base.metadata,
+    Column("key", String(255), primary_key=True),
+    Column("value", String(255), nullable=False),
+    Column("updated_at", DateTime(), default=datetime.now, onupdate=datetime.now),
+)
+
+#: Key of the hash of the metadata in `SchemaInfo`
+METADATA_HASH_KEY = "metadata_hash"
+
+#: Prefix of the keys of the upgrade steps that ran, in `SchemaInfo`
+UPGRADE_KEY_PREFIX = "upgrade:"
+
+#: Key of the PostgreSQL advisory lock held while upgrading the schema
+UPGRADE_LOCK_KEY = 0x666C617368636172
+
+#: The upgrade steps, by name, in the order they run
+_upgrade_steps: Dict[str, Callable[[Connection], None]] = {}
+
+
+def upgrade_step(name: str) -> Callable:
+    """
+    Registers a function to run once on each database, the next time
+    `ensure_schema()` upgrades it. Steps run in registration order, after the
+    missing tables, columns and indexes are created, in the same transaction.
+    Registering a step changes the hash of the schema, so that databases
+    already up to date get upgraded again.
+
+    Example usage:
+
+    .. code-block:: python
+
+        from flashcards_core.database.migrations import upgrade_step
+
+        @upgrade_step("lowercase_tag_names")
+        def lowercase_tag_names(connection):
+            connection.execute(Tag.__table__.update().values(name=func.lower(Tag.name)))
+
+    :param name: the unique name of the step, recorded in the database once it ran.
+    :returns: a decorator taking a function that receives the `Connection`.
+    :raises: ValueError if a step with this name is already registered.
+    """
+
+    def register(function: Callable[[Connection], None]) -> Callable[[Connection], None]:
+        if name in _upgrade_steps:
+            raise ValueError(f"An upgrade step named '{name}' is already registered.")
+        _upgrade_steps[name] = function
+        return function
+
+    return register
+
+
+def metadata_hash(metadata: MetaData = Base.metadata) -> str:
+    """
+    :param metadata: the metadata to describe.
+    :returns: a hash of the tables, columns, keys, indexes and constraints of the
+        metadata, and of the names of the registered upgrade steps.
+    """
+    lines = []
+    for table in sorted(metadata.tables.values(), key=lambda table: table.name):
+        lines.append(f"table {table.name}")
+        for column in table.columns:
+            foreign_keys = sorted(key.target_fullname for key in column.foreign_keys)
+            lines.append(
+                f"column {column.name} {type(column.type).__name__} "
+                f"nullable={column.nullable} primary_key={column.primary_key} "
+                f"foreign_keys={foreign_keys}"
+            )
+        for index in sorted(table.indexes, key=lambda index: index.name or ""):
+            columns = [column.name for column in index.columns]
+            lines.append(f"index {index.name} {columns} unique={index.unique}")
+        for constraint in table.constraints:
+            if isinstance(constraint, UniqueConstraint):
+                lines.append(f"unique {sorted(column.name for column in constraint.columns)}")
+    lines.extend(f"upgrade {name}" for name in _upgrade_steps)
+    return hashlib.sha256("\n".join(lines).encode("utf-8")).hexdigest()
+
+
+def _lock_schema(connection: Connection) -> None:
+    """
+    Takes the write lock of the database until the end of the transaction, so
+    that processes starting together upgrade the schema one after the other.
+    """
+    if connection.dialect.name == "sqlite":
+        dbapi_connection = connection.connection.connection
+        # The aiosqlite adapter wraps the aiosqlite connection
+        driver = getattr(dbapi_connection, "_connection", dbapi_connection)
+        # The drivers only BEGIN before the first write on their own: an open
+        # transaction already holds the write lock
+        if not driver.in_transaction:
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+    elif connection.dialect.name == "postgresql":
+        connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": UPGRADE_LOCK_KEY})
+
+
+def _read_metadata_hash(connection: Connection) -> Optional[str]:
+    if not inspect(connection).has_table(SchemaInfo.name):
+        return None
+    return connection.execute(
+        select(SchemaInfo.c.value).where(SchemaInfo.c.key == METADATA_HASH_KEY)
+    ).scalar()
+
+
+def _read_schema_info(connection: Connection) -> Dict[str, str]:
+    if not inspect(connection).has_table(SchemaInfo.name):
+        return {}
+    return dict(connection.execute(select(SchemaInfo.c.key, SchemaInfo.c.value)).all())
+
+
+def _write_schema_info(connection: Connection, key: str, value: str, exists: bool) -> None:
+    if exists:
+        connection.execute(
+            SchemaInfo.update().where(SchemaInfo.c.key == key).values(value=value)
+        )
+    else:
+        connection.execute(SchemaInfo.insert().values(key=key, value=value))
+
+
+def _create_missing_columns(connection: Connection) -> None:
+    existing_tables = set(inspect(connection).get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {column["name"] for column in inspect(connection).get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            if not column.nullable and column.server_default is None:
+                raise ValueError(
+                    f"Can't add column '{table.name}.{column.name}' to existing rows: "
+                    "make it nullable or give it a server_default, or add it in an upgrade step."
+                )
+            logging.info(f"Adding column '{table.name}.{column.name}'")
+            definition = CreateColumn(column).compile(dialect=connection.dialect)
+            connection.exec_driver_sql(f'ALTER TABLE "{table.name}" ADD COLUMN {definition}')
+
+
+def _create_missing_indexes(connection: Connection) -> None:
+    # create_all() creates the indexes of new tables only
+    for table in Base.metadata.sorted_tables:
+        existing = {index["name"] for index in inspect(connection).get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                logging.info(f"Creating index '{index.name}' on table '{table.name}'")
+                index.create(connection)
+
+
+def upgrade_schema(connection: Connection) -> List[str]:
+    """
+    Brings the schema of the database up to date with the models: creates
+    the missing tables, columns and indexes, runs the upgrade steps that never
+    ran on it (see `upgrade_step()`), and stamps it with the current
+    `metadata_hash()`.
+
+    Columns are only added, never changed or dropped. New columns must be
+    nullable or have a `server_default`, to be added to the existing rows.
+
+    The write lock of the database is taken first, on SQLite and PostgreSQL.
+
+    :param connection: a connection, in the transaction to upgrade the schema in.
+    :returns: the names of the upgrade steps that ran.
+    :raises: ValueError if a missing column can't be added.
+    """
+    _lock_schema(connection)
+    Base.metadata.create_all(bind=connection)
+    _create_missing_columns(connection)
+    _create_missing_indexes(connection)
+
+    info = _read_schema_info(connection)
+    applied = []
+    for name, step in _upgrade_steps.items():
+        key = UPGRADE_KEY_PREFIX + name
+        if key in info:
+            continue
+        logging.info(f"Running upgrade step '{name}'")
+        step(connection)
+        _write_schema_info(connection, key, datetime.now().isoformat(), exists=False)
+        applied.append(name)
+
+    _write_schema_info(
+        connection, METADATA_HASH_KEY, metadata_hash(), exists=METADATA_HASH_KEY in info
+    )
+    return applied
+
+
+def ensure_schema(connection: Connection) -> bool:
+    """
+    Compares the hash stamped on the database with `metadata_hash()`, and
+    upgrades the schema only if they differ (see `upgrade_schema()`). An up to
+    date database costs a single lookup, instead of the inspection of every
+    table that `Base.metadata.create_all()` does.
+
+    `init_db()` and `init_db_async()` call it the first time they connect to
+    a database. With asyncio, run it with `AsyncConnection.run_sync()`.
+
+    Safe to run from several processes at once on SQLite and PostgreSQL: the
+    hash is checked again under the write lock, so only the first process
+    upgrades the schema.
+
+    :param connection: a connection, in the transaction to upgrade the schema in.
+    :returns: whether the schema was upgraded.
+    """
+    if _read_metadata_hash(connection) == metadata_hash():
+        return False
+    _lock_schema(connection)
+    # Another process may have upgraded it while this one waited for the lock
+    if _read_metadata_hash(connection) == metadata_hash():
+        return False
+    upgrade_schema(connection)
+    return True
+
+
+@upgrade_step("rebuild_card_stats")
+def _rebuild_card_stats(connection: Connection) -> None:
+    # Databases created before CardStats existed have reviews but no statistics
+    for stmt in _refresh_statements(None):
+        connection.execute(stmt)
+
+
+@upgrade_step("drop_card_state_counters")
+def _drop_card_state_counters(connection: Connection) -> None:
+    # CardStats counts the reviews: the counters of CardState were dropped, and
+    # new states can't be inserted while they're there, NOT NULL without default
+    existing = {column["name"] for column in inspect(connection).get_columns("card_states")}
+    for name in ("reviews_count", "lapses_count"):
+        if name in existing:
+            connection.exec_driver_sql(f'ALTER TABLE "card_states" DROP COLUMN "{name}"')
+
+
+def _guid_to_hex(value):
+    if value is None:
+        return None
+    if isinstance(value, bytes):
+        return "%.32x" % int.from_bytes(value, "big")
+    return "%.32x" % uuid.UUID(value).int
+
+
+def _guid_to_bytes(value):
+    if value is None:
+        return None
+    if isinstance(value, bytes):
+        return value
+    return uuid.UUID(value).bytes
+
+
+def migrate_guid_storage(
+    database_path: str,
+    storage: str = BINARY_16,
+    connect_args: Mapping[str, Any] = {},
+) -> List[str]:
+    """
+    Converts the GUID columns of an existing SQLite database to another
+    storage mode (see flashcards_core.guid:set_guid_storage()), and switches
+    this process to that mode.
+
+    Each table with GUID columns is rebuilt with the new column types, its
+    rows are copied converting each GUID, and its indexes are recreated, all
+    in a single transaction; the database is then vacuumed. Tables already in
+    the right mode are left alone, so running it twice is harmless. Back up
+    the database first anyway.
+
+    Example usage:
+
+    .. code-block:: python
+
+        from flashcards_core.guid import BINARY_16
+        from flashcards_core.database import init_db
+        from flashcards_core.database.migrations import migrate_guid_storage
+
+        migrate_guid_storage("sqlite:///flashcards.db", storage=BINARY_16)
+        sessionmaker = init_db("sqlite:///flashcards.db")
+
+    :param database_path: The database URL. Must be an SQLite database.
+    :param storage: the storage mode to convert to: `HEX` or `BINARY_16`.
+    :param connect_args: other arguments to pass to the SQLAlchemy engine.
+    :returns: the names of the tables that were converted.
+    :raises: ValueError if the storage mode is unknown or the database is not SQLite.
+    """
+    if storage not in (HEX, BINARY_16):
+        raise ValueError(f"Unknown GUID storage '{storage}', use '{HEX}' or '{BINARY_16}'.")
+    # future=True: no library-level autocommit after the DDL statements
+    engine = create_engine(database_path, connect_args=connect_args, future=True)
+    if engine.dialect.name != "sqlite":
+        engine.dispose()
+        raise ValueError("GUID storage can only be migrated on SQLite databases.")
+
+    converter = _guid_to_bytes if storage == BINARY_16 else _guid_to_hex
+    wanted = str(GUID(storage=storage).compile(dialect=engine.dialect))
+    target = MetaData()
+    for table in Base.metadata.sorted_tables:
+        copy = table.to_metadata(target)
+        for column in copy.c:
+            if isinstance(column.type, GUID):
+                column.type = GUID(storage=storage)
+
+    migrated = []
+    try:
+        # pysqlite commits DDL statements on its own unless transactions
+        # are managed by hand: BEGIN is emitted explicitly below
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            connection.connection.create_function("flashcards_guid", 1, converter)
+            # Tables are dropped and renamed while other tables point at them
+            connection.exec_driver_sql("PRAGMA foreign_keys=OFF")
+            connection.exec_driver_sql("BEGIN")
+            try:
+                existing = inspect(connection).get_table_names()
+                for table in list(target.sorted_tables):
+                    guid_columns = [c.name for c in table.c if isinstance(c.type, GUID)]
+                    if table.name not in existing or not guid_columns:
+                        continue
+                    declared = {
+                        column["name"]: str(column["type"])
+                        for column in inspect(connection).get_columns(table.name)
+                    }
+                    if all(declared.get(name) == wanted for name in guid_columns):
+                        continue
+
+                    logging.info(f"Converting the GUIDs of table '{table.name}' to {storage}")
+                    new_table = table.to_metadata(target, name=f"_new_{table.name}")
+                    connection.execute(CreateTable(new_table))
+                    columns = [column.name for column in table.c if column.name in declared]
+                    values = ", ".join(
+                        f'flashcards_guid("{name}")' if name in guid_columns else f'"{name}"'
+                        for name in columns
+                    )
+                    names = ", ".join(f'"{name}"' for name in columns)
+                    connection.exec_driver_sql(
+                        f'INSERT INTO "{new_table.name}" ({names}) '
+                        f'SELECT {values} FROM "{table.name}"'
+                    )
+                    connection.exec_driver_sql(f'DROP TABLE "{table.name}"')
+                    connection.exec_driver_sql(
+                        f'ALTER TABLE "{new_table.name}" RENAME TO "{table.name}"'
+                    )
+                    for index in table.indexes:
+                        index.create(connection)
+                    migrated.append(table.name)
+                connection.exec_driver_sql("COMMIT")
+            except BaseException:
+                connection.exec_driver_sql("ROLLBACK")
+                raise
+            if migrated:
+                # Give back the pages of the dropped tables
+                connection.exec_driver_sql("VACUUM")
+    finally:
+        engine.dispose()
+
+    set_guid_storage(storage)
+    return migrated
@@ -0,0 +1,128 @@
+from typing import List, Optional, Tuple
+
+import datetime
+from uuid import UUID
+from sqlalchemy import Column, ForeignKey, Index, DateTime, JSON, select
+from sqlalchemy.orm import relationship, Session
+from sqlalchemy_json import mutable_json_type
+
+from flashcards_core.guid import GUID
+from flashcards_core.database import Base
+from flashcards_core.database.crud import CrudOperations
+
+
+class CardState(Base, CrudOperations):
+    """
+    Scheduling state of a single card, updated incrementally by the
+    schedulers every time a card is reviewed, so that they never need
+    to replay the Reviews history to know where a card stands.
+
+    The reviews and the lapses of the card are counted by CardStats, from
+    the Reviews themselves: `Card.stats` has them.
+    """
+
+    __tablename__ = "card_states"
+    __table_args__ = (
+        # Serves "earliest due card of this deck" with an index seek
+        Index("ix_card_states_deck_id_due_at", "deck_id", "due_at"),
+    )
+
+    #: Primary key: each card has at most one state.
+    id = Column("card_id", GUID(), ForeignKey("cards.id"), primary_key=True)
+
+    #: The card this state belongs to
+    card = relationship("Card", back_populates="scheduling_state")
+
+    #: ID of the deck the card belonged to when it was last reviewed.
+    #: Lets schedulers read the states of a deck without joining the cards.
+    deck_id = Column(GUID(), ForeignKey("decks.id"), nullable=False, index=True)
+
+    #: Date and time of the last review of the card
+    last_review_at = Column(DateTime)
+
+    #: When the card should be reviewed next, for schedulers that compute it
+    due_at = Column(DateTime)
+
+    #: A JSON field containing the parameters of the memory model of the card,
+    #: if the SRS algorithm of the deck has one.
+    parameters = Column(
+        mutable_json_type(dbtype=JSON, nested=True), nullable=False, default={}
+    )
+
+    def __repr__(self):
+        return (
+            f"<CardState of card #{self.id}: last reviewed at {self.last_review_at},"
+            f" due at {self.due_at}>"
+        )
+
+    @classmethod
+    def for_card(cls, session: Session, card) -> "CardState":
+        """
+        Returns the state of the card, creating an empty one if the card has none.
+
+        Note: this method does not commit.
+
+        :param session: the session (see flashcards_core.database:init_db()).
+        :param card: the card whose state to return.
+        :returns: the state of the card.
+        """
+        state = card.scheduling_state
+        if state is None:
+            state = cls(id=card.id, deck_id=card.deck_id, parameters={})
+            card.scheduling_state = state
+            session.add(state)
+        return state
+
+    @classmethod
+    def record_review(
+        cls,
+        session: Session,
+        card,
+        review_time: datetime.datetime = None,
+    ) -> "CardState":
+        """
+        Updates the state of the card with a new review, creating the state
+        on the card's first review. The outcome of the review is counted by
+        CardStats, when its Review is stored.
+
+        Note: this method does not commit. The changes are persisted by the
+        next commit of the session, usually the one creating the Review.
+
+        :param session: the session (see flashcards_core.database:init_db()).
+        :param card: the card that was reviewed.
+        :param review_time: when the review happened. Defaults to now.
+        :returns: the updated state.
+        """
+        state = cls.for_card(session=session, card=card)
+        state.deck_id = card.deck_id
+        state.last_review_at = review_time or datetime.datetime.now()
+        return state
+
+    @classmethod
+    def due_cards(
+        cls,
+        session: Session,
+        deck_id: UUID,
+        due_before: datetime.datetime = None,
+        limit: Optional[int] = 1,
+    ) -> List[Tuple[datetime.datetime, UUID]]:
+        """
+        Returns the due times and IDs of the cards of a deck that are due
+        the earliest, in order. Cards without a due time are left out.
+
+        :param session: the session (see flashcards_core.database:init_db()).
+        :param deck_id: the ID of the deck to look into.
+        :param due_before: if given, only cards due at or before this time are returned.
+        :param limit: maximum number of cards to return. None returns them all.
+        :returns: a list of (due time, card ID) tuples, earliest first.
+        """
+        stmt = (
+            select(cls.due_at, cls.id)
+            .where(cls.deck_id == deck_id, cls.due_at.isnot(None))
+            .order_by(cls.due_at, cls.id)
+        )
+        if due_before is not None:
+            stmt = stmt.where(cls.due_at <= due_before)
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        return [tuple(row) for row in session.execute(stmt).all()]
@@ -0,0 +1,306 @@
+from typing import Any, Iterable, Optional
+
+from uuid import UUID
+from sqlalchemy import Column, ForeignKey, Integer, DateTime
+from sqlalchemy import case, event, func, insert, inspect, or_, select, update
+from sqlalchemy.orm import object_session, Session
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.util import identity_key
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from flashcards_core.guid import GUID
+from flashcards_core.database import Base
+from flashcards_core.database.crud import CrudOperations, BULK_CHUNK_SIZE
+from flashcards_core.database.transactions import commit, commit_async
+from flashcards_core.database.models.reviews import Review
+
+
+#: Results that count as failed reviews in CardStats, as stored in the
+#: database: `False` and `0` are stored as '0' by SQLite.
+FAILED_RESULTS = ("0", "False", "false", "")
+
+
+def is_successful(result: Any) -> bool:
+    """
+    :param result: the result of a Review, as given to the scheduler or
+        as stored in the database.
+    :returns: whether CardStats counts it as a successful review.
+    """
+    return bool(result) and str(result) not in FAILED_RESULTS
+
+
+class CardStats(Base, CrudOperations):
+    """
+    Review statistics of a single card, kept up to date whenever Reviews
+    are created, modified or deleted, both through the ORM and through the
+    `bulk_*` methods of Review, so that they can be read without loading
+    the card's reviews.
+
+    CardStats counts every Review of the card, whatever the algorithm, and
+    it's the only place where they are counted: CardState only holds what
+    the schedulers need to schedule the card. A card that was never reviewed
+    may have no CardStats at all.
+
+    Statistics already loaded in the session, by themselves or as `Card.stats`,
+    are reloaded when a flush changes them. The `bulk_*` methods and `refresh()`
+    don't reload them: use `session.refresh()`.
+    """
+
+    __tablename__ = "card_stats"
+
+    #: Primary key: each card has at most one row of statistics.
+    id = Column("card_id", GUID(), ForeignKey("cards.id"), primary_key=True)
+
+    #: How many times the card has been reviewed
+    reviews_count = Column(Integer, nullable=False, default=0)
+
+    #: How many reviews of the card were successful (see `is_successful()`)
+    successes_count = Column(Integer, nullable=False, default=0)
+
+    #: Date and time of the most recent review of the card
+    last_review_at = Column(DateTime)
+
+    def __repr__(self):
+        return (
+            f"<CardStats of card #{self.id}: {self.successes_count}/{self.reviews_count}"
+            f" successful reviews, last at {self.last_review_at}>"
+        )
+
+    @property
+    def failures_count(self) -> int:
+        """
+        How many reviews of the card were failed.
+        """
+        return self.reviews_count - self.successes_count
+
+    @property
+    def success_ratio(self) -> Optional[float]:
+        """
+        The fraction of successful reviews, or None if the card has no reviews.
+        """
+        if not self.reviews_count:
+            return None
+        return self.successes_count / self.reviews_count
+
+    @classmethod
+    def refresh(cls, session: Session, card_ids: Optional[Iterable[UUID]] = None) -> None:
+        """
+        Recomputes the statistics of the given cards from their Reviews, with
+        a couple of set-based statements for each chunk of BULK_CHUNK_SIZE cards.
+
+        Note: this method does not commit.
+
+        :param session: the session (see flashcards_core.database:init_db()).
+        :param card_ids: the IDs of the cards to recompute. Defaults to all cards.
+        """
+        for stmt in _refresh_statements(card_ids):
+            session.execute(stmt)
+
+    @classmethod
+    async def refresh_async(
+        cls, session: AsyncSession, card_ids: Optional[Iterable[UUID]] = None
+    ) -> None:
+        """
+        Recomputes the statistics of the given cards from their Reviews
+        (asyncio friendly). See `refresh()`.
+
+        Note: this method does not commit.
+
+        :param session: the session (see flashcards_core.database:init_db_async()).
+        :param card_ids: the IDs of the cards to recompute. Defaults to all cards.
+        """
+        for stmt in _refresh_statements(card_ids):
+            await session.execute(stmt)
+
+    @classmethod
+    def rebuild(cls, session: Session) -> None:
+        """
+        Recomputes the statistics of all the cards from their Reviews, for
+        example after Reviews were written without going through the models.
+
+        :param session: the session (see flashcards_core.database:init_db()).
+        """
+        cls.refresh(session=session)
+        commit(session)
+
+    @classmethod
+    async def rebuild_async(cls, session: AsyncSession) -> None:
+        """
+        Recomputes the statistics of all the cards from their Reviews
+        (asyncio friendly). See `rebuild()`.
+
+        :param session: the session (see flashcards_core.database:init_db_async()).
+        """
+        await cls.refresh_async(session=session)
+        await commit_async(session)
+
+
+def _success_count():
+    """
+    SQL expression counting the successful reviews in a group of Reviews.
+    """
+    return func.coalesce(
+        func.sum(case((Review.result.notin_(FAILED_RESULTS), 1), else_=0)), 0
+    )
+
+
+def _refresh_statements(card_ids: Optional[Iterable[UUID]], insert_missing: bool = True):
+    """
+    Yields the statements recomputing the statistics of the given cards
+    (of all cards if None): an UPDATE of the existing rows and, if
+    `insert_missing`, an INSERT of the rows of the cards that have Reviews
+    but no statistics yet.
+    """
+    stats = CardStats.__table__
+    chunks = [None]
+    if card_ids is not None:
+        card_ids = [card_id for card_id in dict.fromkeys(card_ids) if card_id is not None]
+        chunks = [
+            card_ids[start : start + BULK_CHUNK_SIZE]
+            for start in range(0, len(card_ids), BULK_CHUNK_SIZE)
+        ]
+
+    for chunk in chunks:
+        stmt = update(stats).values(
+            reviews_count=select(func.count())
+            .select_from(Review)
+            .where(Review.card_id == stats.c.card_id)
+            .scalar_subquery(),
+            successes_count=select(_success_count())
+            .where(Review.card_id == stats.c.card_id)
+            .scalar_subquery(),
+            last_review_at=select(func.max(Review.datetime))
+            .where(Review.card_id == stats.c.card_id)
+            .scalar_subquery(),
+        )
+        if chunk is not None:
+            stmt = stmt.where(stats.c.card_id.in_(chunk))
+        yield stmt
+
+        if insert_missing:
+            aggregates = (
+                select(
+                    Review.card_id,
+                    func.count(),
+                    _success_count(),
+                    func.max(Review.datetime),
+                )
+                .where(Review.card_id.isnot(None), Review.card_id.notin_(select(stats.c.card_id)))
+                .group_by(Review.card_id)
+            )
+            if chunk is not None:
+                aggregates = aggregates.where(Review.card_id.in_(chunk))
+            yield insert(stats).from_select(
+                ["card_id", "reviews_count", "successes_count", "last_review_at"], aggregates
+            )
+
+
+#: Key of `session.info` holding the IDs of the cards whose statistics changed in the current flush
+STALE_STATS = "flashcards_core_stale_card_stats"
+
+
+def _mark_stale_stats(review: Review, card_ids: Iterable[UUID]) -> None:
+    session = object_session(review)
+    if session is not None:
+        session.info.setdefault(STALE_STATS, set()).update(
+            card_id for card_id in card_ids if card_id is not None
+        )
+
+
+@event.listens_for(Session, "after_flush_postexec")
+def _reload_stale_stats(session: Session, flush_context) -> None:
+    """
+    Reloads the statistics that the flush changed, if the session holds them,
+    loaded by themselves or as `Card.stats`. Reloading instead of expiring
+    them keeps them readable in asyncio sessions.
+    """
+    card_ids = session.info.pop(STALE_STATS, None)
+    if not card_ids:
+        return
+    card_class = Review.card.property.mapper.class_
+    cards = {}
+    stale_ids = []
+    for card_id in card_ids:
+        card = session.identity_map.get(identity_key(card_class, card_id))
+        if card is not None and "stats" in inspect(card).dict:
+            cards[card_id] = card
+        if card_id in cards or identity_key(CardStats, card_id) in session.identity_map:
+            stale_ids.append(card_id)
+    if not stale_ids:
+        return
+    reloaded = session.execute(
+        select(CardStats)
+        .where(CardStats.id.in_(stale_ids))
+        .execution_options(populate_existing=True)
+    )
+    stats_by_card = {stats.id: stats for stats in reloaded.scalars()}
+    for card_id, card in cards.items():
+        set_committed_value(card, "stats", stats_by_card.get(card_id))
+
+
+@event.listens_for(Review, "after_insert")
+def _count_new_review(mapper, connection, review: Review) -> None:
+    """
+    Adds a new Review to the statistics of its card: a single UPDATE, or
+    an INSERT on the card's first review.
+    """
+    if review.card_id is None:
+        return
+    _mark_stale_stats(review, [review.card_id])
+    stats = CardStats.__table__
+    successes = 1 if is_successful(review.result) else 0
+    result = connection.execute(
+        update(stats)
+        .where(stats.c.card_id == review.card_id)
+        .values(
+            reviews_count=stats.c.reviews_count + 1,
+            successes_count=stats.c.successes_count + successes,
+            last_review_at=case(
+                (
+                    or_(
+                        stats.c.last_review_at.is_(None),
+                        stats.c.last_review_at < review.datetime,
+                    ),
+                    review.datetime,
+                ),
+                else_=stats.c.last_review_at,
+            ),
+        )
+    )
+    if result.rowcount == 0:
+        connection.execute(
+            insert(stats).values(
+                card_id=review.card_id,
+                reviews_count=1,
+                successes_count=successes,
+                last_review_at=review.datetime,
+            )
+        )
+
+
+@event.listens_for(Review, "after_update")
+def _recount_modified_review(mapper, connection, review: Review) -> None:
+    """
+    Recomputes the statistics of the card of a modified Review, and of the
+    card it belonged to before, if it was moved.
+    """
+    state = inspect(review)
+    if not any(
+        state.attrs[name].history.has_changes() for name in ("card_id", "result", "datetime")
+    ):
+        return
+    card_ids = [review.card_id, *state.attrs.card_id.history.deleted]
+    _mark_stale_stats(review, card_ids)
+    for stmt in _refresh_statements(card_ids):
+        connection.execute(stmt)
+
+
+@event.listens_for(Review, "after_delete")
+def _recount_deleted_review(mapper, connection, review: Review) -> None:
+    """
+    Recomputes the statistics of the card of a deleted Review. No row is
+    inserted, as the card itself may be being deleted in the same flush.
+    """
+    _mark_stale_stats(review, [review.card_id])
+    for stmt in _refresh_statements([review.card_id], insert_missing=False):
+        connection.execute(stmt)
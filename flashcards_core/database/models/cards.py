@@ -1,12 +1,15 @@
 from typing import List
 
-from uuid import uuid4, UUID
-from sqlalchemy import Column, ForeignKey, Table, String, and_
+from uuid import UUID
+from sqlalchemy import Column, ForeignKey, Index, Table, String, and_, event, inspect
 from sqlalchemy.orm import relationship, Session, backref
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from flashcards_core.guid import GUID
+from flashcards_core.guid import GUID, IdDefault
 from flashcards_core.database import Base
-from flashcards_core.database.crud import CrudOperations
+from flashcards_core.database.crud import CrudOperations, LEAN, RENDER, FULL
+from flashcards_core.database.tagging import TagOperations
+from flashcards_core.database.transactions import commit, commit_async
 
 
 #: Associative table for Cards and Tags
@@ -15,6 +18,8 @@ CardTag = Table(
     Base.metadata,
     Column("card_id", GUID(), ForeignKey("cards.id"), primary_key=True),
     Column("tag_id", GUID(), ForeignKey("tags.id"), primary_key=True),
+    # The primary key serves lookups by card: this one serves lookups by tag
+    Index("ix_cardtags_tag_id_card_id", "tag_id", "card_id"),
 )
 
 #: Associative table for Cards and question context Facts
@@ -43,23 +48,24 @@ RelatedCard = Table(
 )
 
 
-class Card(Base, CrudOperations):
+class Card(Base, CrudOperations, TagOperations):
     __tablename__ = "cards"
 
     #: Primary key
-    id = Column(GUID(), primary_key=True, index=True, default=uuid4)
+    id = Column(GUID(), primary_key=True, index=True, default=IdDefault("cards"))
 
     #: ID to the deck this card belongs to.
     #: Note that this is a one-to-many repationship because it
     #: should be easy to copy cards.
     #: Cards hold no actual data: it's just an associative table
-    deck_id = Column(GUID(), ForeignKey("decks.id"), nullable=False)
+    deck_id = Column(GUID(), ForeignKey("decks.id"), nullable=False, index=True)
 
     #: The deck this card belongs to.
     #: Note that this is a one-to-many repationship because it
     #: should be easy to copy cards.
     #: Cards hold no actual data: it's just an associative table
-    deck = relationship("Deck", foreign_keys="Card.deck_id", lazy='selectin')
+    #: Loaded only on access.
+    deck = relationship("Deck", foreign_keys="Card.deck_id")
 
     #: ID of the fact containing the question of this card.
     question_id = Column(GUID(), ForeignKey("facts.id"), nullable=False)
@@ -82,21 +88,41 @@ class Card(Base, CrudOperations):
     answer_context_facts = relationship("Fact", secondary="card_answer_contextes", lazy='selectin')
 
     #: All the cards that are somehow related to the current one
-    #: Relationships are named (to help discoverability), see RelatedCards
+    #: Relationships are named (to help discoverability), see RelatedCards.
+    #: Loaded only on access: related cards have related cards of their own.
     related_cards = relationship(
         "Card",
         secondary=RelatedCard,
         primaryjoin=(RelatedCard.c.original_card_id == id),
         secondaryjoin=(RelatedCard.c.related_card_id == id),
-        backref=backref("original_card_id"), 
-        lazy='selectin')
+        backref=backref("original_card_id"))
 
     #: All the reviews done on this card.
-    reviews = relationship("Review", cascade="all,delete", back_populates="card", lazy='selectin')
+    #: Loaded only on access: they grow with every review.
+    reviews = relationship("Review", cascade="all,delete", back_populates="card")
 
     #: All the tags assigned to this card
     tags = relationship("Tag", secondary="cardtags", lazy='selectin')
 
+    #: The scheduling state of this card, if it was ever reviewed.
+    #: Loaded only on access: schedulers query the states directly.
+    scheduling_state = relationship(
+        "CardState", cascade="all,delete", back_populates="card", uselist=False
+    )
+
+    #: The review statistics of this card, if it was ever reviewed (see CardStats).
+    #: Loaded only on access.
+    stats = relationship("CardStats", cascade="all,delete", uselist=False)
+
+    #: Relationships loaded by each loading profile (see CrudOperations).
+    #: Rendering a card needs its facts and tags, but not its reviews,
+    #: its deck or its related cards.
+    LOADING_PROFILES = {
+        LEAN: [],
+        RENDER: ["question", "answer", "question_context_facts", "answer_context_facts", "tags"],
+        FULL: None,
+    }
+
     def __repr__(self):
         return f"<Card (ID: {self.id}, deck ID: {self.deck_id})>"
 
@@ -109,20 +135,18 @@ class Card(Base, CrudOperations):
         """
         insert = CardTag.insert().values(card_id=self.id, tag_id=tag_id)
         session.execute(insert)
-        session.commit()
-        session.refresh(self)
+        commit(session, self)
 
-    async def assign_tag_async(self, session: Session, tag_id: UUID) -> None:
+    async def assign_tag_async(self, session: AsyncSession, tag_id: UUID) -> None:
         """
         Assign the given Tag to this Card (asyncio friendly).
 
         :param tag_id: the name of the Tag to assign to the Card.
-        :param session: the session (see flashcards_core.database:init_db())
+        :param session: the session (see flashcards_core.database:init_db_async())
         """
         insert = CardTag.insert().values(card_id=self.id, tag_id=tag_id)
         await session.execute(insert)
-        await session.commit()
-        await session.refresh(self)
+        await commit_async(session, self)
 
     def remove_tag(self, session: Session, tag_id: UUID) -> None:
         """
@@ -131,22 +155,24 @@ class Card(Base, CrudOperations):
         :param tag_id: the ID of the connection between a tag and a card.
         :param session: the session (see flashcards_core.database:init_db()).
         """
-        delete = CardTag.delete().where(CardTag.c.tag_id == tag_id)
+        delete = CardTag.delete().where(
+            and_(CardTag.c.card_id == self.id, CardTag.c.tag_id == tag_id)
+        )
         session.execute(delete)
-        session.commit()
-        session.refresh(self)
+        commit(session, self)
 
-    async def remove_tag_async(self, session: Session, tag_id: UUID) -> None:
+    async def remove_tag_async(self, session: AsyncSession, tag_id: UUID) -> None:
         """
         Remove the given Tag from this Card (asyncio friendly).
 
         :param tag_id: the ID of the connection between a tag and a card.
-        :param session: the session (see flashcards_core.database:init_db()).
+        :param session: the session (see flashcards_core.database:init_db_async()).
         """
-        delete = CardTag.delete().where(CardTag.c.tag_id == tag_id)
+        delete = CardTag.delete().where(
+            and_(CardTag.c.card_id == self.id, CardTag.c.tag_id == tag_id)
+        )
         await session.execute(delete)
-        await session.commit()
-        await session.refresh(self)
+        await commit_async(session, self)
 
     def assign_question_context(self, session: Session, fact_id: UUID) -> None:
         """
@@ -158,21 +184,19 @@ class Card(Base, CrudOperations):
         """
         insert = CardQuestionContext.insert().values(card_id=self.id, fact_id=fact_id)
         session.execute(insert)
-        session.commit()
-        session.refresh(self)
+        commit(session, self)
 
-    async def assign_question_context_async(self, session: Session, fact_id: UUID) -> None:
+    async def assign_question_context_async(self, session: AsyncSession, fact_id: UUID) -> None:
         """
         Assign the given Fact as context to the Question to this Card (asyncio friendly).
 
         :param fact_id: the name of the Fact to assign as context to the question
             of this card.
-        :param session: the session (see flashcards_core.database:init_db()).
+        :param session: the session (see flashcards_core.database:init_db_async()).
         """
         insert = CardQuestionContext.insert().values(card_id=self.id, fact_id=fact_id)
         await session.execute(insert)
-        await session.commit()
-        await session.refresh(self)
+        await commit_async(session, self)
 
     def remove_question_context(self, session: Session, fact_id: UUID) -> None:
         """
@@ -182,25 +206,29 @@ class Card(Base, CrudOperations):
         :param session: the session (see flashcards_core.database:init_db()).
         """
         delete = CardQuestionContext.delete().where(
-            CardQuestionContext.c.fact_id == fact_id
+            and_(
+                CardQuestionContext.c.card_id == self.id,
+                CardQuestionContext.c.fact_id == fact_id,
+            )
         )
         session.execute(delete)
-        session.commit()
-        session.refresh(self)
+        commit(session, self)
 
-    async def remove_question_context_async(self, session: Session, fact_id: UUID) -> None:
+    async def remove_question_context_async(self, session: AsyncSession, fact_id: UUID) -> None:
         """
         Remove the given Fact as a context for the Question from this Card (asyncio friendly).
 
         :param fact_id: the ID of the fact to remove from the answer's context
-        :param session: the session (see flashcards_core.database:init_db()).
+        :param session: the session (see flashcards_core.database:init_db_async()).
         """
         delete = CardQuestionContext.delete().where(
-            CardQuestionContext.c.fact_id == fact_id
+            and_(
+                CardQuestionContext.c.card_id == self.id,
+                CardQuestionContext.c.fact_id == fact_id,
+            )
         )
         await session.execute(delete)
-        await session.commit()
-        await session.refresh(self)
+        await commit_async(session, self)
 
     def assign_answer_context(self, session: Session, fact_id: UUID) -> None:
         """
@@ -212,21 +240,19 @@ class Card(Base, CrudOperations):
         """
         insert = CardAnswerContext.insert().values(card_id=self.id, fact_id=fact_id)
         session.execute(insert)
-        session.commit()
-        session.refresh(self)
+        commit(session, self)
 
-    async def assign_answer_context_async(self, session: Session, fact_id: UUID) -> None:
+    async def assign_answer_context_async(self, session: AsyncSession, fact_id: UUID) -> None:
         """
         Assign the given Fact as context to the Answer to this Card (asyncio friendly).
 
         :param fact_id: the name of the Fact to assign as context to the answer
             of this card.
-        :param session: the session (see flashcards_core.database:init_db()).
+        :param session: the session (see flashcards_core.database:init_db_async()).
         """
         insert = CardAnswerContext.insert().values(card_id=self.id, fact_id=fact_id)
         await session.execute(insert)
-        await session.commit()
-        await session.refresh(self)
+        await commit_async(session, self)
 
     def remove_answer_context(self, session: Session, fact_id: UUID) -> None:
         """
@@ -236,28 +262,26 @@ class Card(Base, CrudOperations):
         :param session: the session (see flashcards_core.database:init_db()).
         """
         delete = CardAnswerContext.delete().where(
-            CardAnswerContext.c.fact_id == fact_id
+            and_(CardAnswerContext.c.card_id == self.id, CardAnswerContext.c.fact_id == fact_id)
         )
         session.execute(delete)
-        session.commit()
-        session.refresh(self)
+        commit(session, self)
 
-    async def remove_answer_context_async(self, session: Session, fact_id: UUID) -> None:
+    async def remove_answer_context_async(self, session: AsyncSession, fact_id: UUID) -> None:
         """
         Remove the given Fact as a context for the Answer from this Card (asyncio friendly).
 
         :param fact_id: the ID of the fact to remove from the answer's context
-        :param session: the session (see flashcards_core.database:init_db()).
+        :param session: the session (see flashcards_core.database:init_db_async()).
         """
         delete = CardAnswerContext.delete().where(
-            CardAnswerContext.c.fact_id == fact_id
+            and_(CardAnswerContext.c.card_id == self.id, CardAnswerContext.c.fact_id == fact_id)
         )
         await session.execute(delete)
-        await session.commit()
-        await session.refresh(self)
+        await commit_async(session, self)
 
 
-    async def related_cards_async(self, session: Session) -> List["Card"]:
+    async def related_cards_async(self, session: AsyncSession) -> List["Card"]:
         """
         Returns all the related cards pairs in an asyncio friendly way.
 
@@ -287,21 +311,21 @@ class Card(Base, CrudOperations):
         """
         insert = RelatedCard.insert().values(original_card_id=self.id, related_card_id=card_id, relationship=relationship)
         session.execute(insert)
-        session.commit()
-        session.refresh(self)
+        commit(session, self)
 
-    async def assign_related_card_async(self, session: Session, card_id: UUID, relationship: str) -> None:
+    async def assign_related_card_async(
+        self, session: AsyncSession, card_id: UUID, relationship: str
+    ) -> None:
         """
         Create a relationship between these two Cards (asyncio friendly).
 
         :param card_id: the name of the other Card.
         :param relationship: the type of relationship between these Cards
-        :param session: the session (see flashcards_core.database:init_db()).
+        :param session: the session (see flashcards_core.database:init_db_async()).
         """
         insert = RelatedCard.insert().values(original_card_id=self.id, related_card_id=card_id, relationship=relationship)
         await session.execute(insert)
-        await session.commit()
-        await session.refresh(self)
+        await commit_async(session, self)
 
     def remove_related_card(self, session: Session, card_id: UUID) -> None:
         """
@@ -310,19 +334,83 @@ class Card(Base, CrudOperations):
         :param card_id: the ID of the relationship between these two Cards
         :param session: the session (see flashcards_core.database:init_db()).
         """
-        delete = RelatedCard.delete().where(and_(RelatedCard.c.related_card_id == card_id, RelatedCard.c.relationship == relationship))
+        delete = RelatedCard.delete().where(
+            and_(
+                RelatedCard.c.original_card_id == self.id,
+                RelatedCard.c.related_card_id == card_id,
+            )
+        )
         session.execute(delete)
-        session.commit()
-        session.refresh(self)
+        commit(session, self)
 
-    async def remove_related_card_async(self, session: Session, card_id: UUID) -> None:
+    async def remove_related_card_async(self, session: AsyncSession, card_id: UUID) -> None:
         """
         Remove the relationship between these two Cards (asyncio friendly)
 
         :param card_id: the ID of the relationship between these two Cards
-        :param session: the session (see flashcards_core.database:init_db()).
+        :param session: the session (see flashcards_core.database:init_db_async()).
         """
-        delete = RelatedCard.delete().where(and_(RelatedCard.c.related_card_id == card_id, RelatedCard.c.relationship == relationship))
+        delete = RelatedCard.delete().where(
+            and_(
+                RelatedCard.c.original_card_id == self.id,
+                RelatedCard.c.related_card_id == card_id,
+            )
+        )
         await session.execute(delete)
-        await session.commit()
-        await session.refresh(self)
\ No newline at end of file
+        await commit_async(session, self)
+
+
+#: Key of `session.info` holding the version of the cards seen by the session
+CARDS_VERSION = "flashcards_core_cards_version"
+
+#: Tables whose changes can add cards to a deck, remove them, or change their tags
+_CARDS_TABLES = ("cards", "cardtags", "tags")
+
+
+def cards_version(session: Session) -> int:
+    """
+    Returns a number that changes every time the session creates, deletes,
+    moves or retags cards, or renames or deletes tags. Changes made by other
+    sessions are not seen.
+
+    :param session: the session (see flashcards_core.database:init_db()).
+    """
+    return getattr(session, "sync_session", session).info.get(CARDS_VERSION, 0)
+
+
+def _bump_cards_version(session: Session) -> None:
+    session.info[CARDS_VERSION] = session.info.get(CARDS_VERSION, 0) + 1
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _watch_cards_statements(orm_execute_state) -> None:
+    """
+    Bumps the cards version on the INSERT, UPDATE and DELETE statements
+    on the cards, their tags, and the tags themselves.
+    """
+    if orm_execute_state.is_select:
+        return
+    table = getattr(orm_execute_state.statement, "table", None)
+    if getattr(table, "name", None) in _CARDS_TABLES:
+        _bump_cards_version(orm_execute_state.session)
+
+
+@event.listens_for(Session, "after_flush")
+def _watch_cards_flushes(session: Session, flush_context) -> None:
+    """
+    Bumps the cards version when a flush creates or deletes cards or tags,
+    moves or retags cards, or renames tags.
+    """
+    changed = any(isinstance(obj, Card) for obj in session.new) or any(
+        getattr(obj, "__tablename__", None) in ("cards", "tags") for obj in session.deleted
+    )
+    for obj in session.dirty:
+        if changed:
+            break
+        if isinstance(obj, Card):
+            attrs = inspect(obj).attrs
+            changed = attrs.deck_id.history.has_changes() or attrs.tags.history.has_changes()
+        elif getattr(obj, "__tablename__", None) == "tags":
+            changed = inspect(obj).attrs.name.history.has_changes()
+    if changed:
+        _bump_cards_version(session)
@@ -1,14 +1,20 @@
 from typing import Any, List, Optional
 from unittest import result
 
-from uuid import uuid4, UUID
-from sqlalchemy import Column, ForeignKey, String, Table, JSON, select
-from sqlalchemy.orm import relationship, Session
+import random
+from uuid import UUID
+from sqlalchemy import Column, ForeignKey, Index, String, Table, JSON, and_, select, exists, func
+from sqlalchemy.orm import relationship, Session, object_session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy_json import mutable_json_type
 
-from flashcards_core.guid import GUID
+from flashcards_core.guid import GUID, IdDefault
 from flashcards_core.database import Base
-from flashcards_core.database.crud import CrudOperations
+from flashcards_core.database.crud import CrudOperations, NameOperations, LEAN, RENDER, FULL
+from flashcards_core.database.tagging import TagOperations
+from flashcards_core.database.transactions import commit, commit_async
+from flashcards_core.database.models.cards import Card
+from flashcards_core.database.models.reviews import Review
 
 
 #: Associative table for Decks and Tags
@@ -17,14 +23,16 @@ DeckTag = Table(
     Base.metadata,
     Column("deck_id", GUID(), ForeignKey("decks.id"), primary_key=True),
     Column("tag_id", GUID(), ForeignKey("tags.id"), primary_key=True),
+    # The primary key serves lookups by deck: this one serves lookups by tag
+    Index("ix_decktags_tag_id_deck_id", "tag_id", "deck_id"),
 )
 
 
-class Deck(Base, CrudOperations):
+class Deck(Base, CrudOperations, NameOperations, TagOperations):
     __tablename__ = "decks"
 
     #: Primary key
-    id = Column(GUID(), primary_key=True, index=True, default=uuid4)
+    id = Column(GUID(), primary_key=True, index=True, default=IdDefault("decks"))
 
     #: Name of the deck (short)
     name = Column(String, unique=True, nullable=False)
@@ -33,7 +41,7 @@ class Deck(Base, CrudOperations):
     description = Column(String)
 
     #: The SRS algorithm to use to review the cards in this deck.
-    #: See flashcards_core.schedulers.SCHEDULERS for valid keys.
+    #: See flashcards_core.schedulers.get_available_schedulers() for valid keys.
     algorithm = Column(String, nullable=False)
 
     #: A JSON field containing the SRS parameters of the deck.
@@ -50,70 +58,159 @@ class Deck(Base, CrudOperations):
         mutable_json_type(dbtype=JSON, nested=True), nullable=False, default={}
     )
 
-    #: All the cards that belong to this deck
-    cards = relationship("Card", cascade="all,delete", back_populates="deck", lazy='selectin')
+    #: All the cards that belong to this deck.
+    #: Loaded only on access: the schedulers query the cards they need instead.
+    cards = relationship("Card", cascade="all,delete", back_populates="deck")
 
     #: All the tags assigned to this deck
     tags = relationship("Tag", secondary="decktags", lazy='selectin')
 
+    #: Relationships loaded by each loading profile (see CrudOperations).
+    #: Rendering a deck doesn't need its cards.
+    LOADING_PROFILES = {LEAN: [], RENDER: ["tags"], FULL: None}
+
     def __repr__(self):
         return f"<Deck '{self.name}' (ID: {self.id})>"
 
-    @classmethod
-    def get_by_name(cls, session: Session, name: str) -> Optional[Any]:
+    def _unseen_cards_clause(self):
         """
-        Returns the deck corresponding to the given name.
-
-        :param session: the session (see flashcards_core.database:init_db()).
-        :param name: the name of the model object to return.
-        :returns: the matching model object.
+        SQL condition matching the cards of this deck that have no Reviews.
+        Uses a NOT EXISTS anti-join on the indexed `reviews.card_id` column,
+        so no card or review needs to be loaded to evaluate it.
         """
-        return session.query(Deck).filter(Deck.name == name).first()
+        return (Card.deck_id == self.id) & ~exists().where(Review.card_id == Card.id)
 
-    @classmethod
-    async def get_by_name_async(cls, session: Session, name: str) -> Optional[Any]:
+    def unseen_cards_list(self, session: Session = None) -> List[Any]:
         """
-        Returns the deck corresponding to the given name (asyncio friendly).
+        Return a list of all the cards belonging to this deck that have no Reviews,
+        which means they have never been seen/reviewed.
 
         :param session: the session (see flashcards_core.database:init_db()).
-        :param name: the name of the model object to return.
-        :returns: the matching model object.
+            Defaults to the session this deck is attached to.
         """
-        stmt = select(Deck).where(Deck.name == name)
-        results = session.execute(stmt)
-        return results.first()
+        session = session or object_session(self)
+        stmt = select(Card).where(self._unseen_cards_clause())
+        return session.execute(stmt).scalars().all()
 
-    def unseen_cards_list(self) -> List[Any]:
+    async def unseen_cards_list_async(self, session: AsyncSession) -> List[Any]:
         """
         Return a list of all the cards belonging to this deck that have no Reviews,
-        which means they have never been seen/reviewed.
+        which means they have never been seen/reviewed (asyncio friendly).
+
+        :param session: the session (see flashcards_core.database:init_db_async()).
         """
-        # FIXME Redo as a proper SQL query!!!
-        return [card for card in self.cards if len(card.reviews) == 0]
+        stmt = select(Card).where(self._unseen_cards_clause())
+        results = await session.scalars(stmt)
+        return results.all()
 
-    async def unseen_cards_list_async(self) -> List[Any]:
+    def unseen_cards_number(self, session: Session = None) -> int:
         """
-        Return a list of all the cards belonging to this deck that have no Reviews,
+        Return the number of cards belonging to this deck that have no Reviews,
         which means they have never been seen/reviewed.
+
+        Runs a COUNT query: no card is loaded.
+
+        :param session: the session (see flashcards_core.database:init_db()).
+            Defaults to the session this deck is attached to.
         """
-        # FIXME Redo as a proper SQL query!!!
-        return [card for card in self.cards if len(card.reviews) == 0]
+        session = session or object_session(self)
+        stmt = select(func.count()).select_from(Card).where(self._unseen_cards_clause())
+        return session.execute(stmt).scalar()
 
-    def unseen_cards_number(self) -> int:
+    async def unseen_cards_number_async(self, session: AsyncSession) -> int:
         """
         Return the number of cards belonging to this deck that have no Reviews,
-        which means they have never been seen/reviewed.
+        which means they have never been seen/reviewed (asyncio friendly).
+
+        Runs a COUNT query: no card is loaded.
+
+        :param session: the session (see flashcards_core.database:init_db_async()).
         """
-        # FIXME Redo as a proper SQL query!!!
-        return len([card for card in self.cards if len(card.reviews) == 0])
+        stmt = select(func.count()).select_from(Card).where(self._unseen_cards_clause())
+        results = await session.execute(stmt)
+        return results.scalar()
 
-    async def unseen_cards_number_async(self) -> int:
+    def cards_number(self, session: Session = None) -> int:
         """
-        Return the number of cards belonging to this deck that have no Reviews,
-        which means they have never been seen/reviewed.
+        Return the number of cards belonging to this deck, without loading them.
+
+        :param session: the session (see flashcards_core.database:init_db()).
+            Defaults to the session this deck is attached to.
         """
-        # FIXME Redo as a proper SQL query!!!
-        return len([card for card in self.cards if len(card.reviews) == 0])
+        session = session or object_session(self)
+        stmt = select(func.count()).select_from(Card).where(Card.deck_id == self.id)
+        return session.execute(stmt).scalar()
+
+    def random_card(
+        self,
+        session: Session = None,
+        unseen_only: bool = False,
+        exclude_card_id: Optional[UUID] = None,
+    ) -> Optional[Any]:
+        """
+        Return a random card of this deck, picked by the database.
+
+        The candidates are counted, a random offset is drawn, and only the
+        ID found at that offset is read: the deck's cards are never loaded,
+        only the returned card is, without its relationships (they are
+        loaded on access).
+
+        :param session: the session (see flashcards_core.database:init_db()).
+            Defaults to the session this deck is attached to.
+        :param unseen_only: pick only among the cards that have no Reviews.
+        :param exclude_card_id: the ID of a card that should never be picked.
+        :returns: a Card, or None if there are no candidates.
+        """
+        cards = self.random_cards(
+            session=session,
+            number=1,
+            unseen_only=unseen_only,
+            exclude_card_ids=[exclude_card_id] if exclude_card_id is not None else None,
+        )
+        return cards[0] if cards else None
+
+    def random_cards(
+        self,
+        session: Session = None,
+        number: int = 1,
+        unseen_only: bool = False,
+        exclude_card_ids: Optional[List[UUID]] = None,
+        where: Optional[Any] = None,
+    ) -> List[Any]:
+        """
+        Return up to `number` distinct random cards of this deck, picked by
+        the database like in `random_card()`.
+
+        :param session: the session (see flashcards_core.database:init_db()).
+            Defaults to the session this deck is attached to.
+        :param number: how many cards to return at most.
+        :param unseen_only: pick only among the cards that have no Reviews.
+        :param exclude_card_ids: the IDs of cards that should never be picked.
+        :param where: an SQL condition the cards must match too.
+        :returns: a list of Cards, shorter than `number` if there are not
+            enough candidates.
+        """
+        session = session or object_session(self)
+        if unseen_only:
+            clause = self._unseen_cards_clause()
+        else:
+            clause = Card.deck_id == self.id
+        if exclude_card_ids:
+            clause = clause & Card.id.notin_(exclude_card_ids)
+        if where is not None:
+            clause = clause & where
+
+        count_stmt = select(func.count()).select_from(Card).where(clause)
+        candidates = session.execute(count_stmt).scalar()
+        if not candidates or number < 1:
+            return []
+
+        cards = []
+        for offset in random.sample(range(candidates), min(number, candidates)):
+            id_stmt = select(Card.id).where(clause).offset(offset).limit(1)
+            card_id = session.execute(id_stmt).scalar()
+            cards.append(session.get(Card, card_id, options=Card.loading_options(LEAN)))
+        return cards
 
     def assign_tag(self, session: Session, tag_id: UUID) -> None:
         """
@@ -124,20 +221,18 @@ class Deck(Base, CrudOperations):
         """
         insert = DeckTag.insert().values(deck_id=self.id, tag_id=tag_id)
         session.execute(insert)
-        session.refresh(self)
-        session.commit()
+        commit(session, self)
 
-    async def assign_tag_async(self, session: Session, tag_id: UUID) -> None:
+    async def assign_tag_async(self, session: AsyncSession, tag_id: UUID) -> None:
         """
         Assign the given Tag to this Deck and refreshes the Deck object (asyncio friendly).
 
         :param tag_id: the name of the Tag to assign to the Deck.
-        :param session: the session (see flashcards_core.database:init_db()).
+        :param session: the session (see flashcards_core.database:init_db_async()).
         """
         insert = DeckTag.insert().values(deck_id=self.id, tag_id=tag_id)
         await session.execute(insert)
-        await session.refresh(self)
-        await session.commit()
+        await commit_async(session, self)
 
     def remove_tag(self, session: Session, tag_id: UUID) -> None:
         """
@@ -147,20 +242,22 @@ class Deck(Base, CrudOperations):
         :param session: the session (see flashcards_core.database:init_db()).
         :returns: None.
         """
-        delete = DeckTag.delete().where(DeckTag.c.tag_id == tag_id)
+        delete = DeckTag.delete().where(
+            and_(DeckTag.c.deck_id == self.id, DeckTag.c.tag_id == tag_id)
+        )
         session.execute(delete)
-        session.commit()
-        session.refresh(self)
+        commit(session, self)
 
-    async def remove_tag_async(self, session: Session, tag_id: UUID) -> None:
+    async def remove_tag_async(self, session: AsyncSession, tag_id: UUID) -> None:
         """
         Remove the given Tag from this Deck.
 
         :param tag_id: the ID of the tag to remove from this deck
-        :param session: the session (see flashcards_core.database:init_db()).
+        :param session: the session (see flashcards_core.database:init_db_async()).
         :returns: None.
         """
-        delete = DeckTag.delete().where(DeckTag.c.tag_id == tag_id)
+        delete = DeckTag.delete().where(
+            and_(DeckTag.c.deck_id == self.id, DeckTag.c.tag_id == tag_id)
+        )
         await session.execute(delete)
-        await session.commit()
-        await session.refresh(self)
\ No newline at end of file
+        await commit_async(session, self)
\ No newline at end of file
@@ -1,12 +1,15 @@
 from typing import List
 
-from uuid import uuid4, UUID
-from sqlalchemy import Column, ForeignKey, String, Table, and_
+from uuid import UUID
+from sqlalchemy import Column, ForeignKey, Index, String, Table, and_
 from sqlalchemy.orm import relationship, Session, backref
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from flashcards_core.guid import GUID
+from flashcards_core.guid import GUID, IdDefault
 from flashcards_core.database import Base
-from flashcards_core.database.crud import CrudOperations
+from flashcards_core.database.crud import CrudOperations, LEAN, RENDER, FULL
+from flashcards_core.database.tagging import TagOperations
+from flashcards_core.database.transactions import commit, commit_async
 
 
 #
@@ -18,6 +21,8 @@ FactTag = Table(
     Base.metadata,
     Column("fact_id", GUID(), ForeignKey("facts.id"), primary_key=True),
     Column("tag_id", GUID(), ForeignKey("tags.id"), primary_key=True),
+    # The primary key serves lookups by fact: this one serves lookups by tag
+    Index("ix_facttags_tag_id_fact_id", "tag_id", "fact_id"),
 )
 
 #: Associative table for Facts relationships
@@ -30,11 +35,11 @@ RelatedFact = Table(
 )
 
 
-class Fact(Base, CrudOperations):
+class Fact(Base, CrudOperations, TagOperations):
     __tablename__ = "facts"
 
     #: Primary key
-    id = Column(GUID(), primary_key=True, index=True, default=uuid4)
+    id = Column(GUID(), primary_key=True, index=True, default=IdDefault("facts"))
 
     #: The content of this fact. Can be plaintext, html,
     #: markdown, a URL, a path to a file... Use the content
@@ -61,6 +66,9 @@ class Fact(Base, CrudOperations):
     #: All the tags assigned to this fact
     tags = relationship("Tag", secondary="facttags", lazy='selectin')
 
+    #: Relationships loaded by each loading profile (see CrudOperations)
+    LOADING_PROFILES = {LEAN: [], RENDER: ["tags"], FULL: None}
+
     def __repr__(self):
         return (
             f"<Fact '{self.value if len(self.value) < 20 else self.value[:20] + '...'}'"
@@ -76,20 +84,18 @@ class Fact(Base, CrudOperations):
         """
         insert = FactTag.insert().values(fact_id=self.id, tag_id=tag_id)
         session.execute(insert)
-        session.commit()
-        session.refresh(self)
+        commit(session, self)
 
-    async def assign_tag_async(self, session: Session, tag_id: UUID) -> None:
+    async def assign_tag_async(self, session: AsyncSession, tag_id: UUID) -> None:
         """
         Assign the given Tag to this Fact (asyncio friendly).
 
         :param tag_id: the name of the Tag to assign to the Fact.
-        :param session: the session (see flashcards_core.database:init_db()).
+        :param session: the session (see flashcards_core.database:init_db_async()).
         """
         insert = FactTag.insert().values(fact_id=self.id, tag_id=tag_id)
         await session.execute(insert)
-        await session.commit()
-        await session.refresh(self)
+        await commit_async(session, self)
 
     def remove_tag(self, session: Session, tag_id: UUID) -> None:
         """
@@ -98,24 +104,26 @@ class Fact(Base, CrudOperations):
         :param facttag_id: the ID of the connection between a tag and a fact.
         :param session: the session (see flashcards_core.database:init_db()).
         """
-        delete = FactTag.delete().where(FactTag.c.tag_id == tag_id)
+        delete = FactTag.delete().where(
+            and_(FactTag.c.fact_id == self.id, FactTag.c.tag_id == tag_id)
+        )
         session.execute(delete)
-        session.commit()
-        session.refresh(self)
+        commit(session, self)
 
-    async def remove_tag_async(self, session: Session, tag_id: UUID) -> None:
+    async def remove_tag_async(self, session: AsyncSession, tag_id: UUID) -> None:
         """
         Remove the given Tag from this Fact (asyncio friendly).
 
         :param facttag_id: the ID of the connection between a tag and a fact.
-        :param session: the session (see flashcards_core.database:init_db()).
+        :param session: the session (see flashcards_core.database:init_db_async()).
         """
-        delete = FactTag.delete().where(FactTag.c.tag_id == tag_id)
+        delete = FactTag.delete().where(
+            and_(FactTag.c.fact_id == self.id, FactTag.c.tag_id == tag_id)
+        )
         await session.execute(delete)
-        await session.commit()
-        await session.refresh(self)
+        await commit_async(session, self)
 
-    async def related_facts_async(self, session: Session) -> List["Fact"]:
+    async def related_facts_async(self, session: AsyncSession) -> List["Fact"]:
         """
         Returns all the related facts pairs in an asyncio friently way.
 
@@ -145,21 +153,21 @@ class Fact(Base, CrudOperations):
         """
         insert = RelatedFact.insert().values(original_fact_id=self.id, related_fact_id=fact_id, relationship=relationship)
         session.execute(insert)
-        session.commit()
-        session.refresh(self)
+        commit(session, self)
 
-    async def assign_related_fact_async(self, session: Session, fact_id: UUID, relationship: str) -> None:
+    async def assign_related_fact_async(
+        self, session: AsyncSession, fact_id: UUID, relationship: str
+    ) -> None:
         """
         Create a relationship between these two Facts (asyncio friendly).
 
         :param fact_id: the name of the other Fact.
         :param relationship: the type of relationship between these facts
-        :param session: the session (see flashcards_core.database:init_db()).
+        :param session: the session (see flashcards_core.database:init_db_async()).
         """
         insert = RelatedFact.insert().values(original_fact_id=self.id, related_fact_id=fact_id, relationship=relationship)
         await session.execute(insert)
-        await session.commit()
-        await session.refresh(self)
+        await commit_async(session, self)
 
     def remove_related_fact(self, session: Session, fact_id: UUID, relationship: str) -> None:
         """
@@ -168,19 +176,31 @@ class Fact(Base, CrudOperations):
         :param fact_id: the ID of the relationship between these two Facts
         :param session: the session (see flashcards_core.database:init_db()).
         """
-        delete = RelatedFact.delete().where(and_(RelatedFact.c.related_fact_id == fact_id, RelatedFact.c.relationship == relationship))
+        delete = RelatedFact.delete().where(
+            and_(
+                RelatedFact.c.original_fact_id == self.id,
+                RelatedFact.c.related_fact_id == fact_id,
+                RelatedFact.c.relationship == relationship,
+            )
+        )
         session.execute(delete)
-        session.commit()
-        session.refresh(self)
+        commit(session, self)
 
-    async def remove_related_fact_async(self, session: Session, fact_id: UUID, relationship: str) -> None:
+    async def remove_related_fact_async(
+        self, session: AsyncSession, fact_id: UUID, relationship: str
+    ) -> None:
         """
         Remove the relationship between these two Facts (asyncio friendly)
 
         :param fact_id: the ID of the relationship between these two Facts
-        :param session: the session (see flashcards_core.database:init_db()).
-        """
-        delete = RelatedFact.delete().where(and_(RelatedFact.c.related_fact_id == fact_id, RelatedFact.c.relationship == relationship))
+        :param session: the session (see flashcards_core.database:init_db_async()).
+        """
+        delete = RelatedFact.delete().where(
+            and_(
+                RelatedFact.c.original_fact_id == self.id,
+                RelatedFact.c.related_fact_id == fact_id,
+                RelatedFact.c.relationship == relationship,
+            )
+        )
         await session.execute(delete)
-        await session.commit()
-        await session.refresh(self)
\ No newline at end of file
+        await commit_async(session, self)
\ No newline at end of file
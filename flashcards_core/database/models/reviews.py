@@ -1,21 +1,30 @@
+from typing import Any, Iterable, List, Mapping, Optional
+
 import datetime
-from uuid import uuid4
-from sqlalchemy import Column, ForeignKey, String, DateTime
-from sqlalchemy.orm import relationship
+from uuid import UUID
+from sqlalchemy import Column, ForeignKey, Index, String, DateTime, select
+from sqlalchemy.orm import relationship, Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from flashcards_core.guid import GUID
+from flashcards_core.guid import GUID, IdDefault
 from flashcards_core.database import Base
-from flashcards_core.database.crud import CrudOperations
+from flashcards_core.database.crud import CrudOperations, BULK_CHUNK_SIZE
+from flashcards_core.database.transactions import batch, batch_async
 
 
 class Review(Base, CrudOperations):
     __tablename__ = "reviews"
+    __table_args__ = (
+        # Serves the pages of Review.get_page(order_by="datetime") with an index seek
+        Index("ix_reviews_datetime_id", "datetime", "id"),
+    )
 
     #: Primary key
-    id = Column(GUID(), primary_key=True, index=True, default=uuid4)
+    id = Column(GUID(), primary_key=True, index=True, default=IdDefault("reviews"))
 
-    #: ID of the card that was reviewed
-    card_id = Column(GUID(), ForeignKey("cards.id"))
+    #: ID of the card that was reviewed.
+    #: Indexed: unseen cards are found with an anti-join on this column.
+    card_id = Column(GUID(), ForeignKey("cards.id"), index=True)
 
     #: The card that was reviewed
     card = relationship("Card", foreign_keys="Review.card_id")
@@ -26,7 +35,7 @@ class Review(Base, CrudOperations):
     result = Column(String, nullable=False)
 
     #: The algorithm used to do this review.
-    #: See flashcards_core.schedulers.SCHEDULERS for valid keys.
+    #: See flashcards_core.schedulers.get_available_schedulers() for valid keys.
     algorithm = Column(String, nullable=False)
 
     #: Date and time of the review.
@@ -40,3 +49,144 @@ class Review(Base, CrudOperations):
             f"<Review of card #{self.card_id}: '{self.result}'"
             f" at {self.datetime} (ID: {self.id})>"
         )
+
+    @classmethod
+    def bulk_create(
+        cls, session: Session, objects: Iterable[Mapping[str, Any]], return_ids: bool = False
+    ) -> Optional[List[Any]]:
+        """
+        Create many Reviews at once, like `CrudOperations.bulk_create()`, and
+        update the CardStats of their cards in the same transaction.
+
+        :param session: the session (see flashcards_core.database:init_db()).
+        :param objects: the kwargs to create each Review with, as dictionaries.
+        :param return_ids: whether to return the IDs of the new Reviews.
+        :returns: the IDs of the new Reviews in the same order, if `return_ids` is True.
+        """
+        objects = list(objects)
+        with batch(session):
+            ids = super().bulk_create(session=session, objects=objects, return_ids=return_ids)
+            CardStats.refresh(session=session, card_ids=_card_ids_of_rows(objects))
+        return ids
+
+    @classmethod
+    def bulk_update(cls, session: Session, objects: Iterable[Mapping[str, Any]]) -> None:
+        """
+        Modify many Reviews at once, like `CrudOperations.bulk_update()`, and
+        update the CardStats of their cards in the same transaction.
+
+        :param session: the session (see flashcards_core.database:init_db()).
+        :param objects: the ID and the new values of each Review, as
+            dictionaries like ``{"id": ..., "result": ...}``.
+        :raises: ObjectNotFoundException if any of the Reviews was not found in
+            the database. In this case no Review is modified.
+        """
+        objects = list(objects)
+        with batch(session):
+            card_ids = _card_ids_of_rows(objects)
+            for stmt in _card_ids_statements([row.get("id") for row in objects]):
+                card_ids += session.execute(stmt).scalars().all()
+            super().bulk_update(session=session, objects=objects)
+            CardStats.refresh(session=session, card_ids=card_ids)
+
+    @classmethod
+    def bulk_delete(cls, session: Session, object_ids: Iterable[Any]) -> None:
+        """
+        Delete many Reviews at once, like `CrudOperations.bulk_delete()`, and
+        update the CardStats of their cards in the same transaction.
+
+        :param session: the session (see flashcards_core.database:init_db()).
+        :param object_ids: the IDs of the Reviews to delete.
+        :raises: ObjectNotFoundException if any of the Reviews was not found in
+            the database. In this case no Review is deleted.
+        """
+        object_ids = list(object_ids)
+        with batch(session):
+            card_ids = []
+            for stmt in _card_ids_statements(object_ids):
+                card_ids += session.execute(stmt).scalars().all()
+            super().bulk_delete(session=session, object_ids=object_ids)
+            CardStats.refresh(session=session, card_ids=card_ids)
+
+    @classmethod
+    async def bulk_create_async(
+        cls, session: AsyncSession, objects: Iterable[Mapping[str, Any]], return_ids: bool = False
+    ) -> Optional[List[Any]]:
+        """
+        Create many Reviews at once and update the CardStats of their cards
+        (asyncio-friendly). See `bulk_create()`.
+
+        :param session: the session (see flashcards_core.database:init_db_async()).
+        :param objects: the kwargs to create each Review with, as dictionaries.
+        :param return_ids: whether to return the IDs of the new Reviews.
+        :returns: the IDs of the new Reviews in the same order, if `return_ids` is True.
+        """
+        objects = list(objects)
+        async with batch_async(session):
+            ids = await super().bulk_create_async(
+                session=session, objects=objects, return_ids=return_ids
+            )
+            await CardStats.refresh_async(session=session, card_ids=_card_ids_of_rows(objects))
+        return ids
+
+    @classmethod
+    async def bulk_update_async(
+        cls, session: AsyncSession, objects: Iterable[Mapping[str, Any]]
+    ) -> None:
+        """
+        Modify many Reviews at once and update the CardStats of their cards
+        (asyncio-friendly). See `bulk_update()`.
+
+        :param session: the session (see flashcards_core.database:init_db_async()).
+        :param objects: the ID and the new values of each Review, as
+            dictionaries like ``{"id": ..., "result": ...}``.
+        :raises: ObjectNotFoundException if any of the Reviews was not found in
+            the database. In this case no Review is modified.
+        """
+        objects = list(objects)
+        async with batch_async(session):
+            card_ids = _card_ids_of_rows(objects)
+            for stmt in _card_ids_statements([row.get("id") for row in objects]):
+                card_ids += (await session.scalars(stmt)).all()
+            await super().bulk_update_async(session=session, objects=objects)
+            await CardStats.refresh_async(session=session, card_ids=card_ids)
+
+    @classmethod
+    async def bulk_delete_async(cls, session: AsyncSession, object_ids: Iterable[Any]) -> None:
+        """
+        Delete many Reviews at once and update the CardStats of their cards
+        (asyncio-friendly). See `bulk_delete()`.
+
+        :param session: the session (see flashcards_core.database:init_db_async()).
+        :param object_ids: the IDs of the Reviews to delete.
+        :raises: ObjectNotFoundException if any of the Reviews was not found in
+            the database. In this case no Review is deleted.
+        """
+        object_ids = list(object_ids)
+        async with batch_async(session):
+            card_ids = []
+            for stmt in _card_ids_statements(object_ids):
+                card_ids += (await session.scalars(stmt)).all()
+            await super().bulk_delete_async(session=session, object_ids=object_ids)
+            await CardStats.refresh_async(session=session, card_ids=card_ids)
+
+
+def _card_ids_of_rows(objects: List[Mapping[str, Any]]) -> List[UUID]:
+    """
+    Returns the card IDs set by the given rows of Reviews.
+    """
+    return [row["card_id"] for row in objects if row.get("card_id") is not None]
+
+
+def _card_ids_statements(review_ids: List[Any]):
+    """
+    Yields the SELECT statements returning the card IDs of the given Reviews,
+    in chunks of BULK_CHUNK_SIZE.
+    """
+    for start in range(0, len(review_ids), BULK_CHUNK_SIZE):
+        chunk = review_ids[start : start + BULK_CHUNK_SIZE]
+        yield select(Review.card_id).where(Review.id.in_(chunk)).distinct()
+
+
+# Imported last: the statistics are computed from the Reviews defined above
+from flashcards_core.database.models.card_stats import CardStats  # noqa: E402
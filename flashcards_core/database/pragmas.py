@@ -0,0 +1,136 @@
+from typing import Any, Dict, Mapping, Optional, Union
+
+import re
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+#: SQLite's own settings: no pragma is issued
+DEFAULT = "default"
+
+#: Settings for concurrent readers and faster writes on SQLite
+PERFORMANCE = "performance"
+
+#: The pragmas of each SQLite profile, applied in this order on every new connection
+SQLITE_PROFILES: Dict[str, Dict[str, Any]] = {
+    DEFAULT: {},
+    PERFORMANCE: {
+        # Readers don't wait for writers, and writers don't wait for readers
+        "journal_mode": "WAL",
+        # Safe with WAL: a power loss can undo the last commits, not corrupt the file
+        "synchronous": "NORMAL",
+        # In KiB when negative: 64MB of page cache per connection
+        "cache_size": -64000,
+        # Reads through the OS page cache, without copies
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        # Milliseconds to wait for the write lock before failing with "database is locked"
+        "busy_timeout": 5000,
+    },
+}
+
+_PRAGMA_NAME = re.compile(r"^[a-z_]+$")
+_PRAGMA_VALUE = re.compile(r"^-?\w+$")
+
+
+def get_sqlite_pragmas(profile: Union[str, Mapping[str, Any], None]) -> Dict[str, Any]:
+    """
+    :param profile: the name of a profile of `SQLITE_PROFILES`, or a mapping
+        of pragma names to values, or None for `DEFAULT`.
+    :returns: the pragmas to issue on each new connection.
+    :raises: ValueError if the profile is unknown, or a pragma is not a plain
+        name and value.
+    """
+    if profile is None:
+        return {}
+    if isinstance(profile, str):
+        if profile not in SQLITE_PROFILES:
+            raise ValueError(
+                f"Unknown SQLite profile '{profile}', use one of {', '.join(SQLITE_PROFILES)}."
+            )
+        return dict(SQLITE_PROFILES[profile])
+    for name, value in profile.items():
+        if not _PRAGMA_NAME.match(name) or not _PRAGMA_VALUE.match(str(value)):
+            raise ValueError(f"Invalid SQLite pragma: {name}={value}")
+    return dict(profile)
+
+
+def is_sqlite_file(database_path: str) -> bool:
+    """
+    :param database_path: The database URL.
+    :returns: whether it's an SQLite database stored in a file.
+    """
+    url = make_url(database_path)
+    if url.get_backend_name() != "sqlite":
+        return False
+    return url.database not in (None, "", ":memory:") and url.query.get("mode") != "memory"
+
+
+def is_sqlite_memory(database_path: str) -> bool:
+    """
+    :param database_path: The database URL.
+    :returns: whether it's an in-memory SQLite database.
+    """
+    return make_url(database_path).get_backend_name() == "sqlite" and not is_sqlite_file(
+        database_path
+    )
+
+
+def sqlite_engine_options(
+    database_path: str, profile: Union[str, Mapping[str, Any], None], asyncio: bool = False
+) -> Dict[str, Any]:
+    """
+    SQLAlchemy 1.4 opens a new connection for each checkout on SQLite files,
+    which would issue the pragmas again every time and throw away the page
+    cache: when a profile is used on an SQLite file, connections are kept
+    in a pool instead.
+
+    :param database_path: The database URL.
+    :param profile: the SQLite profile (see `get_sqlite_pragmas()`).
+    :param asyncio: whether the engine will be an AsyncEngine.
+    :returns: the extra arguments to create the engine with.
+    """
+    if not get_sqlite_pragmas(profile) or not is_sqlite_file(database_path):
+        return {}
+    return {"poolclass": AsyncAdaptedQueuePool if asyncio else QueuePool}
+
+
+def apply_sqlite_profile(
+    engine, profile: Union[str, Mapping[str, Any], None] = PERFORMANCE
+) -> Optional[Dict[str, Any]]:
+    """
+    Makes the engine issue the pragmas of an SQLite profile on each new
+    connection. Does nothing on other databases, or if the profile has no pragmas.
+
+    Works on both sync engines and asyncio ones (`sqlite+aiosqlite:///`).
+    Apply it before the first connection: connections already in the pool
+    are not changed.
+
+    :param engine: the SQLAlchemy Engine or AsyncEngine.
+    :param profile: the name of a profile of `SQLITE_PROFILES`, or a mapping
+        of pragma names to values.
+    :returns: the pragmas that will be issued, or None if the database is not SQLite.
+    :raises: ValueError if the profile is unknown, or a pragma is not a plain
+        name and value.
+    """
+    pragmas = get_sqlite_pragmas(profile)
+    if engine.dialect.name != "sqlite":
+        return None
+    if not pragmas:
+        return pragmas
+
+    statements = [f"PRAGMA {name}={value}" for name, value in pragmas.items()]
+
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+    # AsyncEngine emits its events through the sync engine it wraps
+    event.listen(getattr(engine, "sync_engine", engine), "connect", set_pragmas)
+    return pragmas
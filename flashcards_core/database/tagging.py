@@ -0,0 +1,548 @@
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import Column, Table, and_, func, inspect, not_, or_, select
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from flashcards_core.database.crud import (
+    BULK_CHUNK_SIZE,
+    LEAN,
+    _encode_cursor,
+    _next_cursor,
+    _page_statement,
+)
+from flashcards_core.database.transactions import (
+    commit,
+    commit_async,
+    in_batch,
+    rollback,
+    rollback_async,
+    savepoint,
+    savepoint_async,
+)
+
+
+def _association(cls) -> Tuple[Table, Column, Column]:
+    """
+    Finds the associative table behind the `tags` relationship of the given model.
+
+    :returns: the table, its column with the model object IDs and its
+        column with the tag IDs.
+    :raises: ValueError if the model has no `tags` relationship.
+    """
+    relationship = inspect(cls).relationships.get("tags")
+    if relationship is None or relationship.secondary is None:
+        raise ValueError(f"{cls.__name__} objects can't be tagged.")
+    table = relationship.secondary
+    object_column = tag_column = None
+    for column in table.c:
+        if any(fk.column.table is cls.__table__ for fk in column.foreign_keys):
+            object_column = column
+        else:
+            tag_column = column
+    return table, object_column, tag_column
+
+
+def _group_ids(objects: Iterable[Any]) -> Dict[type, List[Any]]:
+    """
+    Groups the IDs of the given model objects by model, without duplicates.
+    """
+    ids: Dict[type, Dict[Any, None]] = {}
+    for db_object in objects:
+        # The identity of persistent objects is known even when they are expired
+        identity = inspect(db_object).identity
+        object_id = identity[0] if identity else db_object.id
+        ids.setdefault(type(db_object), {})[object_id] = None
+    return {cls: list(object_ids) for cls, object_ids in ids.items()}
+
+
+def _chunks(values: List[Any], size: int = BULK_CHUNK_SIZE) -> Iterable[List[Any]]:
+    for start in range(0, len(values), size):
+        yield values[start : start + size]
+
+
+def _missing_rows(
+    object_column: Column,
+    tag_column: Column,
+    object_ids: List[Any],
+    tag_ids: List[Any],
+    existing: Set[Tuple[Any, Any]],
+) -> List[Dict[str, Any]]:
+    """
+    Returns the rows associating each object with each tag, except the existing ones.
+    """
+    return [
+        {object_column.name: object_id, tag_column.name: tag_id}
+        for object_id in object_ids
+        for tag_id in tag_ids
+        if (object_id, tag_id) not in existing
+    ]
+
+
+def _expire_tags(session: Session, objects: Iterable[Any]) -> None:
+    """
+    Makes the given objects reload their tags on next access.
+    """
+    for db_object in objects:
+        if db_object in session:
+            session.expire(db_object, ["tags"])
+
+
+def bulk_tag(session: Session, objects: Iterable[Any], tag_ids: Iterable[Any]) -> int:
+    """
+    Assigns all the given Tags to all the given Cards, Facts and Decks, in a
+    single transaction. Each chunk of BULK_CHUNK_SIZE objects costs one query
+    to find the pairs that already exist, which are skipped, and a multi-row
+    INSERT for the others.
+
+    The `tags` of the objects are reloaded on their next access.
+
+    Example usage:
+
+    .. code-block:: python
+
+        tag_ids = Tag.get_ids_by_names(session=session, names=["verbs", "b1"])
+        bulk_tag(session=session, objects=cards, tag_ids=tag_ids.values())
+
+    :param session: the session (see flashcards_core.database:init_db()).
+    :param objects: the model objects to tag. Can mix Cards, Facts and Decks.
+    :param tag_ids: the IDs of the Tags to assign.
+    :returns: the number of tags actually assigned.
+    """
+    objects = list(objects)
+    tag_ids = list(dict.fromkeys(tag_ids))
+    created = 0
+    try:
+        with savepoint(session):
+            for cls, object_ids in _group_ids(objects).items():
+                table, object_column, tag_column = _association(cls)
+                for chunk in _chunks(object_ids):
+                    stmt = select(object_column, tag_column).where(
+                        object_column.in_(chunk), tag_column.in_(tag_ids)
+                    )
+                    existing = set(session.execute(stmt).all())
+                    rows = _missing_rows(object_column, tag_column, chunk, tag_ids, existing)
+                    # Two parameters per row: stay below the old SQLite limit of 999
+                    for rows_chunk in _chunks(rows, BULK_CHUNK_SIZE // 2):
+                        session.execute(table.insert().values(rows_chunk))
+                    created += len(rows)
+        commit(session)
+    except Exception:
+        rollback(session)
+        raise
+    _expire_tags(session, objects)
+    return created
+
+
+def bulk_untag(session: Session, objects: Iterable[Any], tag_ids: Iterable[Any]) -> int:
+    """
+    Removes all the given Tags from all the given Cards, Facts and Decks, in a
+    single transaction, with one DELETE for each chunk of BULK_CHUNK_SIZE objects.
+    Tags that were not assigned are ignored.
+
+    The `tags` of the objects are reloaded on their next access.
+
+    :param session: the session (see flashcards_core.database:init_db()).
+    :param objects: the model objects to untag. Can mix Cards, Facts and Decks.
+    :param tag_ids: the IDs of the Tags to remove.
+    :returns: the number of tags actually removed.
+    """
+    objects = list(objects)
+    tag_ids = list(dict.fromkeys(tag_ids))
+    deleted = 0
+    try:
+        with savepoint(session):
+            for cls, object_ids in _group_ids(objects).items():
+                table, object_column, tag_column = _association(cls)
+                for chunk in _chunks(object_ids):
+                    stmt = table.delete().where(object_column.in_(chunk), tag_column.in_(tag_ids))
+                    deleted += session.execute(stmt).rowcount
+        commit(session)
+    except Exception:
+        rollback(session)
+        raise
+    _expire_tags(session, objects)
+    return deleted
+
+
+async def bulk_tag_async(
+    session: AsyncSession, objects: Iterable[Any], tag_ids: Iterable[Any]
+) -> int:
+    """
+    Assigns all the given Tags to all the given Cards, Facts and Decks, in a
+    single transaction (asyncio friendly). See `bulk_tag()`.
+
+    Note: the `tags` of the objects are not reloaded, as that would need
+    implicit IO. Refresh the objects to see their new tags.
+
+    :param session: the session (see flashcards_core.database:init_db_async()).
+    :param objects: the model objects to tag. Can mix Cards, Facts and Decks.
+    :param tag_ids: the IDs of the Tags to assign.
+    :returns: the number of tags actually assigned.
+    """
+    tag_ids = list(dict.fromkeys(tag_ids))
+    created = 0
+    try:
+        async with savepoint_async(session):
+            for cls, object_ids in _group_ids(objects).items():
+                table, object_column, tag_column = _association(cls)
+                for chunk in _chunks(object_ids):
+                    stmt = select(object_column, tag_column).where(
+                        object_column.in_(chunk), tag_column.in_(tag_ids)
+                    )
+                    existing = set((await session.execute(stmt)).all())
+                    rows = _missing_rows(object_column, tag_column, chunk, tag_ids, existing)
+                    # Two parameters per row: stay below the old SQLite limit of 999
+                    for rows_chunk in _chunks(rows, BULK_CHUNK_SIZE // 2):
+                        await session.execute(table.insert().values(rows_chunk))
+                    created += len(rows)
+        await commit_async(session)
+    except Exception:
+        await rollback_async(session)
+        raise
+    return created
+
+
+async def bulk_untag_async(
+    session: AsyncSession, objects: Iterable[Any], tag_ids: Iterable[Any]
+) -> int:
+    """
+    Removes all the given Tags from all the given Cards, Facts and Decks, in a
+    single transaction (asyncio friendly). See `bulk_untag()`.
+
+    Note: the `tags` of the objects are not reloaded, as that would need
+    implicit IO. Refresh the objects to see their new tags.
+
+    :param session: the session (see flashcards_core.database:init_db_async()).
+    :param objects: the model objects to untag. Can mix Cards, Facts and Decks.
+    :param tag_ids: the IDs of the Tags to remove.
+    :returns: the number of tags actually removed.
+    """
+    tag_ids = list(dict.fromkeys(tag_ids))
+    deleted = 0
+    try:
+        async with savepoint_async(session):
+            for cls, object_ids in _group_ids(objects).items():
+                table, object_column, tag_column = _association(cls)
+                for chunk in _chunks(object_ids):
+                    stmt = table.delete().where(object_column.in_(chunk), tag_column.in_(tag_ids))
+                    deleted += (await session.execute(stmt)).rowcount
+        await commit_async(session)
+    except Exception:
+        await rollback_async(session)
+        raise
+    return deleted
+
+
+class TagFilter:
+    """
+    A condition on the tags of Cards, Facts or Decks, to pass to
+    `TagOperations.get_ids_by_tags()` and `TagOperations.get_page_by_tags()`.
+
+    Filters are combined with `&` (and), `|` (or) and `~` (not):
+
+    .. code-block:: python
+
+        # All the cards tagged A and B but not C
+        tags = HasAllTags(a.id, b.id) & ~HasTag(c.id)
+        card_ids, cursor = Card.get_ids_by_tags(session=session, tags=tags)
+
+    Each filter becomes a semi-join like `id IN (SELECT card_id FROM cardtags
+    WHERE tag_id = ...)`, which the database answers from the index on
+    `tag_id`: no card or tag is loaded to evaluate it.
+    """
+
+    def clause(self, cls):
+        """
+        :param cls: the model to filter: Card, Fact or Deck.
+        :returns: the SQL condition on the objects of the model.
+        """
+        raise NotImplementedError("Subclasses of TagFilter must implement clause()")
+
+    def __and__(self, other: "TagFilter") -> "TagFilter":
+        return AllOf(self, other)
+
+    def __or__(self, other: "TagFilter") -> "TagFilter":
+        return AnyOf(self, other)
+
+    def __invert__(self) -> "TagFilter":
+        return NoneOf(self)
+
+
+class HasAnyTag(TagFilter):
+    """
+    Matches the objects that have at least one of the given tags.
+
+    :raises: ValueError if no tag is given.
+    """
+
+    def __init__(self, *tag_ids: Any):
+        if not tag_ids:
+            raise ValueError(f"{type(self).__name__} needs at least one tag.")
+        self.tag_ids = list(dict.fromkeys(tag_ids))
+
+    def clause(self, cls):
+        _, object_column, tag_column = _association(cls)
+        return cls.id.in_(select(object_column).where(tag_column.in_(self.tag_ids)))
+
+    def __repr__(self):
+        return f"{type(self).__name__}({', '.join(map(str, self.tag_ids))})"
+
+
+class HasTag(HasAnyTag):
+    """
+    Matches the objects that have the given tag.
+    """
+
+    def __init__(self, tag_id: Any):
+        super().__init__(tag_id)
+
+
+class HasAllTags(HasAnyTag):
+    """
+    Matches the objects that have all the given tags, with a single
+    subquery counting the matching tags of each object.
+    """
+
+    def clause(self, cls):
+        _, object_column, tag_column = _association(cls)
+        return cls.id.in_(
+            select(object_column)
+            .where(tag_column.in_(self.tag_ids))
+            .group_by(object_column)
+            .having(func.count() == len(self.tag_ids))
+        )
+
+
+class AllOf(TagFilter):
+    """
+    Matches the objects matching all the given filters (`a & b`).
+    """
+
+    def __init__(self, *filters: TagFilter):
+        self.filters = filters
+
+    def clause(self, cls):
+        return and_(*(tag_filter.clause(cls) for tag_filter in self.filters))
+
+    def __repr__(self):
+        return f"({' & '.join(map(repr, self.filters))})"
+
+
+class AnyOf(AllOf):
+    """
+    Matches the objects matching at least one of the given filters (`a | b`).
+    """
+
+    def clause(self, cls):
+        return or_(*(tag_filter.clause(cls) for tag_filter in self.filters))
+
+    def __repr__(self):
+        return f"({' | '.join(map(repr, self.filters))})"
+
+
+class NoneOf(AllOf):
+    """
+    Matches the objects matching none of the given filters (`~a`).
+    """
+
+    def clause(self, cls):
+        return not_(or_(*(tag_filter.clause(cls) for tag_filter in self.filters)))
+
+    def __repr__(self):
+        return f"~{AnyOf(*self.filters)!r}" if len(self.filters) > 1 else f"~{self.filters[0]!r}"
+
+
+def _ids_page(
+    rows: List[Any], limit: int, order_by: Optional[str], descending: bool
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    Returns the IDs in the rows of a page of `get_ids_by_tags()`, made of
+    the sort value (if any) and the ID, and the cursor of the next page.
+    """
+    cursor = None
+    if len(rows) == limit:
+        cursor = _encode_cursor(order_by, descending, list(rows[-1]))
+    return [row[-1] for row in rows], cursor
+
+
+class TagOperations:
+    """
+    Assigns and removes many tags at once on the models with a `tags`
+    relationship, like Card, Fact and Deck, and finds their objects by tag.
+    """
+
+    @classmethod
+    def get_ids_by_tags(
+        cls,
+        session: Session,
+        tags: TagFilter,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        order_by: Optional[str] = None,
+        descending: bool = False,
+    ) -> Tuple[List[Any], Optional[str]]:
+        """
+        Returns a page of the IDs of the model objects whose tags match the
+        given filter, without loading the objects, and the cursor to get the
+        next page. Pages work like in `get_page()`.
+
+        :param session: the session (see flashcards_core.database:init_db()).
+        :param tags: the filter on the tags (see `TagFilter`).
+        :param cursor: the cursor returned with the previous page, if any.
+        :param limit: maximum number of IDs to return.
+        :param order_by: the name of the field to sort by. Defaults to the ID.
+        :param descending: whether to sort in descending order.
+        :returns: a tuple with the list of IDs and the cursor of the
+            next page, which is None if this was the last page.
+        :raises: ValueError if the cursor is invalid.
+        """
+        stmt, columns = _page_statement(
+            cls, cursor, limit, order_by, descending, where=tags.clause(cls)
+        )
+        rows = session.execute(stmt.with_only_columns(*columns)).all()
+        return _ids_page(rows, limit, order_by, descending)
+
+    @classmethod
+    def get_page_by_tags(
+        cls,
+        session: Session,
+        tags: TagFilter,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        order_by: Optional[str] = None,
+        descending: bool = False,
+        profile: str = LEAN,
+    ) -> Tuple[List[Any], Optional[str]]:
+        """
+        Returns a page of the model objects whose tags match the given
+        filter, and the cursor to get the next page. Pages work like in
+        `get_page()`.
+
+        :param session: the session (see flashcards_core.database:init_db()).
+        :param tags: the filter on the tags (see `TagFilter`).
+        :param cursor: the cursor returned with the previous page, if any.
+        :param limit: maximum number of elements to return.
+        :param order_by: the name of the field to sort by. Defaults to the ID.
+        :param descending: whether to sort in descending order.
+        :param profile: which relationships to load (see `LOADING_PROFILES`).
+            Defaults to none.
+        :returns: a tuple with the list of model objects and the cursor of the
+            next page, which is None if this was the last page.
+        :raises: ValueError if the cursor is invalid.
+        """
+        stmt, columns = _page_statement(
+            cls, cursor, limit, order_by, descending, profile, where=tags.clause(cls)
+        )
+        objects = session.execute(stmt).scalars().all()
+        return objects, _next_cursor(objects, columns, limit, order_by, descending)
+
+    @classmethod
+    async def get_ids_by_tags_async(
+        cls,
+        session: AsyncSession,
+        tags: TagFilter,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        order_by: Optional[str] = None,
+        descending: bool = False,
+    ) -> Tuple[List[Any], Optional[str]]:
+        """
+        Returns a page of the IDs of the model objects whose tags match the
+        given filter (asyncio friendly). See `get_ids_by_tags()`.
+
+        :param session: the session (see flashcards_core.database:init_db_async()).
+        :param tags: the filter on the tags (see `TagFilter`).
+        :param cursor: the cursor returned with the previous page, if any.
+        :param limit: maximum number of IDs to return.
+        :param order_by: the name of the field to sort by. Defaults to the ID.
+        :param descending: whether to sort in descending order.
+        :returns: a tuple with the list of IDs and the cursor of the
+            next page, which is None if this was the last page.
+        :raises: ValueError if the cursor is invalid.
+        """
+        stmt, columns = _page_statement(
+            cls, cursor, limit, order_by, descending, where=tags.clause(cls)
+        )
+        results = await session.execute(stmt.with_only_columns(*columns))
+        return _ids_page(results.all(), limit, order_by, descending)
+
+    @classmethod
+    async def get_page_by_tags_async(
+        cls,
+        session: AsyncSession,
+        tags: TagFilter,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        order_by: Optional[str] = None,
+        descending: bool = False,
+        profile: str = LEAN,
+    ) -> Tuple[List[Any], Optional[str]]:
+        """
+        Returns a page of the model objects whose tags match the given
+        filter (asyncio friendly). See `get_page_by_tags()`.
+
+        :param session: the session (see flashcards_core.database:init_db_async()).
+        :param tags: the filter on the tags (see `TagFilter`).
+        :param cursor: the cursor returned with the previous page, if any.
+        :param limit: maximum number of elements to return.
+        :param order_by: the name of the field to sort by. Defaults to the ID.
+        :param descending: whether to sort in descending order.
+        :param profile: which relationships to load (see `LOADING_PROFILES`).
+            Defaults to none.
+        :returns: a tuple with the list of model objects and the cursor of the
+            next page, which is None if this was the last page.
+        :raises: ValueError if the cursor is invalid.
+        """
+        stmt, columns = _page_statement(
+            cls, cursor, limit, order_by, descending, profile, where=tags.clause(cls)
+        )
+        results = await session.scalars(stmt)
+        objects = results.all()
+        return objects, _next_cursor(objects, columns, limit, order_by, descending)
+
+    def assign_tags(self, session: Session, tag_ids: Iterable[Any]) -> None:
+        """
+        Assign the given Tags to this object, in a single statement.
+        Its `tags` are reloaded on their next access. Tags already assigned
+        are skipped. See `bulk_tag()`.
+
+        :param session: the session (see flashcards_core.database:init_db()).
+        :param tag_ids: the IDs of the Tags to assign.
+        """
+        bulk_tag(session=session, objects=[self], tag_ids=tag_ids)
+
+    async def assign_tags_async(self, session: AsyncSession, tag_ids: Iterable[Any]) -> None:
+        """
+        Assign the given Tags to this object and refreshes it (asyncio friendly).
+        Tags already assigned are skipped. See `bulk_tag()`.
+
+        :param session: the session (see flashcards_core.database:init_db_async()).
+        :param tag_ids: the IDs of the Tags to assign.
+        """
+        await bulk_tag_async(session=session, objects=[self], tag_ids=tag_ids)
+        if not in_batch(session):
+            await session.refresh(self)
+
+    def remove_tags(self, session: Session, tag_ids: Iterable[Any]) -> None:
+        """
+        Remove the given Tags from this object, in a single statement.
+        Its `tags` are reloaded on their next access. Tags that were not
+        assigned are ignored. See `bulk_untag()`.
+
+        :param session: the session (see flashcards_core.database:init_db()).
+        :param tag_ids: the IDs of the Tags to remove.
+        """
+        bulk_untag(session=session, objects=[self], tag_ids=tag_ids)
+
+    async def remove_tags_async(self, session: AsyncSession, tag_ids: Iterable[Any]) -> None:
+        """
+        Remove the given Tags from this object and refreshes it (asyncio friendly).
+        Tags that were not assigned are ignored. See `bulk_untag()`.
+
+        :param session: the session (see flashcards_core.database:init_db_async()).
+        :param tag_ids: the IDs of the Tags to remove.
+        """
+        await bulk_untag_async(session=session, objects=[self], tag_ids=tag_ids)
+        if not in_batch(session):
+            await session.refresh(self)
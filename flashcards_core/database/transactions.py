@@ -0,0 +1,206 @@
+from typing import Any
+
+from contextlib import contextmanager, asynccontextmanager
+
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+#: Key of `session.info` counting the `batch()` blocks the session is in
+BATCH_DEPTH = "flashcards_core_batch_depth"
+
+
+def _info(session: Session) -> dict:
+    # AsyncSession keeps its info in the underlying sync session
+    return getattr(session, "sync_session", session).info
+
+
+def in_batch(session: Session) -> bool:
+    """
+    :param session: the session (see flashcards_core.database:init_db()).
+    :returns: whether the session is inside a `batch()` block.
+    """
+    return _info(session).get(BATCH_DEPTH, 0) > 0
+
+
+def commit(session: Session, *objects: Any) -> None:
+    """
+    Commits the session and refreshes the given objects.
+    Inside a `batch()` block, only flushes the session instead.
+
+    :param session: the session (see flashcards_core.database:init_db()).
+    :param objects: the model objects to refresh after the commit.
+    """
+    if in_batch(session):
+        session.flush()
+        return
+    session.commit()
+    for db_object in objects:
+        session.refresh(db_object)
+
+
+async def commit_async(session: AsyncSession, *objects: Any) -> None:
+    """
+    Commits the session and refreshes the given objects (asyncio-friendly).
+    Inside a `batch_async()` block, only flushes the session instead.
+
+    :param session: the session (see flashcards_core.database:init_db_async()).
+    :param objects: the model objects to refresh after the commit.
+    """
+    if in_batch(session):
+        await session.flush()
+        return
+    await session.commit()
+    for db_object in objects:
+        await session.refresh(db_object)
+
+
+def rollback(session: Session) -> None:
+    """
+    Rolls back the session after a failed operation. Inside a `batch()` block,
+    does nothing instead: the outermost block decides what happens to the
+    whole transaction, rolling it back if the exception reaches it.
+
+    :param session: the session (see flashcards_core.database:init_db()).
+    """
+    if not in_batch(session):
+        session.rollback()
+
+
+async def rollback_async(session: AsyncSession) -> None:
+    """
+    Rolls back the session after a failed operation (asyncio-friendly).
+    Inside a `batch_async()` block, does nothing instead. See `rollback()`.
+
+    :param session: the session (see flashcards_core.database:init_db_async()).
+    """
+    if not in_batch(session):
+        await session.rollback()
+
+
+def _needs_begin(connection: Connection) -> bool:
+    """
+    Whether the connection must BEGIN before a SAVEPOINT. The SQLite drivers
+    only BEGIN before the first write on their own: a SAVEPOINT sent before
+    would open a transaction of its own, that its RELEASE commits.
+    """
+    if connection.dialect.name != "sqlite":
+        return False
+    dbapi_connection = connection.connection.connection
+    # The aiosqlite adapter wraps the aiosqlite connection
+    driver = getattr(dbapi_connection, "_connection", dbapi_connection)
+    return not driver.in_transaction
+
+
+@contextmanager
+def savepoint(session: Session):
+    """
+    Inside a `batch()` block, runs the block in a SAVEPOINT and rolls back
+    to it if an exception is raised, so that a failed operation leaves no
+    partial changes while the previous ones are kept. Outside a `batch()`
+    block, does nothing: the failed operations roll back the session.
+
+    :param session: the session (see flashcards_core.database:init_db()).
+    """
+    if not in_batch(session):
+        yield
+        return
+    connection = session.connection()
+    if _needs_begin(connection):
+        connection.exec_driver_sql("BEGIN")
+    with session.begin_nested():
+        yield
+
+
+@asynccontextmanager
+async def savepoint_async(session: AsyncSession):
+    """
+    Inside a `batch_async()` block, runs the block in a SAVEPOINT and rolls
+    back to it if an exception is raised (asyncio-friendly). See `savepoint()`.
+
+    :param session: the session (see flashcards_core.database:init_db_async()).
+    """
+    if not in_batch(session):
+        yield
+        return
+    connection = await session.connection()
+    if _needs_begin(connection.sync_connection):
+        await connection.exec_driver_sql("BEGIN")
+    async with session.begin_nested():
+        yield
+
+
+@contextmanager
+def batch(session: Session):
+    """
+    Groups many operations in a single transaction.
+
+    Inside the block, the CRUD methods, the `assign_*`/`remove_*` helpers of
+    the models and the schedulers only flush their changes: the block commits
+    once at the end, or rolls everything back if an exception is raised.
+    Blocks can be nested: only the outermost one commits.
+
+    Failed operations don't roll back the block: if their exception is caught
+    before it leaves the block, the previous changes are kept. The bulk
+    operations (like `bulk_delete()` or `bulk_tag()`) run in a SAVEPOINT
+    (see `savepoint()`), so they leave no partial changes when they fail; the
+    other operations may.
+
+    Objects are not refreshed inside the block, so relationships changed
+    through the helpers (like `Card.tags` after `assign_tag()`) may be
+    outdated until the block ends.
+
+    Example usage:
+
+    .. code-block:: python
+
+        with batch(session):
+            card = Card.create(session=session, deck_id=..., question_id=..., answer_id=...)
+            card.assign_tag(session=session, tag_id=tag.id)
+            card.assign_question_context(session=session, fact_id=context.id)
+
+    :param session: the session (see flashcards_core.database:init_db()).
+    """
+    info = _info(session)
+    info[BATCH_DEPTH] = info.get(BATCH_DEPTH, 0) + 1
+    try:
+        yield session
+        if info[BATCH_DEPTH] == 1:
+            session.commit()
+    except BaseException:
+        if info[BATCH_DEPTH] == 1:
+            session.rollback()
+        raise
+    finally:
+        info[BATCH_DEPTH] -= 1
+
+
+@asynccontextmanager
+async def batch_async(session: AsyncSession):
+    """
+    Groups many operations in a single transaction (asyncio-friendly).
+    See `batch()`.
+
+    Example usage:
+
+    .. code-block:: python
+
+        async with batch_async(session):
+            card = await Card.create_async(session=session, ...)
+            await card.assign_tag_async(session=session, tag_id=tag.id)
+
+    :param session: the session (see flashcards_core.database:init_db_async()).
+    """
+    info = _info(session)
+    info[BATCH_DEPTH] = info.get(BATCH_DEPTH, 0) + 1
+    try:
+        yield session
+        if info[BATCH_DEPTH] == 1:
+            await session.commit()
+    except BaseException:
+        if info[BATCH_DEPTH] == 1:
+            await session.rollback()
+        raise
+    finally:
+        info[BATCH_DEPTH] -= 1
@@ -1,6 +1,75 @@
-from sqlalchemy.types import TypeDecorator, CHAR
-from sqlalchemy.dialects.postgresql import UUID
+from typing import Callable, Dict, Optional, Union
+
+import os
+import time
 import uuid
+import threading
+from sqlalchemy.types import TypeDecorator, CHAR, BINARY, LargeBinary
+from sqlalchemy.dialects.postgresql import UUID
+
+
+#: Storage mode of the GUIDs as 32 hex characters (the default)
+HEX = "hex"
+
+#: Storage mode of the GUIDs as 16 bytes
+BINARY_16 = "binary"
+
+#: Storage mode of the GUIDs on databases without a native UUID type
+_storage = HEX
+
+
+def set_guid_storage(storage: str) -> None:
+    """
+    Chooses how GUIDs are stored on databases without a native UUID type
+    (all but PostgreSQL, which always uses its UUID type):
+
+    - `HEX` (default): `CHAR(32)` columns with the hex string of the UUID.
+    - `BINARY_16`: 16-bytes `BLOB` (SQLite) or `BINARY(16)` (MySQL) columns.
+      Keys and indexes are half the size, and values are faster to convert.
+
+    Call it before `init_db()`: engines cache the conversion functions of
+    the types the first time they use them. The storage mode must match the
+    one the database was created with: to convert an existing database, see
+    `flashcards_core.database.migrations:migrate_guid_storage()`.
+
+    :param storage: `HEX` or `BINARY_16`.
+    :raises: ValueError if the storage mode is unknown.
+    """
+    global _storage
+    if storage not in (HEX, BINARY_16):
+        raise ValueError(f"Unknown GUID storage '{storage}', use '{HEX}' or '{BINARY_16}'.")
+    _storage = storage
+
+
+def get_guid_storage() -> str:
+    """
+    :returns: how GUIDs are stored on databases without a native UUID type
+        (see `set_guid_storage()`).
+    """
+    return _storage
+
+
+def _uuid_from_hex(value):
+    if value is None or isinstance(value, uuid.UUID):
+        return value
+    return uuid.UUID(value)
+
+
+def _uuid_to_bytes(value):
+    if value is None:
+        return None
+    if isinstance(value, uuid.UUID):
+        return value.bytes
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes(value)
+    return uuid.UUID(value).bytes
+
+
+def _uuid_from_bytes(value):
+    if value is None:
+        return None
+    # Some drivers return memoryviews or bytearrays
+    return uuid.UUID(bytes=bytes(value))
 
 
 class GUID(TypeDecorator):
@@ -8,24 +77,51 @@ class GUID(TypeDecorator):
     Platform-independent GUID type. See
     https://docs.sqlalchemy.org/en/14/core/custom_types.html#backend-agnostic-guid-type
 
-    Uses PostgreSQL's UUID type, otherwise uses
-    CHAR(32), storing as stringified hex values.
+    Uses PostgreSQL's UUID type, otherwise uses CHAR(32), storing as
+    stringified hex values, or 16 bytes binary columns (see `set_guid_storage()`).
+
+    :param storage: the storage mode of this column, if it must not follow
+        `set_guid_storage()`.
     """
 
     impl = CHAR
     cache_ok = True
 
+    def __init__(self, storage: Optional[str] = None):
+        super().__init__()
+        self.storage = storage
+
+    def _binary(self, dialect) -> bool:
+        return dialect.name != "postgresql" and (self.storage or _storage) == BINARY_16
+
     def load_dialect_impl(self, dialect):
         if dialect.name == "postgresql":
             return dialect.type_descriptor(UUID())
+        elif self._binary(dialect):
+            if dialect.name in ("mysql", "mariadb"):
+                return dialect.type_descriptor(BINARY(16))
+            return dialect.type_descriptor(LargeBinary(16))
         else:
             return dialect.type_descriptor(CHAR(32))
 
+    def bind_processor(self, dialect):
+        # The drivers accept bytes as they are: no need for LargeBinary's wrapping
+        if self._binary(dialect):
+            return _uuid_to_bytes
+        return super().bind_processor(dialect)
+
+    def result_processor(self, dialect, coltype):
+        if self._binary(dialect):
+            return _uuid_from_bytes
+        return super().result_processor(dialect, coltype)
+
     def process_bind_param(self, value, dialect):
         if value is None:
             return value
         elif dialect.name == "postgresql":
             return str(value)
+        elif self._binary(dialect):
+            return _uuid_to_bytes(value)
         else:
             if not isinstance(value, uuid.UUID):
                 return "%.32x" % uuid.UUID(value).int
@@ -36,7 +132,121 @@ class GUID(TypeDecorator):
     def process_result_value(self, value, dialect):
         if value is None:
             return value
+        elif self._binary(dialect):
+            return _uuid_from_bytes(value)
         else:
-            if not isinstance(value, uuid.UUID):
-                value = uuid.UUID(value)
-            return value
+            return _uuid_from_hex(value)
+
+
+#: Protects the state of `uuid7()`
+_uuid7_lock = threading.Lock()
+
+#: Millisecond and counter of the last ID returned by `uuid7()`
+_uuid7_last = (0, 0)
+
+
+def uuid7() -> uuid.UUID:
+    """
+    Generates a time-ordered UUID, following the version 7 layout of RFC 9562:
+    a 48 bits Unix timestamp in milliseconds, a 12 bits counter, and 62
+    random bits.
+
+    IDs generated by the same process are strictly increasing, even within
+    the same millisecond or if the clock goes back, so sorting them sorts
+    the objects by creation time. New rows are appended at the end of the
+    primary key index instead of landing on random pages like with `uuid4()`.
+
+    :returns: a new UUID.
+    """
+    global _uuid7_last
+    random_bits = int.from_bytes(os.urandom(10), "big")
+    with _uuid7_lock:
+        last_ms, last_counter = _uuid7_last
+        ms = time.time_ns() // 1_000_000
+        if ms > last_ms:
+            # Start from a random counter in the lower half, leaving room to increase it
+            counter = random_bits >> 69
+        else:
+            ms, counter = last_ms, last_counter + 1
+            if counter > 0xFFF:
+                ms, counter = ms + 1, 0
+        _uuid7_last = (ms, counter)
+    return uuid.UUID(
+        int=(ms & 0xFFFFFFFFFFFF) << 80
+        | 0x7 << 76
+        | counter << 64
+        | 0b10 << 62
+        | random_bits & 0x3FFFFFFFFFFFFFFF
+    )
+
+
+#: Generates the IDs of the models that have no factory of their own
+_default_id_factory: Callable[[], uuid.UUID] = uuid.uuid4
+
+#: The ID factories of specific models, by table name
+_id_factories: Dict[str, Callable[[], uuid.UUID]] = {}
+
+
+def _table_name(model: Union[str, type]) -> str:
+    return model if isinstance(model, str) else model.__tablename__
+
+
+def set_id_factory(
+    factory: Optional[Callable[[], uuid.UUID]], model: Union[str, type, None] = None
+) -> None:
+    """
+    Chooses how the primary keys of new model objects are generated,
+    for all models or only for one of them.
+
+    Example usage:
+
+    .. code-block:: python
+
+        from flashcards_core.guid import set_id_factory, uuid7
+        from flashcards_core.database import Review
+
+        # Time-ordered IDs for the reviews only
+        set_id_factory(uuid7, model=Review)
+
+    :param factory: a function returning a new UUID, like `uuid.uuid4` (the
+        default) or `uuid7`. None removes the factory of the model, which then
+        goes back to the global one.
+    :param model: the model class, or its table name. Defaults to all the
+        models that have no factory of their own.
+    """
+    global _default_id_factory
+    if model is None:
+        _default_id_factory = factory or uuid.uuid4
+    elif factory is None:
+        _id_factories.pop(_table_name(model), None)
+    else:
+        _id_factories[_table_name(model)] = factory
+
+
+def get_id_factory(model: Union[str, type, None] = None) -> Callable[[], uuid.UUID]:
+    """
+    :param model: the model class, or its table name.
+    :returns: the function generating the IDs of the model (see `set_id_factory()`),
+        or the global one if no model is given.
+    """
+    if model is None:
+        return _default_id_factory
+    return _id_factories.get(_table_name(model), _default_id_factory)
+
+
+class IdDefault:
+    """
+    Python default of the primary keys of the models: generates a new ID
+    with the factory configured for the table (see `set_id_factory()`).
+
+    :param table: the name of the table of the model.
+    """
+
+    def __init__(self, table: str):
+        self.table = table
+
+    def __call__(self) -> uuid.UUID:
+        return _id_factories.get(self.table, _default_id_factory)()
+
+    def __repr__(self):
+        return f"IdDefault({self.table!r})"
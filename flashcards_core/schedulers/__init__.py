@@ -1,31 +1,89 @@
+from typing import Mapping
+
+import logging
+from importlib import import_module
+
 from flashcards_core.errors import ObjectNotFoundException
-from flashcards_core.schedulers.base import BaseScheduler
-from flashcards_core.schedulers.random import RandomScheduler
 
 
-# FIXME we could make algorithms pluggable instead of hardcoding them all... right?
+#: Entry point group other packages can use to register their own schedulers:
+#: each entry point name is an algorithm name, and it must point to a
+#: subclass of BaseScheduler.
+ENTRY_POINTS_GROUP = "flashcards_core.schedulers"
+
+#: Built-in schedulers. Values are 'module:Class' references, imported only
+#: when the algorithm is first used, and then replaced by the class itself.
 SCHEDULERS = {
-    "random": RandomScheduler,
+    "random": "flashcards_core.schedulers.random:RandomScheduler",
+    "ebisu": "flashcards_core.schedulers.ebisu:EbisuScheduler",
+    "weighted_random": "flashcards_core.schedulers.weighted_random:WeightedRandomScheduler",
 }
 
+#: Schedulers found through entry points. Filled on first use.
+_ENTRY_POINT_SCHEDULERS = None
+
+
+def _entry_point_schedulers() -> Mapping:
+    """
+    Returns the schedulers registered through entry points, without
+    importing them. The installed packages are scanned only once.
+    """
+    global _ENTRY_POINT_SCHEDULERS
+    if _ENTRY_POINT_SCHEDULERS is None:
+        try:
+            from importlib.metadata import entry_points
+        except ImportError:  # Python < 3.8
+            try:
+                from importlib_metadata import entry_points
+            except ImportError:
+                logging.warning(
+                    "importlib_metadata is not installed: schedulers registered "
+                    "by other packages won't be found."
+                )
+                _ENTRY_POINT_SCHEDULERS = {}
+                return _ENTRY_POINT_SCHEDULERS
+
+        found = entry_points()
+        if hasattr(found, "select"):
+            found = found.select(group=ENTRY_POINTS_GROUP)
+        else:  # Python < 3.10
+            found = found.get(ENTRY_POINTS_GROUP, [])
+        _ENTRY_POINT_SCHEDULERS = {entry_point.name: entry_point for entry_point in found}
+    return _ENTRY_POINT_SCHEDULERS
+
 
 def get_available_schedulers():
     """
     Returns a list of the known algorithm (scheduler) names.
+    No scheduler is imported.
     """
-    return SCHEDULERS.keys()
+    return SCHEDULERS.keys() | _entry_point_schedulers().keys()
 
 
 def get_scheduler_class(algorithm_name: str):
     """
     Returns the scheduler class corresponding to the given name.
+    The scheduler's module is imported on the first call.
+
+    Built-in schedulers take precedence over the ones registered
+    through entry points.
     """
     scheduler = SCHEDULERS.get(algorithm_name, None)
     if not scheduler:
-        raise ObjectNotFoundException(
-            f"No schedulers found for algorithm '{algorithm_name}' "
-            f"(available schedulers: {list(SCHEDULERS.keys())})"
-        )
+        entry_point = _entry_point_schedulers().get(algorithm_name, None)
+        if not entry_point:
+            raise ObjectNotFoundException(
+                f"No schedulers found for algorithm '{algorithm_name}' "
+                f"(available schedulers: {list(get_available_schedulers())})"
+            )
+        scheduler = entry_point.load()
+        SCHEDULERS[algorithm_name] = scheduler
+
+    elif isinstance(scheduler, str):
+        module_name, class_name = scheduler.split(":")
+        scheduler = getattr(import_module(module_name), class_name)
+        SCHEDULERS[algorithm_name] = scheduler
+
     return scheduler
 
 
@@ -1,9 +1,11 @@
-from typing import Any
+from typing import Any, List, Optional, Sequence, Tuple
 from abc import ABC, abstractmethod
+from datetime import datetime
 
 from sqlalchemy.orm import Session
 
-from flashcards_core.database import Deck, Card
+from flashcards_core.database import Deck, Card, CardState
+from flashcards_core.schedulers.due import DueQueue
 
 
 class BaseScheduler(ABC):
@@ -15,6 +17,8 @@ class BaseScheduler(ABC):
         #: The deck we're studying
         self.deck = deck
 
+        self._due_queue = None
+
     @abstractmethod
     def next_card(self) -> Card:
         """
@@ -35,3 +39,88 @@ class BaseScheduler(ABC):
         :return: None
         """
         raise NotImplementedError("This is the base class, use an implementation.")
+
+    def next_cards(self, number: int) -> List[Card]:
+        """
+        Returns the next cards to review, in order, so that clients can
+        prefetch them.
+
+        This default implementation calls `next_card()` repeatedly without
+        storing any result, so it may return the same card more than once:
+        implementations should override it to return distinct cards.
+
+        :param number: how many cards to return at most
+        :return: a list of Cards to study
+        """
+        return [self.next_card() for _ in range(number)]
+
+    def process_test_results(self, results: Sequence[Tuple]) -> None:
+        """
+        Processes many test results at once, in the order given.
+
+        Each result is a tuple ``(card, result)``, or ``(card, result, review_time)``
+        when the review happened earlier than now (for example offline).
+
+        This default implementation calls `process_test_result()` for each
+        result, ignoring review times: implementations should override it to
+        store all the results in a single transaction.
+
+        :param results: the results to process
+        :return: None
+        """
+        for card, result, *_ in results:
+            self.process_test_result(card=card, result=result)
+
+    @property
+    def due_queue(self) -> DueQueue:
+        """
+        The due times of the cards of the deck, ordered in a heap.
+        Built from the database the first time it's used.
+        """
+        if getattr(self, "_due_queue", None) is None:
+            self._due_queue = DueQueue(session=self.session, deck_id=self.deck.id)
+        return self._due_queue
+
+    def schedule_card(self, card: Card, due_at: Optional[datetime]) -> None:
+        """
+        Sets when the card is due next, for schedulers that work with due times.
+        Updates both the card's CardState and the due queue.
+
+        Note: this method does not commit.
+
+        :param card: the card to schedule
+        :param due_at: when the card is due, or None to unschedule it
+        :return: None
+        """
+        state = CardState.for_card(session=self.session, card=card)
+        state.due_at = due_at
+        if due_at is None:
+            self.due_queue.remove(card.id)
+        else:
+            self.due_queue.push(card.id, due_at)
+
+    def next_due_card(self, due_before: Optional[datetime] = None) -> Optional[Card]:
+        """
+        Returns the card of the deck that is due the earliest, in O(log n).
+
+        The card stays in the due queue: rescheduling it with
+        `schedule_card()` after it's reviewed moves it.
+
+        :param due_before: if given, return a card only if it's due
+            at or before this time.
+        :return: the earliest due Card, or None if no card is due.
+        """
+        while True:
+            entry = self.due_queue.peek()
+            if entry is None:
+                return None
+
+            due_at, card_id = entry
+            if due_before is not None and due_at > due_before:
+                return None
+
+            card = self.session.get(Card, card_id)
+            if card is not None and card.deck_id == self.deck.id:
+                return card
+            # The card was deleted or moved to another deck
+            self.due_queue.remove(card_id)
@@ -0,0 +1,120 @@
+from typing import Dict, List, Optional, Tuple
+
+import heapq
+import logging
+from uuid import UUID
+from datetime import datetime
+
+from sqlalchemy.orm import Session
+
+from flashcards_core.database import CardState
+
+
+class DueQueue:
+    """
+    In-memory mirror of the due times of the cards of a deck, ordered
+    by a binary heap, for schedulers that review cards when they are due.
+
+    The queue is filled from the `card_states` due-time index the first
+    time it's used, and kept in sync by `push()` and `remove()`: after
+    that, finding the earliest due card costs O(log n) and no query.
+
+    Changes made to the due times by other sessions are not seen until
+    `reload()` is called.
+    """
+
+    def __init__(self, session: Session, deck_id: UUID):
+
+        #: The session to use to interact with the database
+        self.session = session
+
+        #: The ID of the deck whose cards are queued
+        self.deck_id = deck_id
+
+        #: Heap of (due time, card ID) tuples. May contain outdated entries,
+        #: which are dropped when they reach the top, or all at once when
+        #: they outnumber the current ones twice (see `_compact()`).
+        self._heap: Optional[List[Tuple[datetime, UUID]]] = None
+
+        #: Current due time of each queued card
+        self._due: Dict[UUID, datetime] = {}
+
+    def reload(self) -> None:
+        """
+        Reads all the due times of the deck again from the database.
+        """
+        # The index returns the rows sorted, and a sorted list is a valid heap.
+        self._heap = CardState.due_cards(
+            session=self.session, deck_id=self.deck_id, limit=None
+        )
+        self._due = {card_id: due_at for due_at, card_id in self._heap}
+        logging.debug(f"Loaded {len(self._heap)} due cards for deck #{self.deck_id}")
+
+    def _loaded_heap(self) -> List[Tuple[datetime, UUID]]:
+        if self._heap is None:
+            self.reload()
+        return self._heap
+
+    def _compact(self) -> None:
+        """
+        Rebuilds the heap from the current due times if outdated entries are
+        more than twice the current ones, so that the heap never grows past
+        three times the number of queued cards. Rebuilding costs O(n), once
+        every O(n) outdated entries at least: O(1) amortized per change.
+        """
+        if len(self._heap) - len(self._due) > 2 * len(self._due):
+            logging.debug(f"Compacting the due queue of deck #{self.deck_id}")
+            self._heap = [(due_at, card_id) for card_id, due_at in self._due.items()]
+            heapq.heapify(self._heap)
+
+    def push(self, card_id: UUID, due_at: datetime) -> None:
+        """
+        Queues a card, or moves it if it was already queued.
+
+        :param card_id: the ID of the card.
+        :param due_at: when the card is due.
+        """
+        heap = self._loaded_heap()
+        self._due[card_id] = due_at
+        heapq.heappush(heap, (due_at, card_id))
+        self._compact()
+
+    def remove(self, card_id: UUID) -> None:
+        """
+        Removes a card from the queue, if it was queued.
+
+        :param card_id: the ID of the card.
+        """
+        self._loaded_heap()
+        if self._due.pop(card_id, None) is not None:
+            self._compact()
+
+    def peek(self) -> Optional[Tuple[datetime, UUID]]:
+        """
+        :returns: the (due time, card ID) of the earliest due card,
+            or None if the queue is empty.
+        """
+        heap = self._loaded_heap()
+        while heap:
+            due_at, card_id = heap[0]
+            if self._due.get(card_id) == due_at:
+                return due_at, card_id
+            # Outdated entry: the card was moved or removed
+            heapq.heappop(heap)
+        return None
+
+    def pop(self) -> Optional[Tuple[datetime, UUID]]:
+        """
+        Removes the earliest due card from the queue.
+
+        :returns: its (due time, card ID), or None if the queue is empty.
+        """
+        entry = self.peek()
+        if entry is not None:
+            heapq.heappop(self._heap)
+            del self._due[entry[1]]
+        return entry
+
+    def __len__(self) -> int:
+        self._loaded_heap()
+        return len(self._due)
@@ -0,0 +1,208 @@
+from typing import Any, List, Sequence, Tuple
+
+import logging
+from datetime import datetime, timedelta
+
+import ebisu
+import numpy as np
+from scipy.special import betaln
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from flashcards_core.errors import NoCardsToStudyException
+from flashcards_core.database import Deck, Card, CardState, Review
+from flashcards_core.database.crud import LEAN
+from flashcards_core.database.transactions import commit
+from flashcards_core.schedulers.base import BaseScheduler
+
+#
+# Parameter keys for EbisuScheduler
+#
+
+#: Initial half-life of a new card's memory model, in hours (default: 24)
+HALF_LIFE = "half_life"
+
+#: Initial alpha (and beta) of a new card's memory model (default: 3.0)
+ALPHA = "alpha"
+
+#: Seen cards are reviewed only if their predicted recall is below this
+#: probability. When no seen card is below it, an unseen card is introduced
+#: instead, if any is left (default: 0.5)
+RECALL_THRESHOLD = "recall_threshold"
+
+#
+# CardState parameters keys for EbisuScheduler
+#
+
+#: Memory model of the card: ``[alpha, beta, t]``
+MODEL = "model"
+
+
+DEFAULT_HALF_LIFE = 24.0
+DEFAULT_ALPHA = 3.0
+DEFAULT_RECALL_THRESHOLD = 0.5
+
+
+#: Time unit of the models
+HOUR = np.timedelta64(1, "h")
+HOUR_DELTA = timedelta(hours=1)
+
+
+class EbisuScheduler(BaseScheduler):
+    """
+    Scheduler based on Ebisu (https://fasiha.github.io/ebisu/).
+
+    Every seen card holds a Bayesian memory model in its CardState, and
+    the next card to review is the one with the lowest predicted recall
+    probability. The predictions for the whole deck are computed in a
+    single vectorized NumPy pass, so ranking large decks stays cheap.
+    """
+
+    def __init__(self, session: Session, deck: Deck):
+        super().__init__(session=session, deck=deck)
+
+    def _parameter(self, key: str, default: float) -> float:
+        if self.deck.parameters is None:
+            return default
+        return float(self.deck.parameters.get(key, default))
+
+    def next_card(self) -> Card:
+        """
+        Returns the next card to review.
+
+        The predicted recall of every seen card is computed at once. If the
+        lowest one is below the deck's `recall_threshold`, that card is
+        returned. Otherwise an unseen card is introduced, if any is left, and
+        if none is left the card with the lowest recall is returned anyway.
+
+        :return: the next Card to study
+        """
+        return self.next_cards(number=1)[0]
+
+    def next_cards(self, number: int) -> List[Card]:
+        """
+        Returns the next cards to review, all different from each other.
+
+        The seen cards whose predicted recall is below the deck's
+        `recall_threshold` come first, weakest first. Then come unseen
+        cards, if any is left, and finally the other seen cards.
+
+        :param number: how many cards to return at most
+        :return: a list of Cards to study
+        """
+        logging.debug(f"Picking the next cards to review from deck {self.deck}")
+        logging.debug(f"Deck params: {self.deck.parameters}")
+
+        # One row per seen card, read from the deck's states
+        stmt = select(
+            CardState.id, CardState.parameters, CardState.last_review_at
+        ).where(CardState.deck_id == self.deck.id)
+        rows = self.session.execute(stmt).all()
+
+        log_recall = np.array([])
+        if rows:
+            # Cards reviewed under another algorithm have no model yet
+            default_model = ebisu.defaultModel(
+                t=self._parameter(HALF_LIFE, DEFAULT_HALF_LIFE),
+                alpha=self._parameter(ALPHA, DEFAULT_ALPHA),
+            )
+            alpha, beta, t = np.array(
+                [row[1].get(MODEL, default_model) for row in rows], dtype=float
+            ).T
+            last_review = np.array([row[2] for row in rows], dtype="datetime64[us]")
+            elapsed = (np.datetime64(datetime.now(), "us") - last_review) / HOUR
+            # Same as ebisu.predictRecall(exact=False), for every card at once
+            log_recall = betaln(alpha + elapsed / t, beta) - betaln(alpha, beta)
+        threshold = np.log(self._parameter(RECALL_THRESHOLD, DEFAULT_RECALL_THRESHOLD))
+
+        cards = []
+        strong_cards = []
+        for index in np.argsort(log_recall):
+            if len(cards) + len(strong_cards) >= number:
+                break
+            card = self.session.get(Card, rows[index][0], options=Card.loading_options(LEAN))
+            # Cards might have been moved since they were reviewed
+            if card is None or card.deck_id != self.deck.id:
+                continue
+            if log_recall[index] < threshold:
+                cards.append(card)
+            else:
+                strong_cards.append(card)
+
+        if len(cards) < number:
+            cards += self.deck.random_cards(
+                session=self.session, number=number - len(cards), unseen_only=True
+            )
+        cards += strong_cards[: number - len(cards)]
+
+        if not cards:
+            raise NoCardsToStudyException("Cannot study on an empty deck.")
+        logging.debug(f"Picked cards {[card.id for card in cards]}")
+        return cards
+
+    def process_test_result(self, card: Card, result: Any) -> None:
+        """
+        Creates a Review for the card and updates its memory model.
+
+        The result is interpreted as a boolean: truthy values are successful
+        reviews, falsy ones are failures. The first review of a card only
+        starts its memory model, with the deck's `half_life` and `alpha`.
+
+        :param card: the card that was reviewed
+        :param result: the results of the test
+        :return: None
+
+        :raise: ValueError if the card does not belong to the deck
+        """
+        self.process_test_results([(card, result)])
+
+    def process_test_results(self, results: Sequence[Tuple]) -> None:
+        """
+        Creates a Review for each card, like `process_test_result()`, and
+        stores all of them and the updated models in a single commit.
+
+        :param results: tuples of ``(card, result)`` or
+            ``(card, result, review_time)``, in the order they were reviewed
+        :return: None
+
+        :raise: ValueError if any card does not belong to the deck. In this
+            case no result is stored.
+        """
+        for card, *_ in results:
+            if card.deck_id != self.deck.id:
+                raise ValueError(f"This card belongs to another deck ({card.deck}).")
+
+        for card, result, *review_time in results:
+            review_time = review_time[0] if review_time else datetime.now()
+            state = card.scheduling_state
+            model = state.parameters.get(MODEL) if state else None
+
+            if model is None:
+                alpha, beta, t = ebisu.defaultModel(
+                    t=self._parameter(HALF_LIFE, DEFAULT_HALF_LIFE),
+                    alpha=self._parameter(ALPHA, DEFAULT_ALPHA),
+                )
+            else:
+                # Ebisu cannot update a model on a zero elapsed time
+                elapsed = max((review_time - state.last_review_at) / HOUR_DELTA, 1e-6)
+                alpha, beta, t = ebisu.updateRecall(
+                    tuple(model), successes=int(bool(result)), total=1, tnow=elapsed
+                )
+            logging.debug(f"New model for card #{card.id}: {(alpha, beta, t)}")
+
+            state = CardState.record_review(
+                session=self.session,
+                card=card,
+                review_time=review_time,
+            )
+            state.parameters[MODEL] = [float(alpha), float(beta), float(t)]
+            self.session.add(
+                Review(
+                    card_id=card.id,
+                    result=result,
+                    algorithm=self.deck.algorithm,
+                    datetime=review_time,
+                )
+            )
+
+        commit(self.session)
@@ -1,13 +1,14 @@
-from typing import Any
+from typing import Any, List, Sequence, Tuple
 
-import random
 import logging
+from uuid import UUID
 from datetime import datetime
 
 from sqlalchemy.orm import Session
 
 from flashcards_core.errors import NoCardsToStudyException
-from flashcards_core.database import Deck, Card, Review
+from flashcards_core.database import Deck, Card, CardState, Review
+from flashcards_core.database.transactions import commit
 from flashcards_core.schedulers.base import BaseScheduler
 
 #
@@ -49,41 +50,50 @@ class RandomScheduler(BaseScheduler):
         :param deck: the deck to pick the next card from
         :return: the next Card to study
         """
-        logging.debug(f"Picking the next card to review from deck {self.deck}")
-        logging.debug(f"This deck has {len(self.deck.cards)} cards.")
+        return self.next_cards(number=1)[0]
+
+    def next_cards(self, number: int) -> List[Card]:
+        """
+        Returns the next cards to review, all different from each other.
+
+        The same rules of `next_card()` apply: unseen cards come first if
+        the deck has `unseen_first: true`, and the last reviewed card is left
+        out if the deck has `never_repeat: true`.
+
+        :param number: how many cards to return at most
+        :return: a list of Cards to study
+        """
+        logging.debug(f"Picking the next cards to review from deck {self.deck}")
         logging.debug(f"Deck params: {self.deck.parameters}")
         logging.debug(f"Deck state: {self.deck.state}")
-        logging.debug(f"Unseen cards: {self.deck.unseen_cards_number()}")
 
-        if len(self.deck.cards) == 0:
+        # Cards are sampled by the database: only the picked cards are loaded.
+        if self.deck.cards_number(session=self.session) == 0:
             raise NoCardsToStudyException("Cannot study on an empty deck.")
 
-        if len(self.deck.cards) == 1:
-            return self.deck.cards[0]
+        cards = []
+        if self.deck.parameters is not None and self.deck.parameters.get(UNSEEN_FIRST):
+            cards = self.deck.random_cards(
+                session=self.session, number=number, unseen_only=True
+            )
 
-        # Give priority to unseen cards if configured to do so
-        if (
-            self.deck.parameters is not None
-            and self.deck.parameters.get(UNSEEN_FIRST)
-            and self.deck.unseen_cards_number() > 0
-        ):
-            logging.debug("Picking from the unseen cards")
-            return random.choice(self.deck.unseen_cards_list())
-
-        # Pick the next card
-        next_card = random.choice(self.deck.cards)
-        logging.debug(f"Picked card #{next_card.id}")
-
-        # Avoid repeating cards if configured to do so
+        exclude_card_ids = [card.id for card in cards]
         if self.deck.parameters is not None and self.deck.parameters.get(NEVER_REPEAT):
             if self.deck.state is not None:
                 last_card_id = self.deck.state.get(LAST_REVIEWED_CARD)
+                if last_card_id is not None:
+                    exclude_card_ids.append(UUID(last_card_id))
 
-                while last_card_id == next_card.id.hex:
-                    logging.debug(f"It's the same card (#{last_card_id}), retrying")
-                    next_card = random.choice(self.deck.cards)
-
-        return next_card
+        cards += self.deck.random_cards(
+            session=self.session,
+            number=number - len(cards),
+            exclude_card_ids=exclude_card_ids,
+        )
+        # Even with never_repeat, a deck with a single card has to repeat it
+        if not cards:
+            cards = self.deck.random_cards(session=self.session, number=1)
+        logging.debug(f"Picked cards {[card.id for card in cards]}")
+        return cards
 
     def process_test_result(self, card: Card, result: Any) -> None:
         """
@@ -94,6 +104,8 @@ class RandomScheduler(BaseScheduler):
         deck is configured to never show the same card twice in
         a row. In addition, storing Reviews is useful to keep track
         of unseen cards, if so requested, and for later statistics.
+        The card's CardState is updated too, counting falsy results
+        as lapses.
 
         A Random deck will probably store boolean results, but in
         practice this is not mandatory and the frontend can choose
@@ -106,28 +118,48 @@ class RandomScheduler(BaseScheduler):
 
         :raise: ValueError if the card does not belong to the deck
         """
-        if card.deck != self.deck:
-            raise ValueError(f"This card belongs to another deck ({card.deck}).")
+        self.process_test_results([(card, result)])
 
-        logging.debug(
-            f"Creating Review for Card '{card}'' "
-            f"with result '{result}' "
-            f"at time (approx.) {datetime.utcnow()}"
-        )
+    def process_test_results(self, results: Sequence[Tuple]) -> None:
+        """
+        Creates a Review for each card, like `process_test_result()`,
+        and stores all of them and the new deck state in a single commit.
 
-        # Create the review
-        Review.create(
-            session=self.session,
-            card_id=card.id,
-            result=result,
-            algorithm=self.deck.algorithm,
-        )
+        :param results: tuples of ``(card, result)`` or
+            ``(card, result, review_time)``, in the order they were reviewed
+        :return: None
 
-        # Update the deck state
-        if not self.deck.state:
-            self.deck.state = {}
-        self.deck.state[LAST_REVIEWED_CARD] = card.id.hex
-        self.deck = Deck.update(
-            session=self.session, object_id=card.deck.id, state=self.deck.state
-        )
+        :raise: ValueError if any card does not belong to the deck. In this
+            case no result is stored.
+        """
+        for card, *_ in results:
+            if card.deck != self.deck:
+                raise ValueError(f"This card belongs to another deck ({card.deck}).")
+
+        for card, result, *review_time in results:
+            review_time = review_time[0] if review_time else datetime.now()
+            logging.debug(
+                f"Creating Review for Card '{card}'' "
+                f"with result '{result}' "
+                f"at time {review_time}"
+            )
+            CardState.record_review(
+                session=self.session,
+                card=card,
+                review_time=review_time,
+            )
+            self.session.add(
+                Review(
+                    card_id=card.id,
+                    result=result,
+                    algorithm=self.deck.algorithm,
+                    datetime=review_time,
+                )
+            )
+            # Update the deck state
+            if not self.deck.state:
+                self.deck.state = {}
+            self.deck.state[LAST_REVIEWED_CARD] = card.id.hex
+
+        commit(self.session)
         logging.debug(f"New deck state: {self.deck.state}")
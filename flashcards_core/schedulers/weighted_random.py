@@ -0,0 +1,374 @@
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+import random
+import logging
+from uuid import UUID
+
+from sqlalchemy import exists, select
+from sqlalchemy.orm import Session
+
+from flashcards_core.errors import NoCardsToStudyException
+from flashcards_core.database import Deck, Card, CardStats, CardTag, Tag
+from flashcards_core.database.models.card_stats import is_successful
+from flashcards_core.database.models.cards import cards_version
+from flashcards_core.schedulers.random import (
+    RandomScheduler,
+    UNSEEN_FIRST,
+    NEVER_REPEAT,
+    LAST_REVIEWED_CARD,
+)
+
+#
+# Parameter keys for WeightedRandomScheduler
+# (UNSEEN_FIRST and NEVER_REPEAT from RandomScheduler apply as well)
+#
+
+#: Weight multiplier of the cards with a given tag, as a mapping of tag
+#: names to multipliers. Cards with many weighted tags get the product of
+#: the multipliers. A multiplier of 0 excludes the cards from the draws.
+TAG_WEIGHTS = "tag_weights"
+
+#: Weight added to a card for each failed review (default: 1.0).
+#: Cards start with a weight of 1.
+FAILURE_WEIGHT = "failure_weight"
+
+DEFAULT_FAILURE_WEIGHT = 1.0
+
+
+class AliasTable:
+    """
+    Walker's alias table (Vose's construction): after an O(n) build,
+    draws an index with probability proportional to its weight in O(1).
+    """
+
+    def __init__(self, weights: Sequence[float]):
+        size = len(weights)
+        total = sum(weights)
+        self.probabilities = [0.0] * size
+        self.aliases = list(range(size))
+        if not size or total <= 0:
+            return
+
+        scaled = [weight * size / total for weight in weights]
+        small = [index for index, value in enumerate(scaled) if value < 1]
+        large = [index for index, value in enumerate(scaled) if value >= 1]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.probabilities[less] = scaled[less]
+            self.aliases[less] = more
+            scaled[more] -= 1 - scaled[less]
+            (small if scaled[more] < 1 else large).append(more)
+        # Leftovers are 1 up to rounding errors
+        for index in small + large:
+            self.probabilities[index] = 1.0
+
+    def draw(self) -> int:
+        """
+        :returns: a random index
+        """
+        index = random.randrange(len(self.probabilities))
+        if random.random() < self.probabilities[index]:
+            return index
+        return self.aliases[index]
+
+
+class FenwickTree:
+    """
+    Binary indexed tree of weights: updates a weight and draws an index
+    with probability proportional to its weight, both in O(log n).
+    """
+
+    def __init__(self, weights: Sequence[float]):
+        self.weights = list(weights)
+        self.tree = [0.0] + self.weights
+        for index in range(1, len(self.tree)):
+            parent = index + (index & -index)
+            if parent < len(self.tree):
+                self.tree[parent] += self.tree[index]
+
+    def add(self, index: int, delta: float) -> None:
+        """
+        Adds `delta` to the weight of the given index.
+        """
+        self.weights[index] += delta
+        index += 1
+        while index < len(self.tree):
+            self.tree[index] += delta
+            index += index & -index
+
+    def find(self, target: float) -> int:
+        """
+        :returns: the index where the cumulative weight goes past `target`.
+            Indexes with no weight are never returned.
+        """
+        position = 0
+        step = 1 << len(self.tree).bit_length()
+        while step:
+            following = position + step
+            if following < len(self.tree) and self.tree[following] <= target:
+                position = following
+                target -= self.tree[following]
+            step >>= 1
+        # Rounding errors might take target past the last weighted index
+        while position >= len(self.weights) or self.weights[position] <= 0:
+            position -= 1
+        return position
+
+
+class WeightedSampler:
+    """
+    Draws keys with probability proportional to their weights, in O(1)
+    most of the time, optionally excluding some keys, without retrying.
+
+    Weights are held in two layers:
+
+    * the base layer, sampled with an alias table in O(1), and mirrored by a
+      Fenwick tree that is used only when the alias table picks an excluded key;
+    * an overlay of weight increases made after the build, kept in a Fenwick
+      tree. It's folded into the base layer by rebuilding once it weighs as
+      much as the base, so rebuilds cost O(1) amortized per increase.
+
+    Draws are exact: excluded keys never come out, and the others come out
+    with probability proportional to their weights.
+    """
+
+    def __init__(self, weights: Dict[Hashable, float]):
+        self.keys = list(weights.keys())
+        self.positions = {key: position for position, key in enumerate(self.keys)}
+        self._build([weights[key] for key in self.keys])
+
+    def _build(self, weights: List[float]) -> None:
+        self.alias = AliasTable(weights)
+        self.base = FenwickTree(weights)
+        self.base_total = sum(weights)
+        self.overlay = FenwickTree([0.0] * len(weights))
+        self.overlay_total = 0.0
+
+    def weight(self, key: Hashable) -> float:
+        """
+        :returns: the current weight of the key.
+        """
+        position = self.positions[key]
+        return self.base.weights[position] + self.overlay.weights[position]
+
+    def increase(self, key: Hashable, delta: float) -> None:
+        """
+        Increases the weight of a key. Decreases are not supported.
+        """
+        if delta < 0:
+            raise ValueError("Weights can only be increased, rebuild the sampler instead.")
+        position = self.positions[key]
+        self.overlay.add(position, delta)
+        self.overlay_total += delta
+        if self.overlay_total > self.base_total:
+            logging.debug("Overlay weights more than the base layer, rebuilding.")
+            self._build([self.weight(key) for key in self.keys])
+
+    def _draw_excluding(self, layer: FenwickTree, total: float, excluded: List[int]) -> int:
+        """
+        Draws from a Fenwick tree layer with the excluded positions carved out.
+        """
+        removed = [layer.weights[position] for position in excluded]
+        for position, weight in zip(excluded, removed):
+            layer.add(position, -weight)
+        try:
+            return layer.find(random.random() * total)
+        finally:
+            for position, weight in zip(excluded, removed):
+                layer.add(position, weight)
+
+    def draw(self, exclude: Iterable[Hashable] = ()) -> Optional[Hashable]:
+        """
+        Draws a key.
+
+        :param exclude: keys that must not be drawn.
+        :returns: the key, or None if all the keys left have no weight.
+        """
+        excluded = sorted({self.positions[key] for key in exclude if key in self.positions})
+        base_total = self.base_total - sum(self.base.weights[p] for p in excluded)
+        overlay_total = self.overlay_total - sum(self.overlay.weights[p] for p in excluded)
+        if base_total + overlay_total <= 1e-12:
+            return None
+
+        if random.random() * (base_total + overlay_total) < base_total:
+            position = self.alias.draw()
+            if position in excluded:
+                position = self._draw_excluding(self.base, base_total, excluded)
+        else:
+            position = self._draw_excluding(self.overlay, overlay_total, excluded)
+        return self.keys[position]
+
+
+class WeightedRandomScheduler(RandomScheduler):
+    """
+    Random scheduler where each card is drawn with a probability
+    proportional to its weight. The weight of a card starts at 1, grows with
+    each failed review (`failure_weight`) and is multiplied by the weights
+    of its tags (`tag_weights`).
+
+    The weights of the deck are read once, with two queries, into a
+    WeightedSampler: each draw then costs O(1), with no query, and each
+    failed review updates the weights incrementally. The sampler is rebuilt
+    only if the parameters of the deck change, if the session creates,
+    deletes, moves or retags cards (see `cards_version()`), or if a card
+    drawn left the deck.
+    """
+
+    def __init__(self, session: Session, deck: Deck):
+        super().__init__(session=session, deck=deck)
+        self._sampler: Optional[WeightedSampler] = None
+        self._multipliers: Dict[UUID, float] = {}
+        self._built_for: Optional[Tuple] = None
+
+    def _failure_weight(self) -> float:
+        return float((self.deck.parameters or {}).get(FAILURE_WEIGHT, DEFAULT_FAILURE_WEIGHT))
+
+    def _build_sampler(self) -> WeightedSampler:
+        tag_weights = (self.deck.parameters or {}).get(TAG_WEIGHTS, {})
+        failure_weight = self._failure_weight()
+
+        lapses_stmt = (
+            select(Card.id, CardStats.reviews_count - CardStats.successes_count)
+            .outerjoin(CardStats, CardStats.id == Card.id)
+            .where(Card.deck_id == self.deck.id)
+        )
+        lapses = {card_id: count or 0 for card_id, count in self.session.execute(lapses_stmt)}
+
+        self._multipliers = {card_id: 1.0 for card_id in lapses}
+        if tag_weights:
+            tags_stmt = (
+                select(CardTag.c.card_id, Tag.name)
+                .join(Tag, Tag.id == CardTag.c.tag_id)
+                .join(Card, Card.id == CardTag.c.card_id)
+                .where(Card.deck_id == self.deck.id, Tag.name.in_(list(tag_weights)))
+            )
+            for card_id, tag_name in self.session.execute(tags_stmt):
+                self._multipliers[card_id] *= float(tag_weights[tag_name])
+
+        logging.debug(f"Building the weighted sampler of deck {self.deck}")
+        return WeightedSampler(
+            {
+                card_id: (1 + failure_weight * lapses[card_id]) * self._multipliers[card_id]
+                for card_id in lapses
+            }
+        )
+
+    @property
+    def sampler(self) -> WeightedSampler:
+        """
+        The sampler of the weights of the deck. Built on first access, and
+        rebuilt when the parameters of the deck change, or when the session
+        creates, deletes, moves or retags cards.
+        """
+        built_for = (cards_version(self.session), repr(self.deck.parameters))
+        if self._sampler is None or self._built_for != built_for:
+            self._sampler = self._build_sampler()
+            self._built_for = built_for
+        return self._sampler
+
+    def _get_card(self, card_id: UUID) -> Optional[Card]:
+        """
+        :returns: the drawn card, or None if it was deleted or moved to
+            another deck after the sampler was built.
+        """
+        card = self.session.get(Card, card_id)
+        if card is None or card.deck_id != self.deck.id:
+            return None
+        return card
+
+    def _draw_cards(self, number: int) -> Optional[List[Card]]:
+        """
+        Draws the cards for `next_cards()`.
+
+        :returns: the cards, or None if a card drawn was deleted or moved to
+            another deck after the sampler was built.
+        """
+        sampler = self.sampler
+        if not sampler.keys:
+            raise NoCardsToStudyException("Cannot study on an empty deck.")
+
+        cards = []
+        if (self.deck.parameters or {}).get(UNSEEN_FIRST):
+            # Cards with weight 0 are never studied, not even when unseen
+            tag_weights = (self.deck.parameters or {}).get(TAG_WEIGHTS, {})
+            zero_tags = [name for name, weight in tag_weights.items() if float(weight) == 0]
+            where = None
+            if zero_tags:
+                where = ~exists().where(
+                    CardTag.c.card_id == Card.id,
+                    CardTag.c.tag_id == Tag.id,
+                    Tag.name.in_(zero_tags),
+                )
+            cards = self.deck.random_cards(
+                session=self.session, number=number, unseen_only=True, where=where
+            )
+
+        excluded = {card.id for card in cards}
+        if (self.deck.parameters or {}).get(NEVER_REPEAT) and self.deck.state:
+            last_card_id = self.deck.state.get(LAST_REVIEWED_CARD)
+            if last_card_id is not None:
+                excluded.add(UUID(last_card_id))
+
+        while len(cards) < number:
+            card_id = sampler.draw(exclude=excluded)
+            if card_id is None:
+                break
+            excluded.add(card_id)
+            card = self._get_card(card_id)
+            if card is None:
+                return None
+            cards.append(card)
+
+        # Even with never_repeat, a deck with a single card has to repeat it
+        if not cards:
+            card_id = sampler.draw()
+            if card_id is None:
+                raise NoCardsToStudyException("All the cards of this deck have weight 0.")
+            card = self._get_card(card_id)
+            if card is None:
+                return None
+            cards.append(card)
+
+        return cards
+
+    def next_cards(self, number: int) -> List[Card]:
+        """
+        Returns the next cards to review, all different from each other,
+        drawn according to their weights.
+
+        Unseen cards come first if the deck has `unseen_first: true`, and the
+        last reviewed card is left out if the deck has `never_repeat: true`.
+        Excluded cards are carved out of the draw, so no draw is ever retried.
+
+        :param number: how many cards to return at most
+        :return: a list of Cards to study
+        """
+        cards = self._draw_cards(number)
+        while cards is None:
+            # The deck changed in a way the session didn't see, like a card
+            # moved by another session: rebuild and draw again
+            logging.debug(f"Drew a card that left deck {self.deck}, rebuilding the sampler")
+            self._sampler = None
+            cards = self._draw_cards(number)
+
+        logging.debug(f"Picked cards {[card.id for card in cards]}")
+        return cards
+
+    def process_test_results(self, results: Sequence[Tuple]) -> None:
+        """
+        Stores the results like RandomScheduler does, and increases the
+        weight of the cards whose review failed.
+
+        :param results: tuples of ``(card, result)`` or
+            ``(card, result, review_time)``, in the order they were reviewed
+        :return: None
+        """
+        super().process_test_results(results=results)
+
+        if self._sampler is not None:
+            failure_weight = self._failure_weight()
+            for card, result, *_ in results:
+                if not is_successful(result) and card.id in self._sampler.positions:
+                    self._sampler.increase(
+                        card.id, failure_weight * self._multipliers[card.id]
+                    )
@@ -1,4 +1,8 @@
-from typing import Any
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+import time
+import logging
+from datetime import datetime
 
 from sqlalchemy.orm import Session
 
@@ -14,12 +18,74 @@ class Study:
 
     This is more of a convenience class than an API, as all
     schedulers should be stateless.
+
+    In write-behind mode, the results passed to `next()` are kept in memory
+    and stored in bulk, in a single transaction, every `flush_every` results,
+    every `flush_interval` seconds, and when the session is closed. The cards
+    to study are prefetched in batches, so that the scheduler always works
+    on stored results, and most calls to `next()` cost no query at all.
+    Remember to `close()` the session, or use it as a context manager:
+
+    .. code-block:: python
+
+        with Study(session=session, deck=deck, write_behind=True) as study:
+            card = study.next()
+            while ...:
+                card = study.next(card, result)
+
+    There is no timer: `flush_interval` is checked by `next()` only, so an
+    idle study session keeps its results buffered until the next call to
+    `next()`, or until it's flushed or closed.
+
+    If the block of the context manager raises, the buffered results are
+    discarded instead of being stored, like a transaction rolled back. The
+    results flushed before are kept.
+
+    Results that were not flushed are lost if the process dies: use
+    `on_flush` to know which results are safely stored.
+
+    :param session: the session (see flashcards_core.database:init_db()).
+    :param deck: the deck to study.
+    :param write_behind: buffer the results instead of storing them right away.
+    :param flush_every: in write-behind mode, store the results when this
+        many are buffered. It's also the number of cards prefetched.
+    :param flush_interval: in write-behind mode, store the buffered results
+        if this many seconds passed since the last flush, on the next call
+        to `next()`.
+    :param on_flush: in write-behind mode, called after every successful flush
+        with the list of ``(card, result, review_time)`` that were stored.
     """
 
-    def __init__(self, session: Session, deck: Deck):
+    def __init__(
+        self,
+        session: Session,
+        deck: Deck,
+        write_behind: bool = False,
+        flush_every: int = 20,
+        flush_interval: float = 30.0,
+        on_flush: Optional[Callable[[List[Tuple]], None]] = None,
+    ):
+        self.session = session
         self.deck = deck
         self.scheduler = get_scheduler_for_deck(session=session, deck=deck)
 
+        self.write_behind = write_behind
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.on_flush = on_flush
+
+        self._pending: List[Tuple] = []
+        self._upcoming: List[Card] = []
+        self._last_flush = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self.discard()
+        self.close()
+
     def next(self, studied_card: Card = None, result: Any = None) -> Card:
         """
         Saves the results of a test and returns the next card to be studied.
@@ -28,6 +94,85 @@ class Study:
         :param result: the result of the review. Type depends on the algorithm.
         :returns: the next Card to study
         """
+        if not self.write_behind:
+            if studied_card:
+                self.scheduler.process_test_result(card=studied_card, result=result)
+            return self.scheduler.next_card()
+
         if studied_card:
-            self.scheduler.process_test_result(card=studied_card, result=result)
-        return self.scheduler.next_card()
+            # Fail now rather than at every flush
+            if studied_card.deck_id != self.deck.id:
+                raise ValueError(f"This card belongs to another deck ({studied_card.deck}).")
+            self._pending.append((studied_card, result, datetime.now()))
+        if (
+            len(self._pending) >= self.flush_every
+            or time.monotonic() - self._last_flush >= self.flush_interval
+        ):
+            self.flush()
+
+        if not self._upcoming:
+            # The scheduler must see all the results before picking new cards
+            self.flush()
+            self._upcoming = self.scheduler.next_cards(number=self.flush_every)
+        return self._upcoming.pop(0)
+
+    def next_batch(self, number: int) -> List[Card]:
+        """
+        Returns the next cards to be studied, in order, so that they can be
+        prefetched and studied offline. Results can then be sent back
+        all at once with `submit_results()`.
+
+        :param number: how many cards to return at most.
+        :returns: a list of Cards to study
+        """
+        self.flush()
+        return self.scheduler.next_cards(number=number)
+
+    def submit_results(self, results: Sequence[Tuple]) -> None:
+        """
+        Saves the results of many tests at once. The schedulers store all the
+        Reviews and the state changes in a single transaction.
+
+        :param results: tuples of ``(card, result)``, in the order the cards were
+            studied. If the cards were studied earlier (for example offline), the
+            time of each review can be given too: ``(card, result, review_time)``.
+        """
+        self.flush()
+        self.scheduler.process_test_results(results=results)
+
+    def flush(self) -> None:
+        """
+        Stores the buffered results, if any, in a single transaction, and then
+        calls `on_flush`. If storing them fails, the transaction is rolled back,
+        the results stay buffered, and the exception is raised again.
+        """
+        self._last_flush = time.monotonic()
+        if not self._pending:
+            return
+
+        results, self._pending = self._pending, []
+        logging.debug(f"Flushing {len(results)} buffered results")
+        try:
+            self.scheduler.process_test_results(results=results)
+        except Exception:
+            self.session.rollback()
+            self._pending = results + self._pending
+            raise
+
+        if self.on_flush:
+            self.on_flush(results)
+
+    def discard(self) -> None:
+        """
+        Drops the buffered results without storing them.
+        """
+        if self._pending:
+            logging.warning(f"Discarding {len(self._pending)} buffered results")
+        self._pending = []
+
+    def close(self) -> None:
+        """
+        Ends the study session, storing any buffered result.
+        """
+        self.flush()
+        self._upcoming = []
@@ -0,0 +1,173 @@
+import pytest
+import asyncio
+
+from flashcards_core.database import init_db_async, batch_async, Card, Deck, Fact, Tag
+from flashcards_core.database import enable_name_cache, disable_name_cache
+from flashcards_core.database import bulk_tag_async, bulk_untag_async, HasTag
+from flashcards_core.database import dispose_engines_async
+from flashcards_core.errors import ObjectNotFoundException
+from sqlalchemy import text
+
+pytest.importorskip("aiosqlite")
+
+
+@pytest.fixture
+def async_sessionmaker(tmpdir):
+    return asyncio.run(init_db_async(database_path=f"sqlite+aiosqlite:///{tmpdir}/async.db"))
+
+
+def run(async_sessionmaker, test):
+    async def wrapper():
+        async with async_sessionmaker() as session:
+            await test(session)
+
+    asyncio.run(wrapper())
+
+
+def test_async_crud(async_sessionmaker):
+    async def test(session):
+        fact = await Fact.create_async(session=session, value="A", format="a")
+        assert await Fact.get_one_async(session=session, object_id=fact.id) == fact
+
+        updated = await Fact.update_async(session=session, object_id=fact.id, value="B")
+        assert updated.value == "B"
+
+        await Fact.delete_async(session=session, object_id=fact.id)
+        assert not await Fact.get_all_async(session=session)
+        with pytest.raises(ObjectNotFoundException):
+            await Fact.update_async(session=session, object_id=fact.id, value="C")
+        with pytest.raises(ObjectNotFoundException):
+            await Fact.delete_async(session=session, object_id=fact.id)
+
+    run(async_sessionmaker, test)
+
+
+def test_async_get_by_name(async_sessionmaker):
+    async def test(session):
+        deck = await Deck.create_async(
+            session=session, name="deck", description="", algorithm="random"
+        )
+        tag = await Tag.create_async(session=session, name="tag")
+        assert await Deck.get_by_name_async(session=session, name="deck") == deck
+        assert await Tag.get_by_name_async(session=session, name="tag") == tag
+        assert not await Tag.get_by_name_async(session=session, name="wrong")
+
+    run(async_sessionmaker, test)
+
+
+def test_async_get_by_name_cached(async_sessionmaker):
+    async def test(session):
+        cache = enable_name_cache()
+        try:
+            tag = await Tag.create_async(session=session, name="tag")
+            assert await Tag.get_by_name_async(session=session, name="tag") == tag
+            assert await Tag.get_id_by_name_async(session=session, name="tag") == tag.id
+            assert await Tag.get_ids_by_names_async(session=session, names=["tag", "no"]) == {
+                "tag": tag.id
+            }
+            assert cache.info().hits == 2
+
+            await Tag.update_async(session=session, object_id=tag.id, name="renamed")
+            assert not await Tag.get_id_by_name_async(session=session, name="tag")
+        finally:
+            disable_name_cache()
+
+    run(async_sessionmaker, test)
+
+
+def test_async_bulk_tag(async_sessionmaker):
+    async def test(session):
+        fact = await Fact.create_async(session=session, value="A", format="a")
+        tags = [await Tag.create_async(session=session, name=name) for name in ("a", "b")]
+        tag_ids = [tag.id for tag in tags]
+        await fact.assign_tags_async(session=session, tag_ids=tag_ids[:1])
+        assert fact.tags == tags[:1]
+
+        assert await bulk_tag_async(session=session, objects=[fact], tag_ids=tag_ids) == 1
+        assert await bulk_untag_async(session=session, objects=[fact], tag_ids=tag_ids) == 2
+        await fact.assign_tags_async(session=session, tag_ids=tag_ids[1:])
+        assert fact.tags == tags[1:]
+        await fact.remove_tags_async(session=session, tag_ids=tag_ids)
+        assert fact.tags == []
+
+    run(async_sessionmaker, test)
+
+
+def test_async_get_by_tags(async_sessionmaker):
+    async def test(session):
+        fact = await Fact.create_async(session=session, value="A", format="a")
+        other = await Fact.create_async(session=session, value="B", format="b")
+        tag = await Tag.create_async(session=session, name="tag")
+        await fact.assign_tags_async(session=session, tag_ids=[tag.id])
+
+        ids = await Fact.get_ids_by_tags_async(session=session, tags=~HasTag(tag.id))
+        assert ids == ([other.id], None)
+        facts, cursor = await Fact.get_page_by_tags_async(
+            session=session, tags=HasTag(tag.id), limit=1
+        )
+        assert facts == [fact]
+        assert await Fact.get_page_by_tags_async(
+            session=session, tags=HasTag(tag.id), cursor=cursor
+        ) == ([], None)
+
+    run(async_sessionmaker, test)
+
+
+def test_async_card_with_tags_in_batch(async_sessionmaker):
+    async def test(session):
+        async with batch_async(session):
+            deck = await Deck.create_async(
+                session=session, name="deck", description="", algorithm="random"
+            )
+            fact = await Fact.create_async(session=session, value="A", format="a")
+            tag = await Tag.create_async(session=session, name="tag")
+            other_tag = await Tag.create_async(session=session, name="other")
+            card = await Card.create_async(
+                session=session, deck_id=deck.id, question_id=fact.id, answer_id=fact.id
+            )
+            await card.assign_tag_async(session=session, tag_id=tag.id)
+            await card.assign_tag_async(session=session, tag_id=other_tag.id)
+        await card.remove_tag_async(session=session, tag_id=other_tag.id)
+        assert card.tags == [tag]
+        assert await deck.unseen_cards_number_async(session=session) == 1
+
+    run(async_sessionmaker, test)
+
+
+def test_async_failed_bulk_delete_in_batch_leaves_no_partial_changes(async_sessionmaker):
+    async def test(session):
+        fact = await Fact.create_async(session=session, value="A", format="a")
+        missing_id = (await Fact.create_async(session=session, value="B", format="b")).id
+        await Fact.delete_async(session=session, object_id=missing_id)
+        async with batch_async(session):
+            with pytest.raises(ObjectNotFoundException):
+                await Fact.bulk_delete_async(session=session, object_ids=[fact.id, missing_id])
+            await Fact.create_async(session=session, value="C", format="c")
+        facts = await Fact.get_all_async(session=session)
+        assert sorted(fact.value for fact in facts) == ["A", "C"]
+
+    run(async_sessionmaker, test)
+
+
+def test_async_sqlite_profile(tmpdir):
+    async def test():
+        sessionmaker = await init_db_async(
+            database_path=f"sqlite+aiosqlite:///{tmpdir}/fast.db", sqlite_profile="performance"
+        )
+        async with sessionmaker() as session:
+            assert (await session.execute(text("PRAGMA journal_mode"))).scalar() == "wal"
+            assert (await session.execute(text("PRAGMA busy_timeout"))).scalar() == 5000
+        # Pooled aiosqlite connections would keep the process alive
+        await dispose_engines_async()
+
+    asyncio.run(test())
+
+
+def test_async_init_db_reuses_engines(tmpdir):
+    async def test():
+        path = f"sqlite+aiosqlite:///{tmpdir}/reused.db"
+        sessionmaker = await init_db_async(database_path=path)
+        assert await init_db_async(database_path=path) is sessionmaker
+        assert await init_db_async(database_path=path, create_tables=False) is sessionmaker
+
+    asyncio.run(test())
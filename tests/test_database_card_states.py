@@ -0,0 +1,59 @@
+import datetime
+from freezegun import freeze_time
+
+from flashcards_core.database import Card, CardState, Deck, Fact
+
+
+def create_card(session):
+    deck = Deck.create(session=session, name="test", description="test", algorithm="test")
+    fact = Fact.create(session=session, value="fact", format="plaintext")
+    return Card.create(
+        session=session, deck_id=deck.id, question_id=fact.id, answer_id=fact.id
+    )
+
+
+@freeze_time("2021-01-01 12:00:00")
+def test_card_state_record_first_review(session):
+    card = create_card(session)
+    state = CardState.record_review(session=session, card=card)
+    session.commit()
+
+    assert state == CardState.get_one(session=session, object_id=card.id)
+    assert state.deck_id == card.deck_id
+    assert state.last_review_at == datetime.datetime.now()
+    assert state.due_at is None
+    assert state.parameters == {}
+
+
+def test_card_state_record_many_reviews(session):
+    card = create_card(session)
+    CardState.record_review(session=session, card=card)
+    CardState.record_review(session=session, card=card)
+    CardState.record_review(
+        session=session,
+        card=card,
+        review_time=datetime.datetime(2021, 1, 1, 12, 0, 0),
+    )
+    session.commit()
+
+    state = CardState.get_one(session=session, object_id=card.id)
+    assert state.last_review_at == datetime.datetime(2021, 1, 1, 12, 0, 0)
+
+
+def test_card_state_deleted_with_card(session):
+    card = create_card(session)
+    CardState.record_review(session=session, card=card)
+    session.commit()
+    Card.delete(session=session, object_id=card.id)
+    assert not CardState.get_one(session=session, object_id=card.id)
+
+
+def test_card_state_repr(session):
+    card = create_card(session)
+    state = CardState.record_review(
+        session=session, card=card, review_time=datetime.datetime(2021, 1, 1, 12, 0, 0)
+    )
+    assert (
+        f"<CardState of card #{card.id}: last reviewed at 2021-01-01 12:00:00, due at None>"
+        == f"{state}"
+    )
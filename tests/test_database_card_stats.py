@@ -0,0 +1,164 @@
+import datetime
+import pytest
+from sqlalchemy import select
+
+from flashcards_core.database import Card, CardStats, Deck, Fact, Review, batch
+from flashcards_core.database.models.card_stats import is_successful
+from flashcards_core.schedulers import get_scheduler_for_deck
+
+
+DAY = datetime.timedelta(days=1)
+START = datetime.datetime(2021, 1, 1, 12, 0, 0)
+
+
+@pytest.fixture()
+def cards(session):
+    deck = Deck.create(session=session, name="deck", description="", algorithm="random")
+    fact = Fact.create(session=session, value="A", format="a")
+    return [
+        Card.create(session=session, deck_id=deck.id, question_id=fact.id, answer_id=fact.id)
+        for _ in range(3)
+    ]
+
+
+def stats(session, card):
+    """
+    The statistics of the card as stored in the database, or None.
+    """
+    session.expire_all()
+    row = session.execute(
+        select(CardStats.reviews_count, CardStats.successes_count, CardStats.last_review_at)
+        .where(CardStats.id == card.id)
+    ).first()
+    return tuple(row) if row else None
+
+
+@pytest.mark.parametrize(
+    "result,successful",
+    [
+        (True, True),
+        (1, True),
+        ("good", True),
+        (False, False),
+        (0, False),
+        ("0", False),
+        ("False", False),
+        ("", False),
+    ],
+)
+def test_is_successful(result, successful):
+    assert is_successful(result) == successful
+
+
+def test_card_stats_follow_reviews_create_update_delete(session, cards):
+    card, other, _ = cards
+    assert stats(session, card) is None
+
+    first = Review.create(
+        session=session, card_id=card.id, result=True, algorithm="a", datetime=START + DAY
+    )
+    Review.create(session=session, card_id=card.id, result=False, algorithm="a", datetime=START)
+    assert stats(session, card) == (2, 1, START + DAY)
+    assert card.stats.success_ratio == 0.5
+    assert card.stats.failures_count == 1
+
+    Review.update(session=session, object_id=first.id, result=False)
+    assert stats(session, card) == (2, 0, START + DAY)
+
+    Review.update(session=session, object_id=first.id, card_id=other.id)
+    assert stats(session, card) == (1, 0, START)
+    assert stats(session, other) == (1, 0, START + DAY)
+
+    Review.delete(session=session, object_id=first.id)
+    assert stats(session, other) == (0, 0, None)
+    assert CardStats.get_one(session=session, object_id=other.id).success_ratio is None
+
+
+def test_card_stats_loaded_in_the_session_are_reloaded(session, cards):
+    card, other, _ = cards
+    with batch(session):
+        assert card.stats is None
+        first = Review.create(session=session, card_id=card.id, result=True, algorithm="a")
+        assert card.stats.reviews_count == 1
+
+        loaded = CardStats.get_one(session=session, object_id=card.id)
+        Review.create(session=session, card_id=card.id, result=False, algorithm="a")
+        assert loaded.reviews_count == 2
+        assert card.stats is loaded
+
+        assert other.stats is None
+        Review.update(session=session, object_id=first.id, card_id=other.id)
+        assert (loaded.reviews_count, loaded.successes_count) == (1, 0)
+        assert other.stats.reviews_count == 1
+
+        Review.delete(session=session, object_id=first.id)
+        assert other.stats.reviews_count == 0
+
+
+def test_card_stats_follow_the_schedulers(session, cards):
+    card = cards[0]
+    scheduler = get_scheduler_for_deck(session=session, deck=card.deck)
+    scheduler.process_test_results([(card, True, START), (card, False, START + DAY)])
+    assert stats(session, card) == (2, 1, START + DAY)
+
+
+def test_card_stats_follow_bulk_operations(session, cards):
+    card, other, untouched = cards
+    Review.create(session=session, card_id=untouched.id, result=True, algorithm="a")
+    before = stats(session, untouched)
+
+    ids = Review.bulk_create(
+        session=session,
+        objects=[
+            {"card_id": card.id, "result": True, "algorithm": "a", "datetime": START + i * DAY}
+            for i in range(3)
+        ]
+        + [{"card_id": other.id, "result": False, "algorithm": "a", "datetime": START}],
+        return_ids=True,
+    )
+    assert stats(session, card) == (3, 3, START + 2 * DAY)
+    assert stats(session, other) == (1, 0, START)
+
+    Review.bulk_update(
+        session=session,
+        objects=[{"id": ids[0], "result": False}, {"id": ids[2], "card_id": other.id}],
+    )
+    assert stats(session, card) == (2, 1, START + DAY)
+    assert stats(session, other) == (2, 1, START + 2 * DAY)
+
+    Review.bulk_delete(session=session, object_ids=ids[:2])
+    assert stats(session, card) == (0, 0, None)
+    assert stats(session, other) == (2, 1, START + 2 * DAY)
+    assert stats(session, untouched) == before
+
+
+def test_card_stats_deleted_with_their_card(session, cards):
+    card, other, _ = cards
+    for reviewed in (card, other):
+        Review.create(session=session, card_id=reviewed.id, result=True, algorithm="a")
+        Review.create(session=session, card_id=reviewed.id, result=False, algorithm="a")
+
+    Card.delete(session=session, object_id=card.id)
+    Card.bulk_delete(session=session, object_ids=[other.id])
+    assert not CardStats.get_all(session=session)
+
+
+def test_card_stats_rebuild(session, cards):
+    card = cards[0]
+    session.execute(
+        Review.__table__.insert(),
+        [
+            {
+                "id": Review.id.default.arg(None),
+                "card_id": card.id,
+                "result": result,
+                "algorithm": "a",
+                "datetime": START,
+            }
+            for result in ("1", "0", "1")
+        ],
+    )
+    session.commit()
+    assert stats(session, card) is None
+    CardStats.rebuild(session=session)
+    assert stats(session, card) == (3, 2, START)
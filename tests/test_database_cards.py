@@ -1,6 +1,7 @@
 import pytest
 from sqlalchemy.exc import IntegrityError
-from flashcards_core.database import Deck, Card, Fact, Tag
+from sqlalchemy import event
+from flashcards_core.database import Deck, Card, CardTag, Fact, Review, Tag, batch
 
 
 def test_card_create_empty_card(session):
@@ -69,3 +70,136 @@ def test_card_assign_and_remove_answer_contex(session):
     assert len(card.answer_context_facts) == 1
     card.remove_answer_context(session=session, fact_id=answer_context.id)
     assert len(card.answer_context_facts) == 0
+
+
+def test_card_bulk_create_and_delete_with_cascades(session):
+    deck = Deck.create(session=session, name="1", description="1", algorithm="a")
+    fact = Fact.create(session=session, value="A", format="a")
+    tag = Tag.create(session=session, name="tag")
+    ids = Card.bulk_create(
+        session=session,
+        objects=[
+            {"deck_id": deck.id, "question_id": fact.id, "answer_id": fact.id}
+            for _ in range(3)
+        ],
+        return_ids=True,
+    )
+    cards = [Card.get_one(session=session, object_id=card_id) for card_id in ids]
+    assert all(card.deck == deck for card in cards)
+    cards[0].assign_tag(session=session, tag_id=tag.id)
+    Review.create(session=session, card_id=ids[0], result="1", algorithm="a")
+
+    Card.bulk_delete(session=session, object_ids=ids[:2])
+    assert Card.get_all(session=session) == [cards[2]]
+    assert not Review.get_all(session=session)
+    assert not session.execute(CardTag.select()).all()
+    # The tag itself is not deleted
+    assert Tag.get_one(session=session, object_id=tag.id)
+
+
+def test_card_iter_all_loads_no_relationships(session):
+    deck = Deck.create(session=session, name="1", description="1", algorithm="a")
+    fact = Fact.create(session=session, value="A", format="a")
+    Card.bulk_create(
+        session=session,
+        objects=[{"deck_id": deck.id, "question_id": fact.id, "answer_id": fact.id}] * 3,
+    )
+    deck_id = deck.id
+    session.expunge_all()
+    cards = list(Card.iter_all(session=session, chunk_size=2))
+    assert len(cards) == 3
+    assert all("reviews" not in card.__dict__ and "deck" not in card.__dict__ for card in cards)
+    # Relationships are still loaded on access
+    assert cards[0].deck.id == deck_id
+
+
+def test_card_build_in_batch_commits_once(session):
+    commits = []
+    event.listen(session, "after_commit", lambda session: commits.append(session))
+    deck = Deck.create(session=session, name="1", description="1", algorithm="a")
+    tag = Tag.create(session=session, name="tag")
+    commits.clear()
+
+    with batch(session):
+        question = Fact.create(session=session, value="A", format="a")
+        answer = Fact.create(session=session, value="B", format="b")
+        context = Fact.create(session=session, value="C", format="c")
+        card = Card.create(
+            session=session, deck_id=deck.id, question_id=question.id, answer_id=answer.id
+        )
+        card.assign_tag(session=session, tag_id=tag.id)
+        card.assign_question_context(session=session, fact_id=context.id)
+        card.assign_answer_context(session=session, fact_id=context.id)
+        assert not commits
+    assert len(commits) == 1
+    assert card.tags == [tag]
+    assert card.question_context_facts == [context]
+
+
+def test_card_batch_rolls_back_on_errors(session):
+    deck = Deck.create(session=session, name="1", description="1", algorithm="a")
+    with pytest.raises(IntegrityError):
+        with batch(session):
+            fact = Fact.create(session=session, value="A", format="a")
+            with batch(session):
+                Card.create(session=session, deck_id=deck.id, question_id=fact.id)
+    assert not Fact.get_all(session=session)
+    assert not Card.get_all(session=session)
+
+
+def test_card_remove_tag_from_one_card_only(session):
+    deck = Deck.create(session=session, name="1", description="1", algorithm="a")
+    fact = Fact.create(session=session, value="A", format="a")
+    tag = Tag.create(session=session, name="tag")
+    card = Card.create(session=session, deck_id=deck.id, question_id=fact.id, answer_id=fact.id)
+    other = Card.create(session=session, deck_id=deck.id, question_id=fact.id, answer_id=fact.id)
+    card.assign_tag(session=session, tag_id=tag.id)
+    other.assign_tag(session=session, tag_id=tag.id)
+    card.remove_tag(session=session, tag_id=tag.id)
+    assert card.tags == []
+    assert other.tags == [tag]
+
+
+def test_card_loading_profiles(session):
+    deck = Deck.create(session=session, name="1", description="1", algorithm="a")
+    fact = Fact.create(session=session, value="A", format="a")
+    card = Card.create(session=session, deck_id=deck.id, question_id=fact.id, answer_id=fact.id)
+    card_id = card.id
+
+    session.expunge_all()
+    card = Card.get_one(session=session, object_id=card_id, profile="render")
+    assert {"question", "answer", "tags", "question_context_facts"} <= card.__dict__.keys()
+    assert not {"deck", "reviews", "related_cards"} & card.__dict__.keys()
+    assert "tags" not in card.question.__dict__
+
+    session.expunge_all()
+    card = Card.get_one(session=session, object_id=card_id, profile="lean")
+    assert not {"question", "deck", "reviews", "tags"} & card.__dict__.keys()
+    # Relationships are still loaded on access
+    assert card.question.value == "A"
+
+    session.expunge_all()
+    card = Card.get_all(session=session, profile="full")[0]
+    assert {"question", "answer", "tags", "question_context_facts"} <= card.__dict__.keys()
+    # Collections that grow with use are loaded on access only
+    assert not {"deck", "reviews", "related_cards"} & card.__dict__.keys()
+
+    with pytest.raises(ValueError):
+        Card.get_one(session=session, object_id=card_id, profile="wrong")
+
+
+def test_card_remove_context_from_one_card_only(session):
+    deck = Deck.create(session=session, name="1", description="1", algorithm="a")
+    fact = Fact.create(session=session, value="A", format="a")
+    context = Fact.create(session=session, value="A-context", format="a")
+    card = Card.create(session=session, deck_id=deck.id, question_id=fact.id, answer_id=fact.id)
+    other = Card.create(session=session, deck_id=deck.id, question_id=fact.id, answer_id=fact.id)
+    for each in (card, other):
+        each.assign_question_context(session=session, fact_id=context.id)
+        each.assign_answer_context(session=session, fact_id=context.id)
+    card.remove_question_context(session=session, fact_id=context.id)
+    card.remove_answer_context(session=session, fact_id=context.id)
+    assert card.question_context_facts == []
+    assert card.answer_context_facts == []
+    assert other.question_context_facts == [context]
+    assert other.answer_context_facts == [context]
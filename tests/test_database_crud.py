@@ -1,6 +1,7 @@
 import pytest
 from conftest import StubCrud
 from flashcards_core.errors import ObjectNotFoundException
+from flashcards_core.database import batch
 
 
 def test_crud_get_all_empty(session):
@@ -56,3 +57,160 @@ def test_crud_create_delete_and_get(session):
 def test_crud_delete_not_created(session):
     with pytest.raises(ObjectNotFoundException):
         StubCrud.delete(session=session, object_id=1)
+
+
+def test_crud_bulk_create(session):
+    assert StubCrud.bulk_create(session=session, objects=[{"value": 1}, {"value": 2}]) is None
+    assert sorted(stub.value for stub in StubCrud.get_all(session=session)) == [1, 2]
+
+
+def test_crud_bulk_create_return_ids(session):
+    ids = StubCrud.bulk_create(
+        session=session, objects=[{"value": 1}, {"id": 10, "value": 2}, {}], return_ids=True
+    )
+    assert ids[1] == 10
+    assert [StubCrud.get_one(session=session, object_id=id).value for id in ids] == [1, 2, None]
+
+
+def test_crud_bulk_create_unknown_field(session):
+    with pytest.raises(ValueError):
+        StubCrud.bulk_create(session=session, objects=[{"value": 1}, {"wrong": 2}])
+    assert not StubCrud.get_all(session=session)
+
+
+def test_crud_bulk_update(session):
+    ids = StubCrud.bulk_create(
+        session=session, objects=[{"value": 1}, {"value": 2}, {"value": 3}], return_ids=True
+    )
+    StubCrud.bulk_update(
+        session=session, objects=[{"id": ids[0], "value": 10}, {"id": ids[2], "value": 30}]
+    )
+    assert [StubCrud.get_one(session=session, object_id=id).value for id in ids] == [10, 2, 30]
+
+
+def test_crud_bulk_update_not_created(session):
+    stub = StubCrud.create(session=session, value=1)
+    with pytest.raises(ObjectNotFoundException):
+        StubCrud.bulk_update(
+            session=session, objects=[{"id": stub.id, "value": 10}, {"id": 1000, "value": 2}]
+        )
+    assert StubCrud.get_one(session=session, object_id=stub.id).value == 1
+
+
+def test_crud_bulk_delete(session):
+    ids = StubCrud.bulk_create(
+        session=session, objects=[{"value": value} for value in range(1200)], return_ids=True
+    )
+    StubCrud.bulk_delete(session=session, object_ids=ids[:1100])
+    assert [stub.id for stub in StubCrud.get_all(session=session)] == ids[1100:]
+
+
+def test_crud_bulk_delete_not_created(session):
+    stub = StubCrud.create(session=session, value=1)
+    with pytest.raises(ObjectNotFoundException):
+        StubCrud.bulk_delete(session=session, object_ids=[stub.id, 1000])
+    assert StubCrud.get_one(session=session, object_id=stub.id)
+
+
+def test_crud_bulk_errors_caught_in_batch_keep_the_batch(session):
+    with batch(session):
+        StubCrud.create(session=session, value=1)
+        with pytest.raises(ObjectNotFoundException):
+            StubCrud.bulk_delete(session=session, object_ids=[1000])
+        with pytest.raises(ObjectNotFoundException):
+            StubCrud.bulk_update(session=session, objects=[{"id": 1000, "value": 2}])
+        StubCrud.create(session=session, value=3)
+    assert [stub.value for stub in StubCrud.get_all(session=session)] == [1, 3]
+
+
+def test_crud_failed_bulk_operations_in_batch_leave_no_partial_changes(session):
+    existing = StubCrud.create(session=session, value=1)
+    with batch(session):
+        with pytest.raises(ObjectNotFoundException):
+            StubCrud.bulk_delete(session=session, object_ids=[existing.id, 1000])
+        with pytest.raises(ObjectNotFoundException):
+            StubCrud.bulk_update(
+                session=session,
+                objects=[{"id": existing.id, "value": 2}, {"id": 1000, "value": 2}],
+            )
+        StubCrud.create(session=session, value=3)
+    assert [stub.value for stub in StubCrud.get_all(session=session)] == [1, 3]
+
+
+def test_crud_bulk_operations_in_batch_roll_back_with_the_batch(session):
+    # The bulk operation is the first write of the transaction
+    with pytest.raises(RuntimeError):
+        with batch(session):
+            StubCrud.bulk_create(session=session, objects=[{"value": 1}])
+            raise RuntimeError()
+    assert not StubCrud.get_all(session=session)
+
+
+def test_crud_get_page(session):
+    StubCrud.bulk_create(session=session, objects=[{"value": value} for value in range(25)])
+    pages = []
+    objects, cursor = StubCrud.get_page(session=session, limit=10)
+    pages.append(objects)
+    while cursor:
+        objects, cursor = StubCrud.get_page(session=session, cursor=cursor, limit=10)
+        pages.append(objects)
+    assert [len(page) for page in pages] == [10, 10, 5]
+    assert [stub.value for page in pages for stub in page] == list(range(25))
+
+
+def test_crud_get_page_order_by(session):
+    StubCrud.bulk_create(
+        session=session, objects=[{"value": value % 3} for value in range(9)]
+    )
+    objects, cursor = StubCrud.get_page(
+        session=session, limit=4, order_by="value", descending=True
+    )
+    objects_2, cursor = StubCrud.get_page(
+        session=session, cursor=cursor, limit=4, order_by="value", descending=True
+    )
+    objects_3, cursor = StubCrud.get_page(
+        session=session, cursor=cursor, limit=4, order_by="value", descending=True
+    )
+    assert cursor is None
+    assert [(stub.value, stub.id) for stub in objects + objects_2 + objects_3] == sorted(
+        ((stub.value, stub.id) for stub in StubCrud.get_all(session=session)), reverse=True
+    )
+
+
+def test_crud_get_page_invalid_cursor(session):
+    StubCrud.bulk_create(session=session, objects=[{"value": value} for value in range(3)])
+    _, cursor = StubCrud.get_page(session=session, limit=1, order_by="value")
+    with pytest.raises(ValueError):
+        StubCrud.get_page(session=session, cursor=cursor, limit=1)
+    with pytest.raises(ValueError):
+        StubCrud.get_page(session=session, cursor="not a cursor", limit=1)
+    with pytest.raises(ValueError):
+        StubCrud.get_page(session=session, limit=1, order_by="wrong")
+
+
+def test_crud_iter_all(session):
+    StubCrud.bulk_create(session=session, objects=[{"value": value} for value in range(25)])
+    stubs = StubCrud.iter_all(session=session, chunk_size=10)
+    assert sorted(stub.value for stub in stubs) == list(range(25))
+
+
+@pytest.mark.parametrize("descending", [False, True])
+def test_crud_get_page_order_by_nullable_column(session, descending):
+    StubCrud.bulk_create(
+        session=session,
+        objects=[{"value": None if value % 3 == 0 else value % 2} for value in range(10)],
+    )
+    objects, cursor = StubCrud.get_page(
+        session=session, limit=3, order_by="value", descending=descending
+    )
+    while cursor:
+        page, cursor = StubCrud.get_page(
+            session=session, cursor=cursor, limit=3, order_by="value", descending=descending
+        )
+        objects += page
+    # NULLs come last, or first in descending order
+    def sort_key(stub):
+        return stub.value is None, stub.value or 0, stub.id
+
+    expected = sorted(StubCrud.get_all(session=session), key=sort_key, reverse=descending)
+    assert [sort_key(stub) for stub in objects] == [sort_key(stub) for stub in expected]
@@ -1,4 +1,5 @@
 from flashcards_core.database import Deck, Card, Fact, Review, Tag
+from flashcards_core.database.transactions import commit
 
 
 def test_deck_create_minimum(session):
@@ -196,3 +197,100 @@ def test_deck_assign_and_remove_tag(session):
     assert len(deck.tags) == 1
     deck.remove_tag(session=session, tag_id=tag.id)
     assert len(deck.tags) == 0
+
+
+def test_deck_unseen_cards_ignores_other_decks(session):
+    deck = Deck.create(session=session, name="Test", description="a", algorithm="random")
+    other_deck = Deck.create(
+        session=session, name="Other", description="b", algorithm="random"
+    )
+    question = Fact.create(session=session, value="A", format="a")
+    answer = Fact.create(session=session, value="B", format="b")
+    card = Card.create(
+        session=session, deck_id=deck.id, question_id=question.id, answer_id=answer.id
+    )
+    Card.create(
+        session=session,
+        deck_id=other_deck.id,
+        question_id=question.id,
+        answer_id=answer.id,
+    )
+    assert deck.unseen_cards_number(session=session) == 1
+    assert deck.unseen_cards_list(session=session) == [card]
+
+
+def test_deck_cards_number(session):
+    deck = Deck.create(session=session, name="Test", description="a", algorithm="random")
+    fact = Fact.create(session=session, value="A", format="a")
+    assert deck.cards_number(session=session) == 0
+    for i in range(3):
+        Card.create(session=session, deck_id=deck.id, question_id=fact.id, answer_id=fact.id)
+    assert deck.cards_number(session=session) == 3
+
+
+def test_deck_random_card_empty_deck(session):
+    deck = Deck.create(session=session, name="Test", description="a", algorithm="random")
+    assert deck.random_card(session=session) is None
+
+
+def test_deck_random_card_exclude_card(session):
+    deck = Deck.create(session=session, name="Test", description="a", algorithm="random")
+    fact = Fact.create(session=session, value="A", format="a")
+    card1 = Card.create(
+        session=session, deck_id=deck.id, question_id=fact.id, answer_id=fact.id
+    )
+    card2 = Card.create(
+        session=session, deck_id=deck.id, question_id=fact.id, answer_id=fact.id
+    )
+    for i in range(10):
+        assert deck.random_card(session=session, exclude_card_id=card1.id) == card2
+
+
+def test_deck_random_card_unseen_only(session):
+    deck = Deck.create(session=session, name="Test", description="a", algorithm="random")
+    fact = Fact.create(session=session, value="A", format="a")
+    seen_card = Card.create(
+        session=session, deck_id=deck.id, question_id=fact.id, answer_id=fact.id
+    )
+    unseen_card = Card.create(
+        session=session, deck_id=deck.id, question_id=fact.id, answer_id=fact.id
+    )
+    Review.create(session=session, result=True, card_id=seen_card.id, algorithm="a")
+    for i in range(10):
+        assert deck.random_card(session=session, unseen_only=True) == unseen_card
+
+
+def test_deck_get_by_name_lean_loads_no_cards(session):
+    deck = Deck.create(session=session, name="deck", description="", algorithm="random")
+    fact = Fact.create(session=session, value="A", format="a")
+    Card.create(session=session, deck_id=deck.id, question_id=fact.id, answer_id=fact.id)
+
+    session.expunge_all()
+    deck = Deck.get_by_name(session=session, name="deck", profile="render")
+    assert "tags" in deck.__dict__
+    assert "cards" not in deck.__dict__
+
+    session.expunge_all()
+    decks, _ = Deck.get_page(session=session, profile="lean")
+    assert not {"tags", "cards"} & decks[0].__dict__.keys()
+
+
+def test_deck_lean_stays_lean_after_commit(session):
+    deck = Deck.create(session=session, name="deck", description="", algorithm="random")
+    fact = Fact.create(session=session, value="A", format="a")
+    tag = Tag.create(session=session, name="tag")
+    deck.assign_tag(session=session, tag_id=tag.id)
+    for _ in range(3):
+        Card.create(session=session, deck_id=deck.id, question_id=fact.id, answer_id=fact.id)
+
+    session.expunge_all()
+    deck = Deck.get_by_name(session=session, name="deck", profile="lean")
+    deck.parameters = {"unseen_first": True}
+    commit(session, deck)
+    assert deck.parameters == {"unseen_first": True}
+    # Expired by the commit, and reloaded on the next access
+    deck.state = {"last": 1}
+    commit(session)
+    assert deck.state == {"last": 1}
+    assert not {"tags", "cards"} & deck.__dict__.keys()
+    assert list(session.identity_map.values()) == [deck]
@@ -0,0 +1,102 @@
+import threading
+import time
+
+import pytest
+from sqlalchemy import event, inspect
+from sqlalchemy.pool import QueuePool
+
+from flashcards_core.guid import HEX, BINARY_16, get_guid_storage, set_guid_storage
+from flashcards_core import database
+from flashcards_core.database import init_db, dispose_engines, registered_engines, Fact
+from flashcards_core.database.migrations import ensure_schema
+
+
+@pytest.fixture(autouse=True)
+def engines():
+    dispose_engines()
+    yield
+    dispose_engines()
+
+
+def test_init_db_reuses_engines(tmpdir):
+    path = f"sqlite:///{tmpdir}/reused.db"
+    sessionmaker = init_db(database_path=path)
+    assert init_db(database_path=path) is sessionmaker
+    assert init_db(database_path=f"sqlite:///{tmpdir}/other.db") is not sessionmaker
+    assert init_db(database_path=path, sqlite_profile="performance") is not sessionmaker
+    assert len(registered_engines()) == 3
+
+    dispose_engines()
+    assert not registered_engines()
+    assert init_db(database_path=path) is not sessionmaker
+
+
+def test_init_db_engines_follow_guid_storage(tmpdir):
+    path = f"sqlite:///{tmpdir}/storage.db"
+    sessionmaker = init_db(database_path=path)
+    storage = get_guid_storage()
+    set_guid_storage(HEX if storage == BINARY_16 else BINARY_16)
+    try:
+        assert init_db(database_path=path, create_tables=False) is not sessionmaker
+    finally:
+        set_guid_storage(storage)
+    assert init_db(database_path=path) is sessionmaker
+
+
+def test_init_db_creates_tables_once(tmpdir):
+    path = f"sqlite:///{tmpdir}/schema.db"
+    engine = init_db(database_path=path)().get_bind()
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    init_db(database_path=path)
+    assert not statements
+
+
+def test_init_db_can_skip_creating_tables(tmpdir):
+    path = f"sqlite:///{tmpdir}/empty.db"
+    session = init_db(database_path=path, create_tables=False)()
+    assert not inspect(session.get_bind()).get_table_names()
+    # Asking for the tables later still creates them
+    session = init_db(database_path=path)()
+    assert Fact.create(session=session, value="A", format="a")
+
+
+def test_init_db_pool_options(tmpdir):
+    session = init_db(
+        database_path=f"sqlite:///{tmpdir}/pooled.db",
+        pool_size=3,
+        max_overflow=2,
+        pool_pre_ping=True,
+    )()
+    pool = session.get_bind().pool
+    assert isinstance(pool, QueuePool)
+    assert pool.size() == 3
+    assert pool._max_overflow == 2
+    assert pool._pre_ping
+    assert Fact.create(session=session, value="A", format="a")
+
+
+def test_init_db_in_memory_databases_are_not_shared():
+    session = init_db(database_path="sqlite://")()
+    Fact.create(session=session, value="A", format="a")
+    other = init_db(database_path="sqlite://")()
+    assert not Fact.get_all(session=other)
+    assert not registered_engines()
+
+
+def test_init_db_checks_the_schema_once_across_threads(tmpdir, monkeypatch):
+    checks = []
+
+    def slow_ensure_schema(connection):
+        checks.append(connection)
+        time.sleep(0.1)
+        return ensure_schema(connection)
+
+    monkeypatch.setattr(database, "ensure_schema", slow_ensure_schema)
+    path = f"sqlite:///{tmpdir}/threads.db"
+    threads = [threading.Thread(target=init_db, args=(path,)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(checks) == 1
@@ -372,6 +372,17 @@ def test_export_to_dict_card_pull_nothing(session):
     }
 
 
+def test_export_to_dict_card_skips_stats(session):
+    deck = Deck.create(session=session, name="Test", description="", algorithm="random")
+    fact = Fact.create(session=session, value="fact", format="text")
+    card = Card.create(
+        session=session, deck_id=deck.id, question_id=fact.id, answer_id=fact.id
+    )
+    Review.create(session=session, result=True, algorithm="random", card_id=card.id)
+    hierarchy = export_to_dict(session=session, objects_to_export=[card])
+    assert sorted(hierarchy) == ["cards", "facts", "reviews"]
+
+
 @freeze_time("2021-01-01 12:00:00")
 def test_export_to_dict_full_hierarchy(session):
     deck = Deck.create(
@@ -7,6 +7,7 @@ from sqlalchemy.exc import IntegrityError
 from flashcards_core.database import (
     Deck,
     Card,
+    CardStats,
     Fact,
     Review,
     Tag,
@@ -176,6 +177,37 @@ def test_import_full_hierarchy(session):
     ]
 
 
+def test_import_computes_card_stats(session):
+    card_id = "d852834bff4f40329e83c46cb9989862"
+    hierarchy = {
+        "cards": {
+            card_id: {
+                "deck_id": "d852834bff4f40329e83c46cb9989861",
+                "question_id": "d852834bff4f40329e83c46cb9989863",
+                "answer_id": "d852834bff4f40329e83c46cb9989863",
+            }
+        },
+        "reviews": {
+            review_id: {
+                "algorithm": "random",
+                "card_id": card_id,
+                "datetime": datetime.datetime(2021, 1, day, 12, 00, 00),
+                "result": result,
+            }
+            for review_id, day, result in [
+                ("d852834bff4f40329e83c46cb9989865", 1, "1"),
+                ("d852834bff4f40329e83c46cb9989866", 2, "0"),
+            ]
+        },
+        # Statistics are computed from the reviews, not imported
+        "card_stats": {card_id: {"reviews_count": 10, "successes_count": 10}},
+    }
+    import_from_dict(session=session, hierarchy=hierarchy, stop_on_error=True)
+    stats = CardStats.get_one(session=session, object_id=UUID(card_id))
+    assert (stats.reviews_count, stats.successes_count) == (2, 1)
+    assert stats.last_review_at == datetime.datetime(2021, 1, 2, 12, 00, 00)
+
+
 def test_import_from_json_full_hierarchy(session):
     hierarchy = json.dumps(
         {
@@ -0,0 +1,236 @@
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine, event, inspect, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+
+from flashcards_core.guid import HEX, BINARY_16, get_guid_storage, set_guid_storage
+from flashcards_core.database import init_db, dispose_engines
+from flashcards_core.database import Card, CardState, CardStats, Deck, Fact, Review, Tag
+from flashcards_core.database.migrations import (
+    ensure_schema,
+    migrate_guid_storage,
+    metadata_hash,
+    upgrade_step,
+    SchemaInfo,
+    METADATA_HASH_KEY,
+    _upgrade_steps,
+)
+
+
+@pytest.fixture()
+def database(tmpdir):
+    path = f"sqlite:///{tmpdir}/migrated.db"
+    session = init_db(database_path=path)()
+    deck = Deck.create(session=session, name="deck", description="", algorithm="random")
+    fact = Fact.create(session=session, value="A", format="a")
+    card = Card.create(session=session, deck_id=deck.id, question_id=fact.id, answer_id=fact.id)
+    tag = Tag.create(session=session, name="tag")
+    card.assign_tag(session=session, tag_id=tag.id)
+    card.assign_question_context(session=session, fact_id=fact.id)
+    Review.create(session=session, card_id=card.id, result=True, algorithm="random")
+    ids = {"deck": deck.id, "fact": fact.id, "card": card.id, "tag": tag.id}
+    session.close()
+    session.get_bind().dispose()
+    yield path, ids
+    set_guid_storage(HEX)
+
+
+def column_types(path, table, column):
+    engine = create_engine(path)
+    types = {c["name"]: str(c["type"]) for c in inspect(engine).get_columns(table)}
+    indexes = {index["name"] for index in inspect(engine).get_indexes(table)}
+    engine.dispose()
+    return types[column], indexes
+
+
+def check_content(path, ids):
+    session = init_db(database_path=path)()
+    card = Card.get_one(session=session, object_id=ids["card"])
+    assert card.deck.id == ids["deck"]
+    assert card.question.id == ids["fact"]
+    assert [tag.id for tag in card.tags] == [ids["tag"]]
+    assert [fact.id for fact in card.question_context_facts] == [ids["fact"]]
+    assert len(card.reviews) == 1
+    assert CardStats.get_one(session=session, object_id=card.id).reviews_count == 1
+    assert Deck.get_by_name(session=session, name="deck").cards == [card]
+    session.close()
+    session.get_bind().dispose()
+
+
+def test_migrate_guid_storage_to_binary_and_back(database):
+    path, ids = database
+    _, indexes_before = column_types(path, "cardtags", "card_id")
+
+    migrated = migrate_guid_storage(path, storage=BINARY_16)
+    assert {"cards", "cardtags", "decks", "facts", "reviews", "tags"} <= set(migrated)
+    assert get_guid_storage() == BINARY_16
+    assert column_types(path, "cardtags", "card_id") == ("BLOB", indexes_before)
+    check_content(path, ids)
+
+    assert migrate_guid_storage(path, storage=BINARY_16) == []
+
+    assert set(migrate_guid_storage(path, storage=HEX)) == set(migrated)
+    assert get_guid_storage() == HEX
+    assert column_types(path, "cardtags", "card_id") == ("CHAR(32)", indexes_before)
+    check_content(path, ids)
+
+
+def test_migrate_guid_storage_rejects_unknown_storage(database):
+    path, _ = database
+    with pytest.raises(ValueError):
+        migrate_guid_storage(path, storage="base64")
+    assert get_guid_storage() == HEX
+
+
+def test_migrate_guid_storage_is_atomic(database):
+    path, ids = database
+    engine = create_engine(path)
+    with engine.begin() as connection:
+        connection.exec_driver_sql("INSERT INTO tags (id, name) VALUES ('not a guid', 'broken')")
+    engine.dispose()
+
+    with pytest.raises(OperationalError):
+        migrate_guid_storage(path, storage=BINARY_16)
+    assert get_guid_storage() == HEX
+    assert column_types(path, "decks", "id")[0] == "CHAR(32)"
+    assert column_types(path, "tags", "id")[0] == "CHAR(32)"
+
+
+def schema_info(path):
+    engine = create_engine(path)
+    with engine.connect() as connection:
+        info = dict(connection.execute(select(SchemaInfo.c.key, SchemaInfo.c.value)).all())
+    engine.dispose()
+    return info
+
+
+def execute(path, *statements):
+    engine = create_engine(path)
+    with engine.begin() as connection:
+        for statement in statements:
+            connection.exec_driver_sql(statement)
+    engine.dispose()
+
+
+def test_schema_is_stamped_and_checked_with_one_lookup(database):
+    path, _ = database
+    assert schema_info(path)[METADATA_HASH_KEY] == metadata_hash()
+    assert "upgrade:rebuild_card_stats" in schema_info(path)
+
+    dispose_engines()
+    statements = []
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+    event.listen(Engine, "before_cursor_execute", listener)
+    try:
+        init_db(database_path=path)
+    finally:
+        event.remove(Engine, "before_cursor_execute", listener)
+    assert not [statement for statement in statements if "CREATE" in statement]
+    assert len(statements) <= 3
+
+
+def test_schema_upgrade_of_an_old_database(database):
+    path, ids = database
+    # A database from before the schema stamp, the card statistics and the composite indexes
+    execute(
+        path,
+        "DROP TABLE schema_info",
+        "DROP TABLE card_stats",
+        "DROP INDEX ix_reviews_datetime_id",
+        "DROP INDEX ix_cardtags_tag_id_card_id",
+        "ALTER TABLE decks DROP COLUMN description",
+    )
+    dispose_engines()
+    session = init_db(database_path=path)()
+
+    indexes = {index["name"] for index in inspect(session.get_bind()).get_indexes("reviews")}
+    assert "ix_reviews_datetime_id" in indexes
+    indexes = {index["name"] for index in inspect(session.get_bind()).get_indexes("cardtags")}
+    assert "ix_cardtags_tag_id_card_id" in indexes
+    assert CardStats.get_one(session=session, object_id=ids["card"]).reviews_count == 1
+    deck = Deck.get_one(session=session, object_id=ids["deck"])
+    assert deck.description is None
+    session.close()
+    assert schema_info(path)[METADATA_HASH_KEY] == metadata_hash()
+
+
+def test_schema_upgrade_drops_the_card_state_counters(database):
+    path, ids = database
+    # A database from before the schema stamp, when card_states counted the reviews
+    execute(
+        path,
+        "DROP TABLE card_states",
+        "CREATE TABLE card_states (card_id CHAR(32) NOT NULL, deck_id CHAR(32) NOT NULL, "
+        "last_review_at DATETIME, reviews_count INTEGER NOT NULL, "
+        "lapses_count INTEGER NOT NULL, due_at DATETIME, parameters JSON NOT NULL, "
+        "PRIMARY KEY (card_id), FOREIGN KEY(card_id) REFERENCES cards (id), "
+        "FOREIGN KEY(deck_id) REFERENCES decks (id))",
+        "DROP TABLE schema_info",
+    )
+    dispose_engines()
+    session = init_db(database_path=path)()
+
+    columns = {column["name"] for column in inspect(session.get_bind()).get_columns("card_states")}
+    assert not {"reviews_count", "lapses_count"} & columns
+    card = Card.get_one(session=session, object_id=ids["card"])
+    CardState.record_review(session=session, card=card)
+    session.commit()
+    assert CardState.get_one(session=session, object_id=card.id)
+    session.close()
+
+
+def test_schema_upgrade_steps_run_once(database):
+    path, _ = database
+    runs = []
+    old_hash = metadata_hash()
+    try:
+
+        @upgrade_step("test_step")
+        def test_step(connection):
+            runs.append(connection.execute(select(Deck.name)).scalars().all())
+
+        assert metadata_hash() != old_hash
+        with pytest.raises(ValueError):
+            upgrade_step("test_step")(test_step)
+
+        dispose_engines()
+        init_db(database_path=path)
+        assert runs == [["deck"]]
+        assert "upgrade:test_step" in schema_info(path)
+
+        # Up to date: the step doesn't run again, even if the schema changes
+        execute(path, f"UPDATE schema_info SET value = 'old' WHERE key = '{METADATA_HASH_KEY}'")
+        dispose_engines()
+        init_db(database_path=path)
+        assert runs == [["deck"]]
+        assert schema_info(path)[METADATA_HASH_KEY] == metadata_hash()
+    finally:
+        _upgrade_steps.pop("test_step", None)
+
+
+def test_schema_upgrade_by_concurrent_processes(database):
+    path, _ = database
+    execute(path, "DELETE FROM schema_info")
+    results = []
+
+    def upgrade():
+        engine = create_engine(path)
+        with engine.begin() as connection:
+            results.append(ensure_schema(connection))
+        engine.dispose()
+
+    # The first process is still upgrading when the second one starts
+    first = create_engine(path)
+    with first.begin() as connection:
+        assert ensure_schema(connection)
+        second = threading.Thread(target=upgrade)
+        second.start()
+        time.sleep(0.2)
+    first.dispose()
+    second.join()
+
+    assert results == [False]
+    assert schema_info(path)[METADATA_HASH_KEY] == metadata_hash()
@@ -0,0 +1,73 @@
+import pytest
+import threading
+from sqlalchemy import text
+
+from flashcards_core.database import init_db, Fact
+from sqlalchemy.pool import NullPool, QueuePool, SingletonThreadPool
+
+from flashcards_core.database.pragmas import get_sqlite_pragmas, PERFORMANCE
+
+
+def pragma(session, name):
+    return session.execute(text(f"PRAGMA {name}")).scalar()
+
+
+def test_sqlite_default_profile_issues_no_pragmas(tmpdir):
+    session = init_db(database_path=f"sqlite:///{tmpdir}/default.db")()
+    assert pragma(session, "journal_mode") == "delete"
+    assert pragma(session, "synchronous") == 2  # FULL
+
+
+def test_sqlite_performance_profile(tmpdir):
+    session = init_db(database_path=f"sqlite:///{tmpdir}/fast.db", sqlite_profile=PERFORMANCE)()
+    assert pragma(session, "journal_mode") == "wal"
+    assert pragma(session, "synchronous") == 1  # NORMAL
+    assert pragma(session, "cache_size") == -64000
+    assert pragma(session, "mmap_size") == 256 * 1024 * 1024
+    assert pragma(session, "temp_store") == 2  # MEMORY
+    assert pragma(session, "busy_timeout") == 5000
+
+
+def test_sqlite_custom_profile(tmpdir):
+    session = init_db(
+        database_path=f"sqlite:///{tmpdir}/custom.db", sqlite_profile={"cache_size": -1000}
+    )()
+    assert pragma(session, "cache_size") == -1000
+    assert pragma(session, "journal_mode") == "delete"
+
+
+def test_sqlite_profile_pools_file_connections(tmpdir):
+    assert isinstance(init_db(f"sqlite:///{tmpdir}/a.db")().get_bind().pool, NullPool)
+    session = init_db(f"sqlite:///{tmpdir}/b.db", sqlite_profile=PERFORMANCE)()
+    assert isinstance(session.get_bind().pool, QueuePool)
+    session = init_db("sqlite://", sqlite_profile=PERFORMANCE)()
+    assert isinstance(session.get_bind().pool, SingletonThreadPool)
+
+
+@pytest.mark.parametrize(
+    "profile", ["wrong", {"cache_size; DROP TABLE facts": 1}, {"cache_size": "1; --"}]
+)
+def test_sqlite_invalid_profiles(profile):
+    with pytest.raises(ValueError):
+        get_sqlite_pragmas(profile)
+
+
+def test_sqlite_performance_profile_readers_dont_wait_for_writers(tmpdir):
+    sessionmaker = init_db(
+        database_path=f"sqlite:///{tmpdir}/concurrent.db", sqlite_profile=PERFORMANCE
+    )
+    writer = sessionmaker()
+    Fact.create(session=writer, value="A", format="a")
+    # Locks the database like a writer in the middle of its commit
+    writer.execute(text("BEGIN EXCLUSIVE"))
+    writer.add(Fact(value="B", format="b"))
+    writer.flush()
+
+    values = []
+    reader = threading.Thread(
+        target=lambda: values.extend(fact.value for fact in Fact.get_all(session=sessionmaker()))
+    )
+    reader.start()
+    reader.join(timeout=2)
+    assert values == ["A"]
+    writer.commit()
@@ -45,3 +45,24 @@ def test_review_repr(session):
         f"<Review of card #{card.id}: 'review' at 2021-01-01 12:00:00 (ID: {review.id})>"
         == f"{review}"
     )
+
+
+def test_review_get_page_by_datetime(session):
+    start = datetime.datetime(2021, 1, 1, 12, 0, 0)
+    Review.bulk_create(
+        session=session,
+        objects=[
+            # Two reviews at each time, to page through ties
+            {"result": "r", "algorithm": "a", "datetime": start + datetime.timedelta(hours=i // 2)}
+            for i in range(7)
+        ],
+    )
+    reviews, cursor = Review.get_page(session=session, limit=3, order_by="datetime")
+    while cursor:
+        page, cursor = Review.get_page(
+            session=session, cursor=cursor, limit=3, order_by="datetime"
+        )
+        reviews += page
+    assert [(review.datetime, review.id) for review in reviews] == sorted(
+        (review.datetime, review.id) for review in Review.get_all(session=session)
+    )
@@ -0,0 +1,189 @@
+import pytest
+from sqlalchemy import event, select, func
+
+from flashcards_core.database import (
+    Card,
+    CardTag,
+    Deck,
+    Fact,
+    HasAllTags,
+    HasAnyTag,
+    HasTag,
+    Tag,
+    batch,
+    bulk_tag,
+    bulk_untag,
+)
+
+
+@pytest.fixture()
+def statements(session):
+    executed = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    engine = session.get_bind()
+    event.listen(engine, "before_cursor_execute", count)
+    yield executed
+    event.remove(engine, "before_cursor_execute", count)
+
+
+@pytest.fixture()
+def deck(session):
+    return Deck.create(session=session, name="deck", description="", algorithm="random")
+
+
+@pytest.fixture()
+def cards(session, deck):
+    fact = Fact.create(session=session, value="A", format="a")
+    ids = Card.bulk_create(
+        session=session,
+        objects=[{"deck_id": deck.id, "question_id": fact.id, "answer_id": fact.id}] * 600,
+        return_ids=True,
+    )
+    return session.execute(select(Card).where(Card.id.in_(ids))).scalars().all()
+
+
+def count_tags(session):
+    return session.execute(select(func.count()).select_from(CardTag)).scalar()
+
+
+def test_assign_and_remove_tags(session, deck):
+    fact = Fact.create(session=session, value="A", format="a")
+    tags = [Tag.create(session=session, name=name) for name in ("a", "b", "c")]
+    for tagged in (deck, fact):
+        tagged.assign_tags(session=session, tag_ids=[tags[0].id, tags[1].id])
+        assert sorted(tag.name for tag in tagged.tags) == ["a", "b"]
+        tagged.assign_tags(session=session, tag_ids=[tag.id for tag in tags])
+        assert sorted(tag.name for tag in tagged.tags) == ["a", "b", "c"]
+        tagged.remove_tags(session=session, tag_ids=[tags[0].id, tags[2].id])
+        assert [tag.name for tag in tagged.tags] == ["b"]
+
+
+def test_bulk_tag_skips_existing_pairs(session, cards, statements):
+    tags = [Tag.create(session=session, name=name) for name in ("a", "b")]
+    tag_ids = [tag.id for tag in tags]
+    cards[0].assign_tag(session=session, tag_id=tag_ids[0])
+    del statements[:]
+
+    assert bulk_tag(session=session, objects=cards, tag_ids=tag_ids) == 600 * 2 - 1
+    # One SELECT per chunk of 500 cards, one multi-row INSERT per 250 rows
+    assert [statement.split()[0] for statement in statements] == (
+        ["SELECT"] + ["INSERT"] * 4 + ["SELECT"] + ["INSERT"]
+    )
+    assert count_tags(session) == 600 * 2
+    assert len(cards[-1].tags) == 2
+
+    assert bulk_tag(session=session, objects=cards, tag_ids=[tags[0].id]) == 0
+
+
+def test_bulk_untag(session, cards):
+    tags = [Tag.create(session=session, name=name) for name in ("a", "b")]
+    bulk_tag(session=session, objects=cards, tag_ids=[tag.id for tag in tags])
+    assert len(cards[0].tags) == 2
+
+    removed = bulk_untag(session=session, objects=cards[:300], tag_ids=[tags[0].id])
+    assert removed == 300
+    assert count_tags(session) == 900
+    assert cards[0].tags == [tags[1]]
+    assert len(cards[-1].tags) == 2
+
+
+def test_bulk_tag_mixed_objects_in_batch(session, deck):
+    fact = Fact.create(session=session, value="A", format="a")
+    card = Card.create(session=session, deck_id=deck.id, question_id=fact.id, answer_id=fact.id)
+    tag = Tag.create(session=session, name="tag")
+    with batch(session):
+        assert bulk_tag(session=session, objects=[deck, fact, card, card], tag_ids=[tag.id]) == 3
+    assert deck.tags == fact.tags == card.tags == [tag]
+
+
+def test_bulk_tag_rejects_untaggable_objects(session, deck):
+    tag = Tag.create(session=session, name="tag")
+    with pytest.raises(ValueError):
+        bulk_tag(session=session, objects=[tag], tag_ids=[tag.id])
+
+
+@pytest.fixture()
+def tagged_cards(session, deck):
+    """
+    Eight cards with all the combinations of the tags a, b and c.
+    """
+    fact = Fact.create(session=session, value="A", format="a")
+    tags = {name: Tag.create(session=session, name=name).id for name in "abc"}
+    cards = {}
+    for combination in ("", "a", "b", "c", "ab", "ac", "bc", "abc"):
+        card = Card.create(
+            session=session, deck_id=deck.id, question_id=fact.id, answer_id=fact.id
+        )
+        card.assign_tags(session=session, tag_ids=[tags[name] for name in combination])
+        cards[combination] = card.id
+    return tags, cards
+
+
+def find(session, tags, limit=100):
+    ids, _ = Card.get_ids_by_tags(session=session, tags=tags, limit=limit)
+    return ids
+
+
+@pytest.mark.parametrize(
+    "tag_filter,expected",
+    [
+        (lambda t: HasTag(t["a"]), ["a", "ab", "ac", "abc"]),
+        (lambda t: HasTag(t["a"]) & HasTag(t["b"]) & ~HasTag(t["c"]), ["ab"]),
+        (lambda t: HasAllTags(t["a"], t["b"]) & ~HasTag(t["c"]), ["ab"]),
+        (lambda t: HasAllTags(t["a"], t["b"], t["c"]), ["abc"]),
+        (lambda t: HasAnyTag(t["a"], t["b"]), ["a", "b", "ab", "ac", "bc", "abc"]),
+        (lambda t: HasTag(t["a"]) | HasTag(t["b"]), ["a", "b", "ab", "ac", "bc", "abc"]),
+        (lambda t: ~HasAnyTag(t["a"], t["b"], t["c"]), [""]),
+        (lambda t: ~(HasTag(t["a"]) | HasTag(t["b"])), ["", "c"]),
+        (
+            lambda t: (HasTag(t["a"]) & ~HasTag(t["b"])) | (HasTag(t["c"]) & ~HasTag(t["a"])),
+            ["a", "ac", "c", "bc"],
+        ),
+    ],
+)
+def test_get_ids_by_tags(session, tagged_cards, tag_filter, expected):
+    tags, cards = tagged_cards
+    assert sorted(find(session, tag_filter(tags))) == sorted(cards[name] for name in expected)
+
+
+@pytest.mark.parametrize("tag_filter", [HasAnyTag, HasAllTags])
+def test_tag_filters_need_tags(tag_filter):
+    with pytest.raises(ValueError):
+        tag_filter()
+
+
+def test_get_ids_by_tags_pages(session, tagged_cards):
+    tags, cards = tagged_cards
+    tag_filter = HasTag(tags["a"]) | HasTag(tags["b"])
+    ids, cursor = Card.get_ids_by_tags(session=session, tags=tag_filter, limit=4)
+    assert len(ids) == 4
+    more_ids, cursor = Card.get_ids_by_tags(
+        session=session, tags=tag_filter, cursor=cursor, limit=4
+    )
+    assert len(more_ids) == 2 and cursor is None
+    assert ids + more_ids == sorted(ids + more_ids)
+    assert set(ids + more_ids) == set(find(session, tag_filter))
+
+
+def test_get_page_by_tags_loads_lean_objects(session, tagged_cards, statements):
+    tags, cards = tagged_cards
+    session.expunge_all()
+    del statements[:]
+    objects, cursor = Card.get_page_by_tags(
+        session=session, tags=HasAllTags(tags["b"], tags["c"]), order_by="deck_id"
+    )
+    assert sorted(card.id for card in objects) == sorted([cards["bc"], cards["abc"]])
+    assert cursor is None
+    assert len(statements) == 1
+    assert all("tags" not in card.__dict__ for card in objects)
+
+
+def test_get_ids_by_tags_on_facts_and_decks(session, deck):
+    fact = Fact.create(session=session, value="A", format="a")
+    tag = Tag.create(session=session, name="tag")
+    bulk_tag(session=session, objects=[deck, fact], tag_ids=[tag.id])
+    assert Fact.get_ids_by_tags(session=session, tags=HasTag(tag.id)) == ([fact.id], None)
+    assert Deck.get_ids_by_tags(session=session, tags=~HasTag(tag.id)) == ([], None)
@@ -1,4 +1,14 @@
-from flashcards_core.database import Tag
+import pytest
+from sqlalchemy import event
+
+from flashcards_core.database import Tag, batch
+from flashcards_core.database.cache import (
+    CacheInfo,
+    NameCache,
+    enable_name_cache,
+    disable_name_cache,
+    get_name_cache,
+)
 
 
 def test_tag_create(session):
@@ -17,3 +27,127 @@ def test_tag_get_by_name_doesnt_exist(session):
 def test_tag_repr(session):
     tag = Tag.create(session=session, name="tag")
     assert f"<Tag 'tag' (ID: {tag.id})>" == f"{tag}"
+
+
+@pytest.fixture()
+def name_cache():
+    cache = enable_name_cache(maxsize=2)
+    yield cache
+    disable_name_cache()
+
+
+@pytest.fixture()
+def statements(session):
+    executed = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    engine = session.get_bind()
+    event.listen(engine, "before_cursor_execute", count)
+    yield executed
+    event.remove(engine, "before_cursor_execute", count)
+
+
+def test_tag_get_by_name_cached(session, name_cache, statements):
+    tag = Tag.create(session=session, name="test")
+    assert tag == Tag.get_by_name(session=session, name="test")
+    del statements[:]
+    assert tag == Tag.get_by_name(session=session, name="test")
+    assert tag.id == Tag.get_id_by_name(session=session, name="test")
+    assert not statements
+    assert name_cache.info() == CacheInfo(hits=2, misses=1, maxsize=2, currsize=1)
+
+
+def test_tag_get_by_name_cache_disabled(session):
+    tag = Tag.create(session=session, name="test")
+    assert tag == Tag.get_by_name(session=session, name="test")
+    assert get_name_cache() is None
+
+
+def test_tag_get_id_by_name_doesnt_exist(session, name_cache):
+    assert Tag.get_id_by_name(session=session, name="test") is None
+    assert Tag.get_id_by_name(session=session, name="test") is None
+    assert name_cache.info().currsize == 0
+
+
+def test_tag_get_ids_by_names_single_query(session, name_cache, statements):
+    tags = Tag.bulk_create(
+        session=session, objects=[{"name": f"tag {i}"} for i in range(3)], return_ids=True
+    )
+    del statements[:]
+    ids = Tag.get_ids_by_names(session=session, names=["tag 0", "tag 1", "tag 2", "wrong"])
+    assert ids == {"tag 0": tags[0], "tag 1": tags[1], "tag 2": tags[2]}
+    assert len(statements) == 1
+
+    # Only the least recently used names are evicted
+    assert name_cache.info().currsize == 2
+    del statements[:]
+    assert Tag.get_ids_by_names(session=session, names=["tag 1", "tag 2"]) == {
+        "tag 1": tags[1],
+        "tag 2": tags[2],
+    }
+    assert not statements
+
+
+def test_tag_rename_invalidates_cache(session, name_cache):
+    tag = Tag.create(session=session, name="test")
+    assert Tag.get_id_by_name(session=session, name="test") == tag.id
+    Tag.update(session=session, object_id=tag.id, name="renamed")
+    assert Tag.get_id_by_name(session=session, name="test") is None
+    assert Tag.get_by_name(session=session, name="renamed") == tag
+
+
+def test_tag_bulk_rename_invalidates_cache(session, name_cache):
+    tag = Tag.create(session=session, name="test")
+    assert Tag.get_id_by_name(session=session, name="test") == tag.id
+    Tag.bulk_update(session=session, objects=[{"id": tag.id, "name": "renamed"}])
+    assert Tag.get_id_by_name(session=session, name="test") is None
+
+
+def test_tag_delete_invalidates_cache(session, name_cache):
+    tag = Tag.create(session=session, name="test")
+    other = Tag.create(session=session, name="other")
+    assert Tag.get_ids_by_names(session=session, names=["test", "other"])
+    Tag.delete(session=session, object_id=tag.id)
+    Tag.bulk_delete(session=session, object_ids=[other.id])
+    assert Tag.get_ids_by_names(session=session, names=["test", "other"]) == {}
+    assert not Tag.get_by_name(session=session, name="test")
+
+
+def test_tag_renamed_outside_crud_is_not_returned(session, name_cache):
+    tag = Tag.create(session=session, name="test")
+    assert Tag.get_by_name(session=session, name="test") == tag
+    tag.name = "renamed"
+    session.commit()
+    assert not Tag.get_by_name(session=session, name="test")
+    assert name_cache.info().currsize == 0
+
+
+def test_name_cache_eviction_across_models_and_databases():
+    cache = NameCache(maxsize=2)
+    cache.put("db1", "decks", "deck", 1)
+    cache.put("db2", "tags", "tag", 1)
+    for object_id in range(2, 10):
+        cache.put("db1", "tags", f"tag-{object_id}", object_id)
+    assert cache.info().currsize == 2
+    # The reverse index doesn't keep the evicted entries of other models and databases
+    assert len(cache._keys_by_id) == 2
+
+
+def test_tag_rolled_back_names_are_not_cached(session, name_cache):
+    with pytest.raises(RuntimeError):
+        with batch(session):
+            Tag.create(session=session, name="phantom")
+            assert Tag.get_id_by_name(session=session, name="phantom")
+            assert Tag.get_by_name(session=session, name="phantom")
+            raise RuntimeError()
+    assert Tag.get_id_by_name(session=session, name="phantom") is None
+    assert Tag.get_by_name(session=session, name="phantom") is None
+
+    with batch(session):
+        tag = Tag.create(session=session, name="committed")
+        assert Tag.get_id_by_name(session=session, name="committed") == tag.id
+        assert name_cache.info().currsize == 0
+    assert name_cache.info().currsize == 1
+    assert Tag.get_id_by_name(session=session, name="committed") == tag.id
@@ -0,0 +1,125 @@
+import uuid
+import pytest
+from sqlalchemy import select, func
+from sqlalchemy.dialects import sqlite
+
+from flashcards_core.guid import (
+    GUID,
+    HEX,
+    BINARY_16,
+    get_guid_storage,
+    set_guid_storage,
+    get_id_factory,
+    set_id_factory,
+    uuid7,
+)
+from flashcards_core.database import init_db, Card, CardTag, Deck, Fact, Review, Tag
+
+
+@pytest.fixture()
+def binary_guids():
+    set_guid_storage(BINARY_16)
+    yield
+    set_guid_storage(HEX)
+
+
+def test_guid_storage_defaults_to_hex():
+    assert get_guid_storage() == HEX
+
+
+def test_guid_storage_unknown():
+    with pytest.raises(ValueError):
+        set_guid_storage("base64")
+
+
+def test_guid_binary_storage(tmpdir, binary_guids):
+    session = init_db(database_path=f"sqlite:///{tmpdir}/binary.db")()
+    deck = Deck.create(session=session, name="deck", description="", algorithm="random")
+    fact = Fact.create(session=session, value="A", format="a")
+    card = Card.create(session=session, deck_id=deck.id, question_id=fact.id, answer_id=fact.id)
+    tag = Tag.create(session=session, name="tag")
+    card.assign_tag(session=session, tag_id=tag.id)
+
+    raw = session.execute(select(func.typeof(CardTag.c.card_id), func.length(CardTag.c.card_id)))
+    assert raw.one() == ("blob", 16)
+    session.expunge_all()
+    loaded = Card.get_one(session=session, object_id=card.id)
+    assert isinstance(loaded.id, uuid.UUID) and loaded.id == card.id
+    assert loaded.tags[0].id == tag.id
+    # Hex strings are still accepted as parameters
+    assert Deck.get_one(session=session, object_id=loaded.deck_id.hex) == loaded.deck
+
+
+@pytest.mark.parametrize("value", [uuid.uuid4(), uuid.uuid4().hex, None])
+def test_guid_column_storage_override(value):
+    dialect = sqlite.dialect()
+    guid = GUID(storage=BINARY_16)
+    stored = guid.bind_processor(dialect)(value)
+    assert stored == (uuid.UUID(value).bytes if isinstance(value, str) else value and value.bytes)
+    loaded = guid.result_processor(dialect, None)(stored)
+    assert loaded == (uuid.UUID(value) if isinstance(value, str) else value)
+    assert str(guid.compile(dialect=dialect)) == "BLOB"
+    assert str(GUID().compile(dialect=dialect)) == "CHAR(32)"
+
+
+@pytest.fixture()
+def time_ordered_ids():
+    yield
+    set_id_factory(None)
+    set_id_factory(None, model=Review)
+
+
+def test_uuid7_layout_and_order():
+    ids = [uuid7() for _ in range(10000)]
+    assert all(value.version == 7 and value.variant == uuid.RFC_4122 for value in ids)
+    # Strictly increasing, also within the same millisecond
+    assert ids == sorted(ids) and len(set(ids)) == len(ids)
+    assert [value.hex for value in ids] == sorted(value.hex for value in ids)
+    assert [value.bytes for value in ids] == sorted(value.bytes for value in ids)
+
+
+def test_uuid7_survives_clock_going_back(monkeypatch):
+    first = uuid7()
+    monkeypatch.setattr("time.time_ns", lambda: 0)
+    assert uuid7() > first
+
+
+def test_id_factory_per_model(session, time_ordered_ids):
+    assert get_id_factory() is uuid.uuid4
+    set_id_factory(uuid7, model=Review)
+    assert get_id_factory(Review) is uuid7
+    assert get_id_factory("reviews") is uuid7
+    assert get_id_factory(Card) is uuid.uuid4
+
+    deck = Deck.create(session=session, name="deck", description="", algorithm="random")
+    fact = Fact.create(session=session, value="A", format="a")
+    card = Card.create(session=session, deck_id=deck.id, question_id=fact.id, answer_id=fact.id)
+    review = Review.create(session=session, card_id=card.id, result="1", algorithm="random")
+    assert card.id.version == 4
+    assert review.id.version == 7
+
+    set_id_factory(None, model=Review)
+    assert get_id_factory(Review) is uuid.uuid4
+
+
+def test_id_factory_global_orders_pages_chronologically(session, time_ordered_ids):
+    set_id_factory(uuid7)
+    deck = Deck.create(session=session, name="deck", description="", algorithm="random")
+    fact = Fact.create(session=session, value="A", format="a")
+    card_ids = [
+        Card.create(session=session, deck_id=deck.id, question_id=fact.id, answer_id=fact.id).id
+        for _ in range(5)
+    ]
+    card_ids += Card.bulk_create(
+        session=session,
+        objects=[{"deck_id": deck.id, "question_id": fact.id, "answer_id": fact.id}] * 5,
+        return_ids=True,
+    )
+    assert all(card_id.version == 7 for card_id in card_ids)
+
+    page, cursor = Card.get_page(session=session, limit=3)
+    paged = [card.id for card in page]
+    while cursor:
+        page, cursor = Card.get_page(session=session, cursor=cursor, limit=3)
+        paged += [card.id for card in page]
+    assert paged == card_ids
@@ -0,0 +1,130 @@
+import pytest
+from datetime import datetime, timedelta
+
+from flashcards_core.database import Deck, Card, CardState, Fact
+from flashcards_core.schedulers.base import BaseScheduler
+from flashcards_core.schedulers.due import DueQueue
+
+
+NOW = datetime(2021, 1, 1, 12, 0, 0)
+
+
+class DueScheduler(BaseScheduler):
+    def next_card(self):
+        return self.next_due_card()
+
+    def process_test_result(self, card, result):
+        """The result is the number of days before the card is due again"""
+        CardState.record_review(session=self.session, card=card)
+        self.schedule_card(card, NOW + timedelta(days=result))
+        self.session.commit()
+
+
+@pytest.fixture
+def deck(session):
+    return Deck.create(session=session, name="test-deck", description="test", algorithm="due")
+
+
+@pytest.fixture
+def cards(session, deck):
+    fact = Fact.create(session=session, value="test-fact", format="text")
+    return [
+        Card.create(session=session, deck_id=deck.id, question_id=fact.id, answer_id=fact.id)
+        for i in range(3)
+    ]
+
+
+def test_due_queue_empty(session, deck):
+    queue = DueQueue(session=session, deck_id=deck.id)
+    assert len(queue) == 0
+    assert queue.peek() is None
+    assert queue.pop() is None
+
+
+def test_due_queue_push_and_pop_in_order(session, deck, cards):
+    queue = DueQueue(session=session, deck_id=deck.id)
+    queue.push(cards[0].id, NOW + timedelta(days=3))
+    queue.push(cards[1].id, NOW + timedelta(days=1))
+    queue.push(cards[2].id, NOW + timedelta(days=2))
+    assert len(queue) == 3
+    assert queue.pop() == (NOW + timedelta(days=1), cards[1].id)
+    assert queue.pop() == (NOW + timedelta(days=2), cards[2].id)
+    assert queue.pop() == (NOW + timedelta(days=3), cards[0].id)
+    assert queue.pop() is None
+
+
+def test_due_queue_push_moves_card(session, deck, cards):
+    queue = DueQueue(session=session, deck_id=deck.id)
+    queue.push(cards[0].id, NOW + timedelta(days=1))
+    queue.push(cards[1].id, NOW + timedelta(days=2))
+    queue.push(cards[0].id, NOW + timedelta(days=3))
+    assert len(queue) == 2
+    assert queue.pop() == (NOW + timedelta(days=2), cards[1].id)
+    assert queue.pop() == (NOW + timedelta(days=3), cards[0].id)
+
+
+def test_due_queue_remove(session, deck, cards):
+    queue = DueQueue(session=session, deck_id=deck.id)
+    queue.push(cards[0].id, NOW)
+    queue.push(cards[1].id, NOW + timedelta(days=1))
+    queue.remove(cards[0].id)
+    assert queue.peek() == (NOW + timedelta(days=1), cards[1].id)
+
+
+
+def test_due_queue_heap_stays_bounded(session, deck, cards):
+    queue = DueQueue(session=session, deck_id=deck.id)
+    for review in range(1000):
+        for card in cards:
+            queue.push(card.id, NOW + timedelta(minutes=review))
+        assert len(queue._heap) <= 3 * len(cards)
+    queue.remove(cards[0].id)
+    queue.remove(cards[1].id)
+    assert len(queue._heap) <= 3
+    assert queue.pop() == (NOW + timedelta(minutes=999), cards[2].id)
+    assert queue.pop() is None
+
+def test_due_queue_loads_from_database(session, deck, cards):
+    for days, card in enumerate(reversed(cards)):
+        CardState.for_card(session=session, card=card).due_at = NOW + timedelta(days=days)
+    session.commit()
+    assert CardState.due_cards(session=session, deck_id=deck.id) == [(NOW, cards[2].id)]
+
+    queue = DueQueue(session=session, deck_id=deck.id)
+    assert len(queue) == 3
+    assert queue.pop() == (NOW, cards[2].id)
+    assert queue.pop() == (NOW + timedelta(days=1), cards[1].id)
+
+
+def test_scheduler_next_due_card(session, deck, cards):
+    scheduler = DueScheduler(session=session, deck=deck)
+    assert scheduler.next_due_card() is None
+
+    scheduler.process_test_result(cards[0], 3)
+    scheduler.process_test_result(cards[1], 1)
+    scheduler.process_test_result(cards[2], 2)
+    assert scheduler.next_card() == cards[1]
+    assert scheduler.next_due_card(due_before=NOW) is None
+
+    scheduler.process_test_result(cards[1], 10)
+    assert scheduler.next_card() == cards[2]
+
+    # The due times are persisted
+    other_scheduler = DueScheduler(session=session, deck=deck)
+    assert other_scheduler.next_card() == scheduler.next_card()
+
+
+def test_scheduler_next_due_card_skips_deleted_cards(session, deck, cards):
+    scheduler = DueScheduler(session=session, deck=deck)
+    scheduler.process_test_result(cards[0], 1)
+    scheduler.process_test_result(cards[1], 2)
+    Card.delete(session=session, object_id=cards[0].id)
+    assert scheduler.next_card() == cards[1]
+
+
+def test_scheduler_unschedule_card(session, deck, cards):
+    scheduler = DueScheduler(session=session, deck=deck)
+    scheduler.process_test_result(cards[0], 1)
+    scheduler.schedule_card(cards[0], None)
+    assert scheduler.next_card() is None
+    assert cards[0].scheduling_state.due_at is None
@@ -0,0 +1,241 @@
+import pytest
+import datetime
+from freezegun import freeze_time
+from sqlalchemy import event, select
+
+from flashcards_core.errors import NoCardsToStudyException
+from flashcards_core.database import Deck, Card, CardState, Fact
+from flashcards_core.schedulers.ebisu import (
+    EbisuScheduler,
+    MODEL,
+    RECALL_THRESHOLD,
+)
+
+
+@pytest.fixture
+def deck(session):
+    return Deck.create(
+        session=session, name="test-deck", description="test", algorithm="ebisu"
+    )
+
+
+@pytest.fixture
+def fact(session):
+    return Fact.create(session=session, value="test-fact", format="text")
+
+
+def test_ebisu_create_scheduler(session, deck):
+    scheduler = EbisuScheduler(session=session, deck=deck)
+    assert scheduler
+
+
+def test_ebisu_next_card_no_cards(session, deck):
+    scheduler = EbisuScheduler(session=session, deck=deck)
+    with pytest.raises(NoCardsToStudyException):
+        scheduler.next_card()
+
+
+def test_ebisu_process_test_result_card_not_in_deck(session, deck, fact):
+    wrong_deck = Deck.create(
+        session=session, name="wrong-deck", description="test", algorithm="ebisu"
+    )
+    card = Card.create(
+        session=session, deck_id=deck.id, question_id=fact.id, answer_id=fact.id
+    )
+    scheduler = EbisuScheduler(session=session, deck=wrong_deck)
+    with pytest.raises(ValueError):
+        scheduler.process_test_result(card=card, result=True)
+    assert len(card.reviews) == 0
+
+
+def test_ebisu_process_test_result_creates_model(session, deck, fact):
+    card = Card.create(
+        session=session, deck_id=deck.id, question_id=fact.id, answer_id=fact.id
+    )
+    scheduler = EbisuScheduler(session=session, deck=deck)
+    with freeze_time("2021-01-01 12:00:00"):
+        scheduler.process_test_result(card=card, result=True)
+    assert len(card.reviews) == 1
+    first_model = list(CardState.get_one(session=session, object_id=card.id).parameters[MODEL])
+
+    with freeze_time("2021-01-02 12:00:00"):
+        scheduler.process_test_result(card=card, result=True)
+    assert len(card.reviews) == 2
+    second_model = CardState.get_one(session=session, object_id=card.id).parameters[MODEL]
+    # A success after a day makes the memory last longer
+    assert second_model[2] > first_model[2]
+
+
+def test_ebisu_next_card_lowest_recall_first(session, deck, fact):
+    deck.parameters = {RECALL_THRESHOLD: 1.0}
+    strong_card = Card.create(
+        session=session, deck_id=deck.id, question_id=fact.id, answer_id=fact.id
+    )
+    weak_card = Card.create(
+        session=session, deck_id=deck.id, question_id=fact.id, answer_id=fact.id
+    )
+    scheduler = EbisuScheduler(session=session, deck=deck)
+    with freeze_time("2021-01-01 12:00:00"):
+        scheduler.process_test_result(card=weak_card, result=True)
+    with freeze_time("2021-01-02 12:00:00"):
+        scheduler.process_test_result(card=strong_card, result=True)
+        scheduler.process_test_result(card=weak_card, result=False)
+    with freeze_time("2021-01-03 12:00:00"):
+        scheduler.process_test_result(card=strong_card, result=True)
+    with freeze_time("2021-01-04 12:00:00"):
+        assert scheduler.next_card() == weak_card
+
+
+def test_ebisu_next_card_introduces_unseen_cards(session, deck, fact):
+    seen_card = Card.create(
+        session=session, deck_id=deck.id, question_id=fact.id, answer_id=fact.id
+    )
+    unseen_card = Card.create(
+        session=session, deck_id=deck.id, question_id=fact.id, answer_id=fact.id
+    )
+    scheduler = EbisuScheduler(session=session, deck=deck)
+    with freeze_time("2021-01-01 12:00:00"):
+        scheduler.process_test_result(card=seen_card, result=True)
+    # Just reviewed: recall is still above the default threshold
+    with freeze_time("2021-01-01 13:00:00"):
+        assert scheduler.next_card() == unseen_card
+    # After a long time the seen card needs a review
+    with freeze_time("2021-03-01 12:00:00"):
+        assert scheduler.next_card() == seen_card
+
+
+def test_ebisu_next_card_no_unseen_cards_left(session, deck, fact):
+    card = Card.create(
+        session=session, deck_id=deck.id, question_id=fact.id, answer_id=fact.id
+    )
+    scheduler = EbisuScheduler(session=session, deck=deck)
+    with freeze_time("2021-01-01 12:00:00"):
+        scheduler.process_test_result(card=card, result=True)
+    with freeze_time("2021-01-01 13:00:00"):
+        assert scheduler.next_card() == card
+
+
+def test_ebisu_card_reviewed_with_another_algorithm(session, deck, fact):
+    card = Card.create(
+        session=session, deck_id=deck.id, question_id=fact.id, answer_id=fact.id
+    )
+    with freeze_time("2021-01-01 12:00:00"):
+        CardState.record_review(session=session, card=card)
+        session.commit()
+    scheduler = EbisuScheduler(session=session, deck=deck)
+    with freeze_time("2021-01-02 12:00:00"):
+        assert scheduler.next_card() == card
+        scheduler.process_test_result(card=card, result=True)
+    assert len(card.scheduling_state.parameters[MODEL]) == 3
+
+
+def test_ebisu_next_cards_with_states_of_another_algorithm(session, deck, fact):
+    deck.parameters = {RECALL_THRESHOLD: 1.0}
+    ebisu_card = Card.create(
+        session=session, deck_id=deck.id, question_id=fact.id, answer_id=fact.id
+    )
+    other_card = Card.create(
+        session=session, deck_id=deck.id, question_id=fact.id, answer_id=fact.id
+    )
+    scheduler = EbisuScheduler(session=session, deck=deck)
+    with freeze_time("2021-01-01 12:00:00"):
+        scheduler.process_test_result(card=ebisu_card, result=True)
+        # A state without an Ebisu model, like the ones other schedulers write
+        CardState.record_review(session=session, card=other_card)
+        session.commit()
+    assert MODEL not in other_card.scheduling_state.parameters
+    # The model-less state is ranked with the deck's default model
+    with freeze_time("2021-01-01 13:00:00"):
+        assert set(scheduler.next_cards(2)) == {ebisu_card, other_card}
+
+
+def test_ebisu_next_card_skips_deleted_cards(session, deck, fact):
+    deck.parameters = {RECALL_THRESHOLD: 1.0}
+    card = Card.create(
+        session=session, deck_id=deck.id, question_id=fact.id, answer_id=fact.id
+    )
+    deleted_card = Card.create(
+        session=session, deck_id=deck.id, question_id=fact.id, answer_id=fact.id
+    )
+    scheduler = EbisuScheduler(session=session, deck=deck)
+    with freeze_time("2021-01-01 12:00:00"):
+        scheduler.process_test_result(card=deleted_card, result=False)
+    with freeze_time("2021-01-02 12:00:00"):
+        scheduler.process_test_result(card=card, result=True)
+    Card.delete(session=session, object_id=deleted_card.id)
+    with freeze_time("2021-01-03 12:00:00"):
+        assert scheduler.next_card() == card
+
+
+def test_ebisu_next_cards(session, deck, fact):
+    deck.parameters = {RECALL_THRESHOLD: 0.7}
+    weak_card, strong_card, unseen_card = [
+        Card.create(session=session, deck_id=deck.id, question_id=fact.id, answer_id=fact.id)
+        for i in range(3)
+    ]
+    scheduler = EbisuScheduler(session=session, deck=deck)
+    with freeze_time("2021-01-01 12:00:00"):
+        scheduler.process_test_results([(weak_card, True), (strong_card, True)])
+    with freeze_time("2021-01-02 12:00:00"):
+        scheduler.process_test_results([(weak_card, False), (strong_card, True)])
+    # 12 hours later, only the weak card is below the threshold
+    with freeze_time("2021-01-03 00:00:00"):
+        assert scheduler.next_cards(3) == [weak_card, unseen_card, strong_card]
+        assert scheduler.next_cards(1) == [weak_card]
+
+
+def test_ebisu_process_test_results_with_review_times(session, deck, fact):
+    card = Card.create(
+        session=session, deck_id=deck.id, question_id=fact.id, answer_id=fact.id
+    )
+    scheduler = EbisuScheduler(session=session, deck=deck)
+    first = datetime.datetime(2021, 1, 1, 12, 0, 0)
+    second = datetime.datetime(2021, 1, 2, 12, 0, 0)
+    scheduler.process_test_results([(card, True, first), (card, True, second)])
+    state = CardState.get_one(session=session, object_id=card.id)
+    assert card.stats.reviews_count == 2
+    assert state.last_review_at == second
+    assert [review.datetime for review in card.reviews] == [first, second]
+
+
+def review_cost(session, fact_id, size):
+    """
+    The number of SQL statements run, and of objects loaded, by a `next_card()`,
+    `process_test_result()`, `next_card()` cycle on a deck of `size` reviewed cards.
+    """
+    deck = Deck.create(
+        session=session, name=f"deck-{size}", description="", algorithm="ebisu"
+    )
+    deck.parameters = {RECALL_THRESHOLD: 1.0}
+    deck_id = deck.id
+    Card.bulk_create(
+        session=session,
+        objects=[{"deck_id": deck_id, "question_id": fact_id, "answer_id": fact_id}] * size,
+    )
+    cards = session.execute(select(Card).where(Card.deck_id == deck_id)).scalars().all()
+    with freeze_time("2021-01-01 12:00:00"):
+        EbisuScheduler(session=session, deck=deck).process_test_results(
+            [(card, True) for card in cards]
+        )
+
+    session.expunge_all()
+    deck = Deck.get_one(session=session, object_id=deck_id, profile="lean")
+    scheduler = EbisuScheduler(session=session, deck=deck)
+    statements = []
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+    event.listen(session.get_bind(), "before_cursor_execute", listener)
+    try:
+        with freeze_time("2021-01-02 12:00:00"):
+            card = scheduler.next_card()
+            scheduler.process_test_result(card=card, result=True)
+            scheduler.next_card()
+    finally:
+        event.remove(session.get_bind(), "before_cursor_execute", listener)
+    return len(statements), len(session.identity_map)
+
+
+def test_ebisu_review_cost_doesnt_grow_with_the_deck(session, fact):
+    fact_id = fact.id
+    assert review_cost(session, fact_id, 5) == review_cost(
+        session, fact_id, 50
+    )
@@ -1,4 +1,6 @@
+import sys
 import pytest
+import subprocess
 
 import flashcards_core
 from flashcards_core.errors import ObjectNotFoundException
@@ -22,10 +24,20 @@ class FakeScheduler(BaseScheduler):
         pass
 
 
+class FakeEntryPoint:
+    def __init__(self, name, value):
+        self.name = name
+        self.value = value
+
+    def load(self):
+        return self.value
+
+
 @pytest.fixture()
 def fake_schedulers(monkeypatch):
     fake_schedulers = {"test": FakeScheduler}
     monkeypatch.setattr(flashcards_core.schedulers, "SCHEDULERS", fake_schedulers)
+    monkeypatch.setattr(flashcards_core.schedulers, "_ENTRY_POINT_SCHEDULERS", {})
     return fake_schedulers
 
 
@@ -37,6 +49,29 @@ def test_get_scheduler_class(fake_schedulers):
     assert get_scheduler_class("test") == FakeScheduler
 
 
+def test_get_scheduler_class_lazy_import(fake_schedulers):
+    fake_schedulers["lazy"] = "test_schedulers_helpers_and_base:FakeScheduler"
+    assert get_scheduler_class("lazy").__name__ == "FakeScheduler"
+    assert fake_schedulers["lazy"] == get_scheduler_class("lazy")
+
+
+def test_get_scheduler_class_from_entry_point(fake_schedulers, monkeypatch):
+    entry_points = {"plugin": FakeEntryPoint("plugin", FakeScheduler)}
+    monkeypatch.setattr(flashcards_core.schedulers, "_ENTRY_POINT_SCHEDULERS", entry_points)
+    assert set(get_available_schedulers()) == {"test", "plugin"}
+    assert get_scheduler_class("plugin") == FakeScheduler
+
+
+def test_importing_schedulers_does_not_import_algorithms():
+    code = (
+        "import sys, flashcards_core.study, flashcards_core.schedulers as s;"
+        "s.get_available_schedulers();"
+        "assert 'flashcards_core.schedulers.ebisu' not in sys.modules;"
+        "assert 'numpy' not in sys.modules"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
 def test_get_scheduler_class_non_existing_algorithm(fake_schedulers):
     with pytest.raises(ObjectNotFoundException):
         get_scheduler_class("wrong")
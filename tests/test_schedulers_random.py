@@ -143,3 +143,74 @@ def test_random_next_card_two_cards_unseen_first(session, deck, fact):
     deck.parameters[UNSEEN_FIRST] = True
     Deck.update(session=session, object_id=deck.id, parameters=deck.parameters)
     assert unseen_card == scheduler.next_card()
+
+
+def test_random_next_card_many_cards_never_repeat(session, deck, fact):
+    deck.parameters = {NEVER_REPEAT: True}
+    for i in range(5):
+        Card.create(
+            session=session, deck_id=deck.id, question_id=fact.id, answer_id=fact.id
+        )
+    scheduler = RandomScheduler(session=session, deck=deck)
+    last_card = None
+    for i in range(20):
+        card = scheduler.next_card()
+        assert card != last_card
+        scheduler.process_test_result(card=card, result=True)
+        last_card = card
+
+
+def test_random_process_test_result_updates_card_state(session, deck, fact):
+    card = Card.create(
+        session=session, deck_id=deck.id, question_id=fact.id, answer_id=fact.id
+    )
+    scheduler = RandomScheduler(session=session, deck=deck)
+    scheduler.process_test_result(card=card, result=True)
+    scheduler.process_test_result(card=card, result=False)
+    assert card.scheduling_state.last_review_at is not None
+    assert card.stats.reviews_count == 2
+    assert card.stats.failures_count == 1
+
+
+def test_random_next_cards_distinct(session, deck, fact):
+    cards = [
+        Card.create(session=session, deck_id=deck.id, question_id=fact.id, answer_id=fact.id)
+        for i in range(5)
+    ]
+    scheduler = RandomScheduler(session=session, deck=deck)
+    next_cards = scheduler.next_cards(3)
+    assert len(next_cards) == 3
+    assert len(set(next_cards)) == 3
+    assert set(scheduler.next_cards(10)) == set(cards)
+
+
+def test_random_next_cards_unseen_first_and_never_repeat(session, deck, fact):
+    deck.parameters = {UNSEEN_FIRST: True, NEVER_REPEAT: True}
+    seen_cards = [
+        Card.create(session=session, deck_id=deck.id, question_id=fact.id, answer_id=fact.id)
+        for i in range(3)
+    ]
+    scheduler = RandomScheduler(session=session, deck=deck)
+    scheduler.process_test_results([(card, True) for card in seen_cards])
+    unseen_card = Card.create(
+        session=session, deck_id=deck.id, question_id=fact.id, answer_id=fact.id
+    )
+    next_cards = scheduler.next_cards(3)
+    assert next_cards[0] == unseen_card
+    assert seen_cards[-1] not in next_cards
+
+
+def test_random_process_test_results_card_not_in_deck(session, deck, fact):
+    wrong_deck = Deck.create(
+        session=session, name="wrong-deck", description="test", algorithm="random"
+    )
+    card = Card.create(
+        session=session, deck_id=deck.id, question_id=fact.id, answer_id=fact.id
+    )
+    wrong_card = Card.create(
+        session=session, deck_id=wrong_deck.id, question_id=fact.id, answer_id=fact.id
+    )
+    scheduler = RandomScheduler(session=session, deck=deck)
+    with pytest.raises(ValueError):
+        scheduler.process_test_results([(card, True), (wrong_card, True)])
+    assert len(card.reviews) == 0
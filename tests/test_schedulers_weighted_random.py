@@ -0,0 +1,228 @@
+import pytest
+import random
+from collections import Counter
+
+from sqlalchemy import event
+
+from flashcards_core.errors import NoCardsToStudyException
+from flashcards_core.database import Deck, Card, Fact, Tag
+from flashcards_core.schedulers.random import NEVER_REPEAT, LAST_REVIEWED_CARD, UNSEEN_FIRST
+from flashcards_core.schedulers.weighted_random import (
+    WeightedRandomScheduler,
+    WeightedSampler,
+    AliasTable,
+    TAG_WEIGHTS,
+    FAILURE_WEIGHT,
+)
+
+
+@pytest.fixture
+def deck(session):
+    return Deck.create(
+        session=session,
+        name="test-deck",
+        description="test",
+        algorithm="weighted_random",
+        parameters={},
+    )
+
+
+@pytest.fixture
+def fact(session):
+    return Fact.create(session=session, value="test-fact", format="text")
+
+
+def make_cards(session, deck, fact, number):
+    return [
+        Card.create(session=session, deck_id=deck.id, question_id=fact.id, answer_id=fact.id)
+        for _ in range(number)
+    ]
+
+
+def test_alias_table_distribution():
+    random.seed(0)
+    table = AliasTable([1, 0, 3])
+    draws = Counter(table.draw() for _ in range(20000))
+    assert draws[1] == 0
+    assert 0.2 < draws[0] / 20000 < 0.3
+    assert 0.7 < draws[2] / 20000 < 0.8
+
+
+def test_weighted_sampler_exclusions_are_never_drawn():
+    random.seed(0)
+    sampler = WeightedSampler({"a": 1, "b": 10, "c": 1})
+    draws = Counter(sampler.draw(exclude={"b"}) for _ in range(5000))
+    assert draws["b"] == 0
+    assert 0.4 < draws["a"] / 5000 < 0.6
+
+
+def test_weighted_sampler_nothing_left_to_draw():
+    sampler = WeightedSampler({"a": 1, "b": 0})
+    assert sampler.draw(exclude={"a"}) is None
+
+
+def test_weighted_sampler_increase():
+    random.seed(0)
+    sampler = WeightedSampler({"a": 1, "b": 1})
+    sampler.increase("b", 2)
+    assert sampler.weight("b") == 3
+    draws = Counter(sampler.draw() for _ in range(20000))
+    assert 0.7 < draws["b"] / 20000 < 0.8
+    # Past the base weight the overlay gets folded in
+    sampler.increase("a", 10)
+    assert sampler.overlay_total == 0
+    assert sampler.weight("a") == 11
+    with pytest.raises(ValueError):
+        sampler.increase("a", -1)
+
+
+def test_weighted_random_next_card_no_cards(session, deck):
+    scheduler = WeightedRandomScheduler(session=session, deck=deck)
+    with pytest.raises(NoCardsToStudyException):
+        scheduler.next_card()
+
+
+def test_weighted_random_tag_weights(session, deck, fact):
+    random.seed(0)
+    cards = make_cards(session, deck, fact, 3)
+    tag = Tag.create(session=session, name="hard")
+    cards[0].assign_tag(session=session, tag_id=tag.id)
+    ignored = Tag.create(session=session, name="ignored")
+    cards[1].assign_tag(session=session, tag_id=ignored.id)
+    deck.parameters = {TAG_WEIGHTS: {"hard": 0}}
+    session.commit()
+
+    scheduler = WeightedRandomScheduler(session=session, deck=deck)
+    picked = {scheduler.next_card().id for _ in range(50)}
+    assert picked == {cards[1].id, cards[2].id}
+
+
+def test_weighted_random_failures_increase_weight(session, deck, fact):
+    random.seed(0)
+    cards = make_cards(session, deck, fact, 2)
+    deck.parameters = {FAILURE_WEIGHT: 8}
+    session.commit()
+
+    scheduler = WeightedRandomScheduler(session=session, deck=deck)
+    scheduler.next_card()
+    scheduler.process_test_result(card=cards[0], result=False)
+    assert scheduler.sampler.weight(cards[0].id) == 9
+
+    draws = Counter(scheduler.next_card().id for _ in range(2000))
+    assert draws[cards[0].id] > draws[cards[1].id] * 5
+
+    # A new scheduler reads the same weights from the card states
+    other = WeightedRandomScheduler(session=session, deck=deck)
+    assert other.sampler.weight(cards[0].id) == 9
+
+
+def test_weighted_random_never_repeat(session, deck, fact):
+    random.seed(0)
+    cards = make_cards(session, deck, fact, 3)
+    deck.parameters = {NEVER_REPEAT: True}
+    session.commit()
+
+    scheduler = WeightedRandomScheduler(session=session, deck=deck)
+    for _ in range(30):
+        card = scheduler.next_card()
+        assert card.id.hex != deck.state.get(LAST_REVIEWED_CARD)
+        scheduler.process_test_result(card=card, result=random.random() > 0.5)
+
+    assert len(scheduler.next_cards(number=5)) == 2
+
+
+def test_weighted_random_never_repeat_single_card(session, deck, fact):
+    card = make_cards(session, deck, fact, 1)[0]
+    deck.parameters = {NEVER_REPEAT: True}
+    session.commit()
+
+    scheduler = WeightedRandomScheduler(session=session, deck=deck)
+    scheduler.process_test_result(card=card, result=True)
+    assert scheduler.next_card() == card
+
+
+def test_weighted_random_rebuilds_on_new_cards(session, deck, fact):
+    make_cards(session, deck, fact, 2)
+    scheduler = WeightedRandomScheduler(session=session, deck=deck)
+    assert len(scheduler.sampler.keys) == 2
+    make_cards(session, deck, fact, 1)
+    assert len(scheduler.sampler.keys) == 3
+    assert len(scheduler.next_cards(number=5)) == 3
+
+
+def test_weighted_random_rebuilds_on_replaced_and_moved_cards(session, deck, fact):
+    cards = make_cards(session, deck, fact, 3)
+    other_deck = Deck.create(session=session, name="other", description="", algorithm="random")
+    scheduler = WeightedRandomScheduler(session=session, deck=deck)
+    assert len(scheduler.next_cards(number=3)) == 3
+
+    # Same number of cards, but one is new and one is gone
+    Card.delete(session=session, object_id=cards[0].id)
+    new_card = make_cards(session, deck, fact, 1)[0]
+    picked = scheduler.next_cards(number=3)
+    assert {card.id for card in picked} == {cards[1].id, cards[2].id, new_card.id}
+
+    # One card moved out and another one in
+    moved_in = make_cards(session, other_deck, fact, 1)[0]
+    Card.update(session=session, object_id=cards[1].id, deck_id=other_deck.id)
+    Card.update(session=session, object_id=moved_in.id, deck_id=deck.id)
+    picked = scheduler.next_cards(number=3)
+    assert {card.id for card in picked} == {cards[2].id, new_card.id, moved_in.id}
+
+
+def test_weighted_random_rebuilds_on_tag_changes(session, deck, fact):
+    random.seed(0)
+    cards = make_cards(session, deck, fact, 2)
+    tag = Tag.create(session=session, name="hard")
+    deck.parameters = {TAG_WEIGHTS: {"hard": 0}}
+    session.commit()
+
+    scheduler = WeightedRandomScheduler(session=session, deck=deck)
+    assert {scheduler.next_card().id for _ in range(20)} == {cards[0].id, cards[1].id}
+    cards[0].assign_tag(session=session, tag_id=tag.id)
+    assert {scheduler.next_card().id for _ in range(20)} == {cards[1].id}
+
+
+def test_weighted_random_sampler_runs_no_query_when_nothing_changed(session, deck, fact):
+    make_cards(session, deck, fact, 3)
+    deck.parameters = {TAG_WEIGHTS: {"hard": 2}}
+    session.commit()
+    scheduler = WeightedRandomScheduler(session=session, deck=deck)
+    sampler = scheduler.sampler
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+    event.listen(session.get_bind(), "before_cursor_execute", listener)
+    try:
+        assert scheduler.sampler is sampler
+    finally:
+        event.remove(session.get_bind(), "before_cursor_execute", listener)
+    assert statements == []
+
+
+def test_weighted_random_rebuilds_on_tag_renames(session, deck, fact):
+    random.seed(0)
+    cards = make_cards(session, deck, fact, 2)
+    tag = Tag.create(session=session, name="easy")
+    cards[0].assign_tag(session=session, tag_id=tag.id)
+    deck.parameters = {TAG_WEIGHTS: {"hard": 0}}
+    session.commit()
+
+    scheduler = WeightedRandomScheduler(session=session, deck=deck)
+    assert {scheduler.next_card().id for _ in range(20)} == {cards[0].id, cards[1].id}
+    Tag.update(session=session, object_id=tag.id, name="hard")
+    assert {scheduler.next_card().id for _ in range(20)} == {cards[1].id}
+
+
+def test_weighted_random_unseen_first_skips_zero_weight_cards(session, deck, fact):
+    random.seed(0)
+    cards = make_cards(session, deck, fact, 3)
+    tag = Tag.create(session=session, name="hard")
+    cards[0].assign_tag(session=session, tag_id=tag.id)
+    deck.parameters = {UNSEEN_FIRST: True, TAG_WEIGHTS: {"hard": 0}}
+    session.commit()
+
+    scheduler = WeightedRandomScheduler(session=session, deck=deck)
+    for _ in range(10):
+        picked = scheduler.next_cards(number=3)
+        assert {card.id for card in picked} == {cards[1].id, cards[2].id}
@@ -1,5 +1,8 @@
 import pytest
 import random
+import datetime
+
+import flashcards_core.study
 
 from flashcards_core.database import Deck, Card, Fact
 from flashcards_core.study import Study
@@ -24,3 +27,95 @@ def test_study(session, deck):
     card = study.next()
     assert card
     assert study.next(card, True)
+
+
+def test_study_next_batch(session, deck):
+    study = Study(session=session, deck=deck)
+    cards = study.next_batch(5)
+    assert len(cards) == 2
+    assert set(cards) == set(deck.cards)
+
+
+def test_study_submit_results(session, deck):
+    study = Study(session=session, deck=deck)
+    card1, card2 = study.next_batch(2)
+    review_time = datetime.datetime(2021, 1, 1, 12, 0, 0)
+    study.submit_results([(card1, True), (card2, False, review_time), (card1, True)])
+    assert len(card1.reviews) == 2
+    assert len(card2.reviews) == 1
+    assert card2.reviews[0].datetime == review_time
+    assert card1.stats.reviews_count == 2
+    assert card2.stats.failures_count == 1
+
+
+def test_study_submit_results_single_commit(session, deck, monkeypatch):
+    study = Study(session=session, deck=deck)
+    commits = []
+    monkeypatch.setattr(session, "commit", lambda: commits.append(True))
+    study.submit_results([(card, True) for card in deck.cards])
+    assert len(commits) == 1
+
+
+def test_study_write_behind_flushes_every_n_results(session, deck):
+    fact = Fact.create(session=session, value="c", format="c")
+    for i in range(4):
+        Card.create(session=session, deck_id=deck.id, question_id=fact.id, answer_id=fact.id)
+    flushed = []
+    study = Study(
+        session=session, deck=deck, write_behind=True, flush_every=3, on_flush=flushed.append
+    )
+    card = study.next()
+    for i in range(5):
+        card = study.next(card, True)
+    assert len(flushed) == 1
+    assert len(flushed[0]) == 3
+    assert sum(len(card.reviews) for card in deck.cards) == 3
+
+    study.close()
+    assert len(flushed) == 2
+    assert sum(len(card.reviews) for card in deck.cards) == 5
+
+
+def test_study_write_behind_flushes_every_t_seconds(session, deck, monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(flashcards_core.study.time, "monotonic", lambda: clock[0])
+    study = Study(session=session, deck=deck, write_behind=True, flush_interval=10)
+    card = study.next()
+    card = study.next(card, True)
+    assert sum(len(card.reviews) for card in deck.cards) == 0
+    clock[0] = 11.0
+    study.next(card, True)
+    assert sum(len(card.reviews) for card in deck.cards) == 2
+
+
+def test_study_write_behind_context_manager(session, deck):
+    with Study(session=session, deck=deck, write_behind=True) as study:
+        card = study.next()
+        study.next(card, False)
+        assert len(card.reviews) == 0
+    assert len(card.reviews) == 1
+    assert card.reviews[0].result == "0"
+
+
+def test_study_write_behind_context_manager_discards_on_errors(session, deck):
+    flushed = []
+    with pytest.raises(RuntimeError):
+        with Study(
+            session=session, deck=deck, write_behind=True, on_flush=flushed.append
+        ) as study:
+            card = study.next()
+            study.next(card, False)
+            raise RuntimeError()
+    assert not flushed
+    assert sum(len(card.reviews) for card in deck.cards) == 0
+
+
+def test_study_write_behind_card_not_in_deck(session, deck):
+    other_deck = Deck.create(session=session, name="b", description="b", algorithm="random")
+    fact = Fact.create(session=session, value="b", format="b")
+    card = Card.create(
+        session=session, deck_id=other_deck.id, question_id=fact.id, answer_id=fact.id
+    )
+    study = Study(session=session, deck=deck, write_behind=True)
+    with pytest.raises(ValueError):
+        study.next(card, True)